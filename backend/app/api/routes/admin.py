@@ -0,0 +1,57 @@
+"""Administrative API routes."""
+import hmac
+from fastapi import APIRouter, Header, HTTPException
+from starlette.requests import Request
+from typing import Optional
+from app.core.config import settings
+from app.services.model_manager import ModelReloadError
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def _check_admin_token(token: Optional[str]):
+    """
+    Reject the request unless it carries the configured admin token.
+    
+    Without a configured token the admin routes are disabled rather than open.
+    """
+    if not settings.admin_token:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them"
+        )
+    if token is None or not hmac.compare_digest(token.encode("utf-8"), settings.admin_token.encode("utf-8")):
+        raise HTTPException(
+            status_code=403,
+            detail="Invalid admin token"
+        )
+
+
+@router.post("/reload-model")
+async def reload_model(req: Request, x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Load the model files currently on disk and swap them in without downtime.
+    
+    The new model is validated on a smoke batch before it starts serving.
+    In-flight requests finish on the previous model.
+    
+    Args:
+        req: FastAPI request object to access app.state
+        x_admin_token: Value of the X-Admin-Token header
+        
+    Returns:
+        Dict with status ("reloaded" or "unchanged"), model_version and previous_version
+        
+    Raises:
+        HTTPException: 403 for a missing or wrong admin token (or none configured), 500 if the new model fails to
+            load or validate (the previous model keeps serving)
+    """
+    _check_admin_token(x_admin_token)
+    
+    try:
+        return await req.app.state.model_manager.reload(reason="admin request")
+    except ModelReloadError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Model reload failed, previous model still serving: {e}"
+        )
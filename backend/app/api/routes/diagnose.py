@@ -1,60 +1,106 @@
 """Diagnosis API route."""
-from fastapi import APIRouter, HTTPException
-from starlette.requests import Request
+import asyncio
+import json
+import time
+from fastapi import APIRouter, FastAPI, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from starlette.requests import ClientDisconnect, Request
 from datetime import datetime, timezone
-from app.api.schemas.request import DiagnosisRequest
-from app.api.schemas.response import DiagnosisResponse, DiagnosedIssue, SuppressionInfo
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from app.api.schemas.request import DiagnosisRequest, BatchDiagnosisRequest
+from app.api.schemas.response import (
+    DiagnosisResponse,
+    DiagnosedIssue,
+    SuppressionInfo,
+    BatchDiagnosisItem,
+    BatchDiagnosisResponse,
+    ExplainedBatchDiagnosisItem,
+    ExplainedBatchDiagnosisResponse,
+    ExplainedDiagnosisResponse,
+    ExplainedIssue,
+    StreamDiagnosisItem,
+    TermContribution,
+)
+from app.api.schemas.encoding import CRITICAL_CONFIDENCE, render_batch, render_diagnosis
 from app.core.config import settings
+from app.preprocessing.text_cleaner import clean_text
+from app.services.admission import deadline_passed
+from app.services.executor import ModelVersionMismatchError
+from app.services.metrics import format_server_timing
+from app.services.model_manager import SMOKE_COMPLAINTS
 from app.utils.suppression import apply_suppression
 
 router = APIRouter(prefix="/api", tags=["diagnosis"])
 
 
-@router.post("/diagnose", response_model=DiagnosisResponse)
-async def diagnose_complaint(request: DiagnosisRequest, req: Request):
-    """
-    Diagnose automotive fault based on natural language complaint.
-    
-    Args:
-        request: DiagnosisRequest containing the complaint text
-        req: FastAPI request object to access app.state
-        
-    Returns:
-        DiagnosisResponse with top-3 predictions, confidence scores, and suppression info
-        
-    Raises:
-        HTTPException: If model is not loaded or request validation fails
-    """
-    # Retrieve predictor from request.app.state.predictor
+def _get_predictor(req: Request):
+    """Return the loaded predictor or raise 503 if no model is available."""
     predictor = req.app.state.predictor
-    
-    # If predictor is None, raise HTTPException
     if predictor is None:
         raise HTTPException(
             status_code=503,
             detail="Model not loaded"
         )
+    return predictor
+
+
+def _check_deadline(req: Request):
+    """Raise 504 if the client's X-Request-Deadline-Ms passed before inference starts."""
+    if deadline_passed(req.state):
+        admission = req.app.state.admission
+        if admission is not None:
+            admission.record_expired()
+        raise HTTPException(
+            status_code=504,
+            detail="Deadline exceeded before inference started"
+        )
+
+
+def _build_issues(raw_predictions: List[Tuple[str, float]]) -> Tuple[List[DiagnosedIssue], SuppressionInfo]:
+    """
+    Apply suppression to raw predictions and convert them to response schemas.
     
-    # Call predictor.predict() to get raw predictions
-    raw_predictions = predictor.predict(request.complaint)
-    
+    Args:
+        raw_predictions: List of (label, confidence) tuples sorted by confidence (descending)
+        
+    Returns:
+        Tuple of (issues list, SuppressionInfo)
+    """
     # Apply suppression
     final_predictions, suppression_info = apply_suppression(
         raw_predictions,
         unknown_threshold=settings.unknown_suppression_threshold
     )
+    return _issue_models(final_predictions, suppression_info)
+
+
+def _issue_models(final_predictions: List[Tuple[str, float]], suppression_info: Dict,
+                  explanations: Dict = None) -> Tuple[List[DiagnosedIssue], SuppressionInfo]:
+    """
+    Convert suppressed predictions and suppression flags to response schemas.
     
+    With explanations (contributing terms per label), issues are ExplainedIssue models.
+    """
     # Build issues list from final_predictions
     issues = []
     for label, confidence in final_predictions:
         # Determine severity based on confidence
-        severity = "critical" if confidence >= 0.8 else "warning"
+        severity = "critical" if confidence >= CRITICAL_CONFIDENCE else "warning"
         
-        issue = DiagnosedIssue(
-            name=label,
-            confidence=float(confidence),
-            severity=severity
-        )
+        if explanations is not None:
+            issue = ExplainedIssue(
+                name=label,
+                confidence=float(confidence),
+                severity=severity,
+                terms=[TermContribution(term=term, weight=weight) for term, weight in explanations.get(label, [])]
+            )
+        else:
+            issue = DiagnosedIssue(
+                name=label,
+                confidence=float(confidence),
+                severity=severity
+            )
         issues.append(issue)
     
     # Create SuppressionInfo from suppression_info dict
@@ -63,10 +109,532 @@ async def diagnose_complaint(request: DiagnosisRequest, req: Request):
         other_suppressed=suppression_info["other_suppressed"]
     )
     
-    # Return DiagnosisResponse with current UTC ISO timestamp
-    return DiagnosisResponse(
-        issues=issues,
-        timestamp=datetime.now(timezone.utc),
-        suppression_applied=suppression_applied
+    return issues, suppression_applied
+
+
+def _json_response(body: bytes, response: Response) -> Response:
+    """
+    Wrap an encoded body like FastAPI wraps a response_model result.
+    
+    Returning a Response skips response_model validation and serialization; the
+    headers set on the injected response are appended as FastAPI would.
+    """
+    result = Response(content=body, media_type="application/json")
+    result.headers.raw.extend(response.headers.raw)
+    return result
+
+
+def _explained_fallback(result, response: Response) -> Response:
+    """
+    Serialize an explained response model without the route's response_model.
+    
+    The routes declare the plain response schemas, which would drop the issues'
+    terms from an explained model returned as-is.
+    """
+    return _json_response(JSONResponse(result.model_dump(mode="json")).body, response)
+
+
+# OpenAPI documentation of the explained variants; the declared 200 schema stays
+# the plain response, which an explained response extends with each issue's terms
+_EXPLAINED_ISSUE_EXAMPLE = {
+    "name": "Engine Misfire",
+    "confidence": 0.92,
+    "severity": "critical",
+    "terms": [{"term": "engine", "weight": 0.41}, {"term": "shaking", "weight": 0.18}],
+}
+
+_DIAGNOSE_RESPONSES = {
+    200: {
+        "description": (
+            "DiagnosisResponse. With explain set, an ExplainedDiagnosisResponse: each "
+            "issue also has terms, a list of {term, weight} contributions, largest first."
+        ),
+        "content": {"application/json": {"examples": {
+            "explained": {
+                "summary": "explain: true",
+                "value": {
+                    "issues": [_EXPLAINED_ISSUE_EXAMPLE],
+                    "timestamp": "2024-01-15T10:30:00.123456Z",
+                    "suppression_applied": {"unknown_suppressed": False, "other_suppressed": True},
+                },
+            },
+        }}},
+    },
+}
+
+_BATCH_RESPONSES = {
+    200: {
+        "description": (
+            "BatchDiagnosisResponse. With explain set, an ExplainedBatchDiagnosisResponse: "
+            "each issue also has terms, a list of {term, weight} contributions, largest first."
+        ),
+        "content": {"application/json": {"examples": {
+            "explained": {
+                "summary": "explain: true",
+                "value": {
+                    "results": [{
+                        "index": 0,
+                        "issues": [_EXPLAINED_ISSUE_EXAMPLE],
+                        "suppression_applied": {"unknown_suppressed": False, "other_suppressed": True},
+                        "error": None,
+                    }],
+                    "succeeded": 1,
+                    "failed": 0,
+                    "timestamp": "2024-01-15T10:30:00.123456Z",
+                },
+            },
+        }}},
+    },
+}
+
+
+def _stage_timings(req: Request) -> Dict[str, float]:
+    """Return a dict to collect stage timings in, or None when nothing would use them."""
+    if req.app.state.metrics is None and not settings.server_timing_enabled:
+        return None
+    return {}
+
+
+def _report_stages(req: Request, response: Response, timings: Dict[str, float]):
+    """Record stage timings in the metrics and, when enabled, the Server-Timing header."""
+    if timings is None:
+        return
+    metrics = req.app.state.metrics
+    if metrics is not None:
+        metrics.observe_stages(req.scope["route"].path, timings)
+    if settings.server_timing_enabled:
+        response.headers["Server-Timing"] = format_server_timing(timings)
+
+
+async def _predict(req: Request, predictor, complaint: str, use_cache: bool = True,
+                   timings: Dict[str, float] = None, explain_terms: int = 0):
+    """
+    Get raw predictions for one complaint off the event loop.
+    
+    Goes through the prediction cache (when enabled and use_cache is set) and then
+    the micro-batcher (when enabled) or the inference executor. On a cache miss,
+    timings (when given) receives the predictor's per-stage seconds.
+    
+    With explain_terms, returns (predictions, explanations) as Predictor.predict
+    does. Explained predictions go straight to the executor: the cache and the
+    micro-batcher only hold plain predictions.
+    """
+    top_k = settings.prediction_top_k
+    evaluator = req.app.state.candidate_evaluator
+    if explain_terms > 0:
+        return await req.app.state.executor.predict(predictor, complaint, top_k, timings, explain_terms)
+    
+    async def compute():
+        started = time.perf_counter()
+        batcher = req.app.state.batcher
+        if batcher is not None:
+            result = await batcher.predict(predictor, complaint, top_k, timings)
+        else:
+            result = await req.app.state.executor.predict(predictor, complaint, top_k, timings)
+        if evaluator is not None:
+            evaluator.record_latency(predictor, time.perf_counter() - started)
+        return result
+    
+    cache = req.app.state.prediction_cache
+    if cache is None or not use_cache:
+        return await compute()
+    return await cache.get_or_compute(predictor.model_version, clean_text(complaint), top_k, compute)
+
+
+async def warm_up(app: FastAPI, batch_size: int) -> float:
+    """
+    Run the smoke complaints through the diagnose pipeline without caching them.
+    
+    Scores every smoke complaint on its own (concurrently, so every pool worker
+    gets work) and then batch_size complaints in one batch, and builds and
+    serializes the responses, so the first real request does not pay for lazy
+    imports, BLAS initialization or schema compilation.
+    
+    Args:
+        app: Application whose predictor, executor and batcher are set up
+        batch_size: Number of complaints in the warm-up batch
+        
+    Returns:
+        time.perf_counter() value at which the first prediction finished
+    """
+    predictor = app.state.predictor
+    top_k = settings.prediction_top_k
+    
+    async def predict_one(complaint: str):
+        if app.state.batcher is not None:
+            return await app.state.batcher.predict(predictor, complaint, top_k)
+        return await app.state.executor.predict(predictor, complaint, top_k)
+    
+    first_prediction = await predict_one(SMOKE_COMPLAINTS[0])
+    first_prediction_at = time.perf_counter()
+    singles = [first_prediction] + list(await asyncio.gather(*[
+        predict_one(complaint) for complaint in SMOKE_COMPLAINTS[1:]
+    ]))
+    
+    complaints = [SMOKE_COMPLAINTS[i % len(SMOKE_COMPLAINTS)] for i in range(max(batch_size, 1))]
+    batch = await app.state.executor.predict_batch(predictor, complaints, top_k)
+    
+    for raw_predictions in singles + batch:
+        issues, suppression_applied = _build_issues(raw_predictions)
+        DiagnosisResponse(
+            issues=issues,
+            timestamp=datetime.now(timezone.utc),
+            suppression_applied=suppression_applied
+        ).model_dump_json()
+    
+    return first_prediction_at
+
+
+@router.post("/diagnose", response_model=DiagnosisResponse, responses=_DIAGNOSE_RESPONSES)
+async def diagnose_complaint(request: DiagnosisRequest, req: Request, response: Response):
+    """
+    Diagnose automotive fault based on natural language complaint.
+    
+    Args:
+        request: DiagnosisRequest containing the complaint text
+        req: FastAPI request object to access app.state
+        response: Outgoing response, used to set the X-Model-Version header
+        
+    Returns:
+        DiagnosisResponse with top-3 predictions, confidence scores, and suppression info;
+        ExplainedDiagnosisResponse, which adds each issue's top contributing terms,
+        when request.explain is set
+        
+    Raises:
+        HTTPException: If model is not loaded, request validation fails or the
+            client's deadline passed before inference started
+    """
+    predictor = _get_predictor(req)
+    
+    # Canary: a share of complaints is served by the candidate model. Its
+    # predictions bypass the cache, which only holds one model version.
+    evaluator = req.app.state.candidate_evaluator
+    use_candidate = evaluator is not None and evaluator.routes_to_candidate(request.complaint)
+    if use_candidate:
+        predictor = evaluator.candidate
+    response.headers["X-Model-Version"] = predictor.model_version
+    timings = _stage_timings(req)
+    
+    # Get raw predictions (cached, batched and off the event loop)
+    _check_deadline(req)
+    started = time.perf_counter()
+    explanations = None
+    if request.explain:
+        raw_predictions, explanations = await _predict(
+            req, predictor, request.complaint, timings=timings, explain_terms=settings.explain_top_terms
+        )
+    else:
+        raw_predictions = await _predict(req, predictor, request.complaint, use_cache=not use_candidate, timings=timings)
+    predicted = time.perf_counter()
+    
+    if evaluator is not None:
+        evaluator.record_served(predictor)
+        # Shadow: queue the candidate comparison without waiting for it
+        if not use_candidate:
+            evaluator.submit_shadow(request.complaint, raw_predictions)
+    
+    suppression_started = time.perf_counter()
+    final_predictions, suppression_info = apply_suppression(
+        raw_predictions,
+        unknown_threshold=settings.unknown_suppression_threshold
     )
+    suppressed = time.perf_counter()
+    
+    # Encode the DiagnosisResponse directly, with current UTC ISO timestamp
+    timestamp = datetime.now(timezone.utc)
+    body = render_diagnosis(final_predictions, suppression_info, timestamp, explanations)
+    if body is None:
+        # Values the schema rejects: build the models so validation fails as before
+        issues, suppression_applied = _issue_models(final_predictions, suppression_info, explanations)
+        result = (DiagnosisResponse if explanations is None else ExplainedDiagnosisResponse)(
+            issues=issues,
+            timestamp=timestamp,
+            suppression_applied=suppression_applied
+        )
+    
+    if timings is not None:
+        # "predict" covers the cache lookup, queueing and the pool hop around the model stages
+        timings["predict"] = predicted - started
+        timings["suppression"] = suppressed - suppression_started
+        timings["response"] = time.perf_counter() - suppressed
+        _report_stages(req, response, timings)
+    if body is None:
+        return result if explanations is None else _explained_fallback(result, response)
+    return _json_response(body, response)
+
 
+@router.post("/diagnose/batch", response_model=BatchDiagnosisResponse, responses=_BATCH_RESPONSES)
+async def diagnose_batch(request: BatchDiagnosisRequest, req: Request, response: Response):
+    """
+    Diagnose many complaints in a single vectorized model call.
+    
+    Each complaint is validated with the same rules as /api/diagnose. Complaints
+    that fail validation or cleaning get a per-item error; the rest of the batch
+    is still diagnosed.
+    
+    Args:
+        request: BatchDiagnosisRequest containing the list of complaints
+        req: FastAPI request object to access app.state
+        response: Outgoing response, used to set the X-Model-Version header
+        
+    Returns:
+        BatchDiagnosisResponse with one result per complaint, in request order;
+        ExplainedBatchDiagnosisResponse when request.explain is set
+        
+    Raises:
+        HTTPException: If model is not loaded, the batch is too large or the
+            client's deadline passed before inference started
+    """
+    predictor = _get_predictor(req)
+    response.headers["X-Model-Version"] = predictor.model_version
+    
+    if len(request.complaints) > settings.batch_max_complaints:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds maximum of {settings.batch_max_complaints} complaints"
+        )
+    
+    # Validate each complaint individually with the single-request rules;
+    # items are (predictions, suppression_info, error)
+    items: List[Tuple] = [None] * len(request.complaints)
+    valid_indices = []
+    valid_complaints = []
+    for i, complaint in enumerate(request.complaints):
+        try:
+            valid_complaints.append(DiagnosisRequest(complaint=complaint).complaint)
+            valid_indices.append(i)
+        except ValidationError as e:
+            items[i] = (None, None, e.errors()[0]["msg"])
+    
+    # Score all valid complaints as one sparse matrix
+    _check_deadline(req)
+    timings = _stage_timings(req)
+    started = time.perf_counter()
+    explain_terms = settings.explain_top_terms if request.explain else 0
+    raw_batch = []
+    if valid_complaints:
+        raw_batch = await req.app.state.executor.predict_batch(
+            predictor, valid_complaints, settings.prediction_top_k, timings, explain_terms
+        )
+    predicted = time.perf_counter()
+    
+    explanations = [None] * len(items) if request.explain else None
+    for i, raw_predictions in zip(valid_indices, raw_batch):
+        if isinstance(raw_predictions, Exception):
+            items[i] = (None, None, str(raw_predictions))
+            continue
+        if explanations is not None:
+            raw_predictions, explanations[i] = raw_predictions
+        final_predictions, suppression_info = apply_suppression(
+            raw_predictions,
+            unknown_threshold=settings.unknown_suppression_threshold
+        )
+        items[i] = (final_predictions, suppression_info, None)
+    
+    suppressed = time.perf_counter()
+    
+    timestamp = datetime.now(timezone.utc)
+    body = render_batch(items, timestamp, explanations)
+    if body is None:
+        # Values the schema rejects: build the models so validation fails as before
+        item_model = BatchDiagnosisItem if explanations is None else ExplainedBatchDiagnosisItem
+        results = []
+        for i, (final_predictions, suppression_info, error) in enumerate(items):
+            if error is not None:
+                results.append(item_model(index=i, error=error))
+                continue
+            issues, suppression_applied = _issue_models(
+                final_predictions, suppression_info, explanations[i] if explanations is not None else None
+            )
+            results.append(item_model(
+                index=i,
+                issues=issues,
+                suppression_applied=suppression_applied
+            ))
+        failed = sum(1 for item in results if item.error is not None)
+        result = (BatchDiagnosisResponse if explanations is None else ExplainedBatchDiagnosisResponse)(
+            results=results,
+            succeeded=len(results) - failed,
+            failed=failed,
+            timestamp=timestamp
+        )
+    
+    if timings is not None:
+        timings["predict"] = predicted - started
+        timings["suppression"] = suppressed - predicted
+        timings["response"] = time.perf_counter() - suppressed
+        _report_stages(req, response, timings)
+    if body is None:
+        return result if explanations is None else _explained_fallback(result, response)
+    return _json_response(body, response)
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that can be sent while the request body is still being read.
+    
+    StreamingResponse listens for client disconnects by calling receive() itself,
+    which would swallow request body messages. The body iterator here reads the
+    request and notices disconnects on its own, so only the sending half is run.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+async def _iter_lines(req: Request, max_line_bytes: int) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Split the streamed request body into lines without buffering the whole body.
+    
+    Args:
+        req: Request whose body is NDJSON
+        max_line_bytes: Longest line kept; longer lines are skipped
+        
+    Yields:
+        Tuples (line_number, line), where line is None if it exceeded max_line_bytes
+    """
+    buffer = bytearray()
+    line_number = 0
+    oversized = False
+    async for chunk in req.stream():
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line_number += 1
+            yield line_number, None if oversized or end - start > max_line_bytes else bytes(buffer[start:end])
+            oversized = False
+            start = end + 1
+        del buffer[:start]
+        
+        if len(buffer) > max_line_bytes:
+            # Drop the rest of an overlong line instead of buffering it
+            oversized = True
+            buffer.clear()
+    
+    if buffer or oversized:
+        line_number += 1
+        yield line_number, None if oversized else bytes(buffer)
+
+
+def _parse_stream_line(line: bytes) -> Tuple[Optional[object], Optional[str], Optional[str]]:
+    """
+    Parse one NDJSON line of the form {"id": ..., "complaint": "..."}.
+    
+    Returns:
+        Tuple (id, complaint, error) where exactly one of complaint and error is set
+    """
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None, None, "Line is not valid JSON"
+    if not isinstance(data, dict):
+        return None, None, "Line must be a JSON object"
+    
+    line_id = data.get("id")
+    if line_id is not None and (isinstance(line_id, bool) or not isinstance(line_id, (int, str))):
+        return None, None, "id must be a string or an integer"
+    try:
+        return line_id, DiagnosisRequest(complaint=data.get("complaint")).complaint, None
+    except ValidationError as e:
+        return line_id, None, e.errors()[0]["msg"]
+
+
+async def _diagnose_stream_chunk(req: Request, predictor, chunk: List[Tuple[int, object, Optional[str], Optional[str]]]) -> bytes:
+    """
+    Score one chunk of parsed lines in a single batch and render the NDJSON output.
+    
+    Args:
+        req: Request, to reach the inference executor
+        predictor: Predictor used for the whole stream
+        chunk: Tuples (line_number, id, complaint, error) in input order
+        
+    Returns:
+        One NDJSON line per input line, in input order
+    """
+    complaints = [complaint for _, _, complaint, error in chunk if error is None]
+    raw_batch = []
+    if complaints:
+        try:
+            raw_batch = await req.app.state.executor.predict_batch(predictor, complaints, settings.prediction_top_k)
+        except ModelVersionMismatchError as e:
+            # The 200 status is already sent: report it on every line of the chunk
+            raw_batch = [e] * len(complaints)
+    raw_iter = iter(raw_batch)
+    
+    output = bytearray()
+    for line_number, line_id, complaint, error in chunk:
+        if error is None:
+            raw_predictions = next(raw_iter)
+            if isinstance(raw_predictions, Exception):
+                error = str(raw_predictions)
+        if error is not None:
+            item = StreamDiagnosisItem(id=line_id, line=line_number, error=error)
+        else:
+            issues, suppression_applied = _build_issues(raw_predictions)
+            item = StreamDiagnosisItem(
+                id=line_id,
+                line=line_number,
+                issues=issues,
+                suppression_applied=suppression_applied
+            )
+        output += item.model_dump_json().encode("utf-8")
+        output += b"\n"
+    return bytes(output)
+
+
+@router.post(
+    "/diagnose/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}}
+)
+async def diagnose_stream(req: Request):
+    """
+    Diagnose a streamed NDJSON body of complaints and stream NDJSON results back.
+    
+    Each input line is a JSON object {"id": ..., "complaint": "..."}; each output
+    line is a StreamDiagnosisItem echoing the id and line number, in input order.
+    Lines are scored in chunks of settings.stream_chunk_size. The next chunk is
+    read only after the previous results have been handed to the server, so
+    memory stays bounded however large the body is; clients therefore have to
+    read the response while they are still sending. Malformed, invalid or
+    overlong lines get a per-line error; blank lines are skipped.
+    
+    Args:
+        req: FastAPI request object, read as a stream
+        
+    Returns:
+        StreamingResponse with media type application/x-ndjson
+        
+    Raises:
+        HTTPException: If model is not loaded
+    """
+    predictor = _get_predictor(req)
+    chunk_size = max(settings.stream_chunk_size, 1)
+    
+    async def generate():
+        chunk = []
+        try:
+            async for line_number, line in _iter_lines(req, settings.stream_max_line_bytes):
+                if line is None:
+                    chunk.append((line_number, None, None, f"Line exceeds {settings.stream_max_line_bytes} bytes"))
+                elif line.strip():
+                    chunk.append((line_number, *_parse_stream_line(line)))
+                
+                if len(chunk) >= chunk_size:
+                    yield await _diagnose_stream_chunk(req, predictor, chunk)
+                    chunk = []
+        except ClientDisconnect:
+            # Nobody is left to read the results
+            return
+        
+        if chunk:
+            yield await _diagnose_stream_chunk(req, predictor, chunk)
+    
+    return _DuplexStreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"X-Model-Version": predictor.model_version}
+    )
@@ -0,0 +1,341 @@
+"""Voice transcription API routes."""
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict
+from fastapi import APIRouter, HTTPException, WebSocket
+from pydantic import ValidationError
+from starlette.datastructures import UploadFile
+from starlette.requests import ClientDisconnect, Request
+from app.api.schemas.request import COMPLAINT_MAX_LENGTH, DiagnosisRequest
+from app.api.schemas.response import DiagnosisResponse, TranscriptionResponse, VoiceDiagnosisResponse
+from app.api.routes.diagnose import _build_issues, _check_deadline, _get_predictor, _predict
+from app.core.config import settings
+from app.services.transcription import TranscriberBusyError, TranscriberUnavailableError, TranscriptionError
+from app.services.voice_stream import CLOSE_TRY_AGAIN_LATER, VoiceStreamSession
+
+router = APIRouter(prefix="/api", tags=["transcription"])
+
+# Bytes copied per write while saving an upload
+_UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Request bytes allowed on top of the audio for multipart boundaries and part headers
+_MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Uploads are accepted as a multipart "file" field or as the raw request body
+_AUDIO_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            },
+            "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+            "audio/*": {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+
+def _get_transcriber(req: Request):
+    """Return the transcription pool or raise 503 if transcription is unavailable."""
+    transcriber = req.app.state.transcriber
+    if transcriber is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Transcription is not enabled"
+        )
+    return transcriber
+
+
+class _UploadTooLarge(Exception):
+    pass
+
+
+def _limit_receive(receive, max_bytes: int):
+    """
+    Wrap an ASGI receive callable so the request body is cut off past max_bytes.
+    
+    The count covers every body message as it arrives, so the limit holds for
+    chunked uploads without a Content-Length and before the multipart parser
+    spools anything to disk.
+    """
+    received = 0
+    
+    async def limited_receive():
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise _UploadTooLarge()
+        return message
+    
+    return limited_receive
+
+
+async def _write_chunks(chunks, target, max_bytes: int) -> int:
+    """Write an async iterator of byte chunks to target without blocking the event loop."""
+    written = 0
+    async for chunk in chunks:
+        written += len(chunk)
+        if written > max_bytes:
+            raise _UploadTooLarge()
+        if chunk:
+            await asyncio.to_thread(target.write, chunk)
+    return written
+
+
+async def _iter_upload(upload: UploadFile):
+    while True:
+        chunk = await upload.read(_UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def _save_upload(req: Request) -> Path:
+    """
+    Save the uploaded audio to a temporary file, a chunk at a time.
+    
+    A raw body is streamed straight to disk; a multipart "file" field is copied
+    from the parser's spooled file. Either way the audio is never held in memory,
+    and the body is counted while it is received, so an oversized upload is cut
+    off at the limit whether or not it declared a Content-Length.
+    
+    Returns:
+        Path of the temporary file (the caller deletes it)
+        
+    Raises:
+        HTTPException: If the upload is missing, empty or too large
+    """
+    max_bytes = settings.transcription_max_upload_bytes
+    content_type = req.headers.get("content-type", "")
+    multipart = content_type.startswith("multipart/form-data")
+    max_body = max_bytes + _MULTIPART_OVERHEAD_BYTES if multipart else max_bytes
+    declared = req.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > max_body:
+        raise HTTPException(status_code=413, detail=f"Audio upload exceeds {max_bytes} bytes")
+    body = Request(req.scope, _limit_receive(req.receive, max_body))
+    
+    form = None
+    path = None
+    try:
+        if multipart:
+            form = await body.form()
+            upload = form.get("file")
+            if not isinstance(upload, UploadFile):
+                raise HTTPException(status_code=422, detail="Multipart upload needs a 'file' field")
+            chunks = _iter_upload(upload)
+            suffix = Path(upload.filename or "").suffix
+        else:
+            chunks = body.stream()
+            suffix = ""
+        
+        fd, name = tempfile.mkstemp(prefix="upload-", suffix=suffix[:16])
+        path = Path(name)
+        with os.fdopen(fd, "wb") as target:
+            written = await _write_chunks(chunks, target, max_bytes)
+    except _UploadTooLarge:
+        if path is not None:
+            path.unlink(missing_ok=True)
+        raise HTTPException(status_code=413, detail=f"Audio upload exceeds {max_bytes} bytes")
+    except ClientDisconnect:
+        if path is not None:
+            path.unlink(missing_ok=True)
+        raise
+    finally:
+        if form is not None:
+            await form.close()
+    
+    if written == 0:
+        path.unlink(missing_ok=True)
+        raise HTTPException(status_code=422, detail="Audio upload is empty")
+    return path
+
+
+async def _transcribe_upload(req: Request) -> str:
+    """
+    Save the upload, transcribe it in the pool and delete it; HTTP errors for every failure.
+    
+    The pool place is reserved before the body is read, so a busy pool answers
+    503 without receiving the audio.
+    """
+    transcriber = _get_transcriber(req)
+    try:
+        with transcriber.reserve():
+            path = await _save_upload(req)
+            try:
+                # A slow upload may outlast the client's deadline (set by admission control)
+                _check_deadline(req)
+                return await transcriber.transcribe(path, reserved=True)
+            finally:
+                path.unlink(missing_ok=True)
+    except TranscriberBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except TranscriberUnavailableError as e:
+        raise HTTPException(status_code=503, detail=f"Transcription is unavailable: {e}")
+    except TranscriptionError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.post("/transcribe", response_model=TranscriptionResponse, openapi_extra=_AUDIO_REQUEST_BODY)
+async def transcribe_audio(req: Request):
+    """
+    Transcribe an uploaded audio file.
+    
+    The audio is sent as a multipart "file" field or as the raw request body,
+    streamed to a temporary file and transcribed by a worker process that keeps
+    the speech model loaded.
+    
+    Args:
+        req: FastAPI request object, read as a stream
+        
+    Returns:
+        TranscriptionResponse with the transcribed text
+        
+    Raises:
+        HTTPException: 413 if the upload is too large, 422 if it is empty or cannot
+            be transcribed, 503 if transcription is disabled or busy
+    """
+    return TranscriptionResponse(text=await _transcribe_upload(req))
+
+
+@router.post("/transcribe/diagnose", response_model=VoiceDiagnosisResponse, openapi_extra=_AUDIO_REQUEST_BODY)
+async def transcribe_and_diagnose(req: Request):
+    """
+    Transcribe an uploaded audio file and diagnose the transcript as a complaint.
+    
+    The transcript is validated with the same rules as /api/diagnose, except that
+    a transcript longer than a complaint may be is diagnosed from its beginning
+    (see _transcript_complaint); the response carries the whole transcript.
+    
+    Args:
+        req: FastAPI request object, read as a stream
+        
+    Returns:
+        VoiceDiagnosisResponse with the transcript and its diagnosis
+        
+    Raises:
+        HTTPException: As /api/transcribe, 422 if the transcript is not a valid
+            complaint, 503 if no diagnosis model is loaded, 504 if the client's
+            deadline passed before transcription or diagnosis started
+    """
+    predictor = _get_predictor(req)
+    text = await _transcribe_upload(req)
+    
+    try:
+        complaint = _transcript_complaint(text)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Transcript is not a valid complaint: {e.errors()[0]['msg']}")
+    
+    _check_deadline(req)
+    try:
+        raw_predictions = await _predict(req, predictor, complaint)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Transcript is not a valid complaint: {e}")
+    issues, suppression_applied = _build_issues(raw_predictions)
+    
+    return VoiceDiagnosisResponse(
+        text=text,
+        diagnosis=DiagnosisResponse(
+            issues=issues,
+            timestamp=datetime.now(timezone.utc),
+            suppression_applied=suppression_applied
+        )
+    )
+
+
+def _transcript_complaint(text: str) -> str:
+    """
+    Validate a transcript as a complaint, keeping at most COMPLAINT_MAX_LENGTH characters.
+    
+    A recording longer than about half a minute transcribes to more text than a
+    typed complaint may hold. Rather than rejecting it after transcribing it
+    all, its beginning is diagnosed, cut at a word boundary.
+    
+    Raises:
+        ValidationError: If the transcript is empty
+    """
+    text = text.strip()
+    if len(text) > COMPLAINT_MAX_LENGTH:
+        head = text[:COMPLAINT_MAX_LENGTH]
+        if not text[COMPLAINT_MAX_LENGTH].isspace() and " " in head:
+            head = head.rsplit(" ", 1)[0]
+        text = head
+    return DiagnosisRequest(complaint=text).complaint
+
+
+async def _score_transcript(websocket: WebSocket, text: str) -> Dict:
+    """
+    Diagnose a (partial) transcript like /api/diagnose does.
+    
+    Returns:
+        JSON-ready DiagnosisResponse
+        
+    Raises:
+        ValueError: If the transcript is not a valid complaint or no model is loaded
+    """
+    predictor = websocket.app.state.predictor
+    if predictor is None:
+        raise ValueError("Model not loaded")
+    try:
+        complaint = _transcript_complaint(text)
+    except ValidationError as e:
+        raise ValueError(e.errors()[0]["msg"])
+    
+    raw_predictions = await _predict(websocket, predictor, complaint)
+    issues, suppression_applied = _build_issues(raw_predictions)
+    return DiagnosisResponse(
+        issues=issues,
+        timestamp=datetime.now(timezone.utc),
+        suppression_applied=suppression_applied
+    ).model_dump(mode="json")
+
+
+@router.websocket("/transcribe/stream")
+async def transcribe_stream(websocket: WebSocket):
+    """
+    Transcribe and diagnose audio while it is being recorded.
+    
+    The client sends audio chunks as binary messages and {"type": "end"} when the
+    recording stops. Partial transcripts are pushed back as they grow and are
+    re-scored (debounced) through the diagnosis pipeline; a final message carries
+    the full transcript and its diagnosis. See VoiceStreamSession for the protocol
+    and the per-stream limits.
+    
+    Args:
+        websocket: WebSocket connection
+    """
+    await websocket.accept()
+    transcriber = websocket.app.state.transcriber
+    streams = websocket.app.state.voice_streams
+    if transcriber is None:
+        await websocket.send_json({"type": "error", "detail": "Transcription is not enabled"})
+        await websocket.close(CLOSE_TRY_AGAIN_LATER)
+        return
+    if not streams.acquire():
+        await websocket.send_json({"type": "error", "detail": "Too many voice streams in progress"})
+        await websocket.close(CLOSE_TRY_AGAIN_LATER)
+        return
+    
+    try:
+        session = VoiceStreamSession(
+            websocket,
+            transcriber,
+            streams,
+            lambda text: _score_transcript(websocket, text),
+            max_bytes=settings.voice_stream_max_bytes,
+            partial_interval=settings.voice_stream_partial_interval_ms / 1000.0,
+            score_interval=settings.voice_stream_score_interval_ms / 1000.0,
+            idle_timeout=settings.voice_stream_idle_timeout_seconds
+        )
+        await session.run()
+    finally:
+        streams.release()
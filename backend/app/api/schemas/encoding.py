@@ -0,0 +1,339 @@
+"""
+Direct JSON encoding of diagnosis responses.
+
+Produces the same bytes FastAPI sends for DiagnosisResponse and
+BatchDiagnosisResponse, and for their explained variants (response_model validation, JSON-mode serialization, then
+JSONResponse's compact json.dumps) without building or re-validating Pydantic
+models. The JSON fragments for each label, severity and suppression flag
+combination are precomputed, so a response is a handful of string joins.
+
+Values the schemas would reject (non-string labels, confidences outside [0, 1],
+NaN, or non-finite term weights) are not encoded; callers then fall back to the Pydantic models, which
+fail exactly as before.
+
+Byte parity with the Pydantic models is tested in tests/test_encoding.py. Check it
+on random responses and measure the speedup with:
+    python -m app.api.schemas.encoding
+"""
+import math
+from datetime import datetime
+from json.encoder import encode_basestring
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Confidence at or above which an issue is reported as critical
+CRITICAL_CONFIDENCE = 0.8
+
+# Labels whose encoded prefix is kept (model classes; bounded in case of odd labels)
+_MAX_CACHED_LABELS = 4096
+
+_label_prefixes: Dict[str, str] = {}
+
+_SEVERITY_SUFFIXES = {
+    True: ',"severity":"critical"}',
+    False: ',"severity":"warning"}',
+}
+
+_SEVERITY_TERMS = {
+    True: ',"severity":"critical","terms":',
+    False: ',"severity":"warning","terms":',
+}
+
+_SUPPRESSION = {
+    (unknown, other): (
+        f'{{"unknown_suppressed":{"true" if unknown else "false"},'
+        f'"other_suppressed":{"true" if other else "false"}}}'
+    )
+    for unknown in (False, True)
+    for other in (False, True)
+}
+
+_float_repr = float.__repr__
+
+
+def _issue_prefix(name: str) -> str:
+    """Return '{"name":<name>,"confidence":' for a label."""
+    prefix = _label_prefixes.get(name)
+    if prefix is None:
+        prefix = '{"name":' + encode_basestring(name) + ',"confidence":'
+        if len(_label_prefixes) < _MAX_CACHED_LABELS:
+            _label_prefixes[name] = prefix
+    return prefix
+
+
+def encode_terms(terms: Sequence[Tuple[str, float]]) -> Optional[str]:
+    """
+    Encode (term, weight) pairs as the JSON list of TermContribution objects.
+    
+    Returns:
+        JSON array text, or None if a weight is not finite
+    """
+    parts = []
+    for term, weight in terms:
+        weight = float(weight)
+        if not math.isfinite(weight):
+            return None
+        parts.append('{"term":' + encode_basestring(term) + ',"weight":' + _float_repr(weight) + "}")
+    return "[" + ",".join(parts) + "]"
+
+
+def encode_issues(predictions: Sequence[Tuple[str, float]],
+                  explanations: Dict[str, Sequence[Tuple[str, float]]] = None) -> Optional[str]:
+    """
+    Encode (label, confidence) pairs as the JSON list of DiagnosedIssue objects.
+    
+    Args:
+        predictions: Final predictions after suppression
+        explanations: Contributing (term, weight) pairs per label; when given, the
+            issues are encoded as ExplainedIssue objects
+            
+    Returns:
+        JSON array text, or None if a value would fail DiagnosedIssue validation
+    """
+    parts = []
+    for name, confidence in predictions:
+        confidence = float(confidence)
+        if not isinstance(name, str) or not 0.0 <= confidence <= 1.0:
+            return None
+        critical = confidence >= CRITICAL_CONFIDENCE
+        if explanations is None:
+            parts.append(_issue_prefix(name) + _float_repr(confidence) + _SEVERITY_SUFFIXES[critical])
+            continue
+        terms = encode_terms(explanations.get(name, ()))
+        if terms is None:
+            return None
+        parts.append(_issue_prefix(name) + _float_repr(confidence) + _SEVERITY_TERMS[critical] + terms + "}")
+    return "[" + ",".join(parts) + "]"
+
+
+def encode_suppression(suppression_info: Dict) -> str:
+    """Encode a suppression info dict as the JSON SuppressionInfo object."""
+    return _SUPPRESSION[(bool(suppression_info["unknown_suppressed"]), bool(suppression_info["other_suppressed"]))]
+
+
+def encode_timestamp(timestamp: datetime) -> str:
+    """
+    Encode an aware UTC datetime as Pydantic's JSON mode does (a quoted ISO 8601 string ending in Z).
+    
+    Args:
+        timestamp: datetime with tzinfo=timezone.utc
+    """
+    return '"' + timestamp.isoformat()[:-6] + 'Z"'
+
+
+def render_diagnosis(predictions: Sequence[Tuple[str, float]], suppression_info: Dict,
+                     timestamp: datetime, explanations: Dict = None) -> Optional[bytes]:
+    """
+    Render a DiagnosisResponse body.
+    
+    Args:
+        predictions: Final predictions after suppression
+        suppression_info: Flags returned by apply_suppression
+        timestamp: UTC time of the diagnosis
+        explanations: Contributing terms per label; renders an ExplainedDiagnosisResponse
+        
+    Returns:
+        JSON bytes, or None when the Pydantic models must be used instead
+    """
+    issues = encode_issues(predictions, explanations)
+    if issues is None:
+        return None
+    return (
+        '{"issues":' + issues
+        + ',"timestamp":' + encode_timestamp(timestamp)
+        + ',"suppression_applied":' + encode_suppression(suppression_info)
+        + "}"
+    ).encode("utf-8")
+
+
+def render_batch(items: List[Tuple[Optional[Sequence[Tuple[str, float]]], Optional[Dict], Optional[str]]],
+                 timestamp: datetime, explanations: List[Optional[Dict]] = None) -> Optional[bytes]:
+    """
+    Render a BatchDiagnosisResponse body.
+    
+    Args:
+        items: One (predictions, suppression_info, error) tuple per complaint, in
+            request order; predictions and suppression_info are None on error
+        timestamp: UTC time of the diagnosis
+        explanations: Contributing terms per label for each item (None on error);
+            renders an ExplainedBatchDiagnosisResponse
+            
+    Returns:
+        JSON bytes, or None when the Pydantic models must be used instead
+    """
+    parts = []
+    failed = 0
+    for index, (predictions, suppression_info, error) in enumerate(items):
+        if error is not None:
+            failed += 1
+            parts.append(
+                f'{{"index":{index},"issues":null,"suppression_applied":null,"error":{encode_basestring(error)}}}'
+            )
+            continue
+        issues = encode_issues(predictions, explanations[index] if explanations is not None else None)
+        if issues is None:
+            return None
+        parts.append(
+            f'{{"index":{index},"issues":{issues},'
+            f'"suppression_applied":{encode_suppression(suppression_info)},"error":null}}'
+        )
+    return (
+        '{"results":[' + ",".join(parts)
+        + f'],"succeeded":{len(items) - failed},"failed":{failed}'
+        + ',"timestamp":' + encode_timestamp(timestamp)
+        + "}"
+    ).encode("utf-8")
+
+
+def main():
+    """Compare the encoder with FastAPI's response_model path on random responses and time both."""
+    import argparse
+    import asyncio
+    import random
+    import time
+    from datetime import timedelta, timezone
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from app.api.schemas.response import (
+        BatchDiagnosisItem,
+        BatchDiagnosisResponse,
+        DiagnosedIssue,
+        DiagnosisResponse,
+        ExplainedBatchDiagnosisItem,
+        ExplainedBatchDiagnosisResponse,
+        ExplainedDiagnosisResponse,
+        ExplainedIssue,
+        SuppressionInfo,
+        TermContribution,
+    )
+    
+    parser = argparse.ArgumentParser(description="Check encoder byte parity and measure its speed")
+    parser.add_argument("--cases", type=int, default=20000, help="Random responses compared")
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    labels = ["AIR BAGS", "UNKNOWN OR OTHER", "ELECTRICAL SYSTEM", "ELECTRONIC STABILITY CONTROL (ESC)",
+              "Chest Clip", "LATCH \"ANCHORS\"", "SIÈGE ENFANT", "tab\there", "ÄÖÜ ✓", "back\\slash"]
+    special = [0.0, 1.0, 0.8, 0.7999999999999999, 1e-05, 3.2e-07, 0.1 + 0.2, 0.5]
+    base_time = datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc)
+    
+    def random_case():
+        predictions = [
+            (rng.choice(labels), rng.choice(special) if rng.random() < 0.2 else rng.random())
+            for _ in range(rng.randint(0, 3))
+        ]
+        info = {"unknown_suppressed": rng.random() < 0.5, "other_suppressed": rng.random() < 0.5}
+        # Whole seconds, whole milliseconds and arbitrary microseconds
+        timestamp = base_time + timedelta(seconds=rng.randint(0, 10 ** 8),
+                                          microseconds=rng.choice([0, 123000, rng.randint(0, 999999)]))
+        return predictions, info, timestamp
+    
+    terms = ["engine", "air bag", "stalls", "won't start", "naïve", "quote\"d"]
+    
+    def random_explanations(predictions):
+        return {
+            name: [(rng.choice(terms), rng.random() / rng.choice([1, 7, 1000])) for _ in range(rng.randint(0, 5))]
+            for name, _ in predictions
+        }
+    
+    def pydantic_issues(predictions, explanations=None):
+        if explanations is not None:
+            return [
+                ExplainedIssue(name=name, confidence=float(confidence),
+                               severity="critical" if confidence >= CRITICAL_CONFIDENCE else "warning",
+                               terms=[TermContribution(term=term, weight=weight) for term, weight in explanations[name]])
+                for name, confidence in predictions
+            ]
+        return [
+            DiagnosedIssue(name=name, confidence=float(confidence),
+                           severity="critical" if confidence >= CRITICAL_CONFIDENCE else "warning")
+            for name, confidence in predictions
+        ]
+    
+    # The routes declare the plain responses; explained ones are serialized as their own model
+    fields = {
+        model: create_response_field(name="response", type_=model)
+        for model in (DiagnosisResponse, ExplainedDiagnosisResponse,
+                      BatchDiagnosisResponse, ExplainedBatchDiagnosisResponse)
+    }
+    
+    async def fastapi_body(model) -> bytes:
+        content = await serialize_response(field=fields[type(model)], response_content=model)
+        return JSONResponse(content).body
+    
+    def pydantic_single(predictions, info, timestamp, explanations=None):
+        model = DiagnosisResponse if explanations is None else ExplainedDiagnosisResponse
+        return model(
+            issues=pydantic_issues(predictions, explanations),
+            timestamp=timestamp,
+            suppression_applied=SuppressionInfo(**info)
+        )
+    
+    async def pydantic_loop(repeat: int) -> float:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await fastapi_body(pydantic_single(predictions, info, base_time))
+        return (time.perf_counter() - started) / repeat
+    
+    mismatches = 0
+    loop = asyncio.new_event_loop()
+    for case in range(args.cases):
+        predictions, info, timestamp = random_case()
+        # Every fourth response is explained
+        explanations = random_explanations(predictions) if case % 4 == 0 else None
+        expected = loop.run_until_complete(
+            fastapi_body(pydantic_single(predictions, info, timestamp, explanations))
+        )
+        if render_diagnosis(predictions, info, timestamp, explanations) != expected:
+            mismatches += 1
+    
+    for case in range(args.cases // 20):
+        explained = case % 4 == 0
+        items = []
+        item_explanations = []
+        for _ in range(rng.randint(1, 20)):
+            predictions, info, timestamp = random_case()
+            error = rng.choice([None, None, "Complaint cannot be empty", "bad \"input\" ✗"])
+            items.append((None, None, error) if error else (predictions, info, None))
+            item_explanations.append(random_explanations(predictions) if explained and not error else None)
+        item_model = ExplainedBatchDiagnosisItem if explained else BatchDiagnosisItem
+        results = [
+            item_model(index=i, error=error) if error else
+            item_model(index=i, issues=pydantic_issues(predictions, item_explanations[i]),
+                       suppression_applied=SuppressionInfo(**info))
+            for i, (predictions, info, error) in enumerate(items)
+        ]
+        failed = sum(1 for _, _, error in items if error)
+        response_model = ExplainedBatchDiagnosisResponse if explained else BatchDiagnosisResponse
+        expected = loop.run_until_complete(fastapi_body(response_model(
+            results=results, succeeded=len(items) - failed, failed=failed, timestamp=timestamp
+        )))
+        if render_batch(items, timestamp, item_explanations if explained else None) != expected:
+            mismatches += 1
+    
+    # Invalid values must be left to the Pydantic models
+    assert render_diagnosis([("ENGINE", float("nan"))], {"unknown_suppressed": False, "other_suppressed": False},
+                            base_time) is None
+    assert render_diagnosis([(7, 0.5)], {"unknown_suppressed": False, "other_suppressed": False}, base_time) is None
+    assert render_diagnosis([("ENGINE", 0.5)], {"unknown_suppressed": False, "other_suppressed": False}, base_time,
+                            {"ENGINE": [("engine", float("inf"))]}) is None
+    
+    predictions = [("ENGINE", 0.91), ("POWER TRAIN", 0.05), ("ELECTRICAL SYSTEM", 0.02)]
+    info = {"unknown_suppressed": False, "other_suppressed": False}
+    repeat = 20000
+    pydantic_seconds = loop.run_until_complete(pydantic_loop(repeat))
+    loop.close()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        render_diagnosis(predictions, info, base_time)
+    direct_seconds = (time.perf_counter() - started) / repeat
+    
+    print(f"Byte mismatches: {mismatches} of {args.cases + args.cases // 20} responses")
+    print(f"Pydantic + response_model: {pydantic_seconds * 1e6:7.2f} us/response")
+    print(f"Direct encoding:           {direct_seconds * 1e6:7.2f} us/response")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
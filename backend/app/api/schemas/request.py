@@ -1,5 +1,9 @@
 """Request schemas for API endpoints."""
 from pydantic import BaseModel, Field, field_validator
+from typing import Any, List
+
+# Longest complaint accepted, in characters
+COMPLAINT_MAX_LENGTH = 500
 
 
 class DiagnosisRequest(BaseModel):
@@ -8,10 +12,15 @@ class DiagnosisRequest(BaseModel):
     complaint: str = Field(
         ...,
         min_length=1,
-        max_length=500,
+        max_length=COMPLAINT_MAX_LENGTH,
         description="Natural language description of the automotive complaint",
         example="Engine is shaking when idling."
     )
+    explain: bool = Field(
+        False,
+        description="Also return the terms that contributed most to each diagnosed issue",
+        example=False
+    )
     
     @field_validator('complaint')
     @classmethod
@@ -22,3 +31,24 @@ class DiagnosisRequest(BaseModel):
             raise ValueError("Complaint cannot be empty")
         return stripped
 
+
+
+class BatchDiagnosisRequest(BaseModel):
+    """Request schema for batch diagnosis endpoint."""
+    
+    # Items are not typed here: a non-string complaint gets its own error
+    # slot in the response instead of a 422 for the whole batch
+    complaints: List[Any] = Field(
+        ...,
+        min_length=1,
+        description=(
+            "Natural language complaints to diagnose. Each item is validated "
+            "individually (including its type) so one bad complaint does not fail the batch."
+        ),
+        example=["Engine is shaking when idling.", "Brakes squeal when stopping."]
+    )
+    explain: bool = Field(
+        False,
+        description="Also return the terms that contributed most to each diagnosed issue",
+        example=False
+    )
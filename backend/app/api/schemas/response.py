@@ -1,7 +1,7 @@
 """Response schemas for API endpoints."""
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Union
 
 
 class DiagnosedIssue(BaseModel):
@@ -26,6 +26,31 @@ class DiagnosedIssue(BaseModel):
     )
 
 
+class TermContribution(BaseModel):
+    """A complaint term and how much it raised the score of an issue."""
+    
+    term: str = Field(
+        ...,
+        description="Vocabulary term (word or word n-gram) found in the cleaned complaint",
+        example="engine"
+    )
+    weight: float = Field(
+        ...,
+        description="Term's tf-idf weight times the issue's model coefficient",
+        example=0.41
+    )
+
+
+class ExplainedIssue(DiagnosedIssue):
+    """Diagnosed issue with the terms that contributed most to it."""
+    
+    terms: List[TermContribution] = Field(
+        ...,
+        description="Terms with a positive contribution, largest first",
+        example=[{"term": "engine", "weight": 0.41}, {"term": "shaking", "weight": 0.18}]
+    )
+
+
 class SuppressionInfo(BaseModel):
     """Information about suppression that was applied."""
     
@@ -75,6 +100,112 @@ class DiagnosisResponse(BaseModel):
     )
 
 
+class ExplainedDiagnosisResponse(DiagnosisResponse):
+    """Response schema for diagnosis endpoint when explain is requested."""
+    
+    issues: List[ExplainedIssue] = Field(
+        ...,
+        description="List of diagnosed issues (top-3 predictions) with their contributing terms"
+    )
+
+
+class BatchDiagnosisItem(BaseModel):
+    """Diagnosis result for a single complaint within a batch."""
+    
+    index: int = Field(
+        ...,
+        ge=0,
+        description="Position of the complaint in the request list",
+        example=0
+    )
+    issues: Optional[List[DiagnosedIssue]] = Field(
+        None,
+        description="List of diagnosed issues (top-3 predictions), absent on error"
+    )
+    suppression_applied: Optional[SuppressionInfo] = Field(
+        None,
+        description="Information about suppression that was applied, absent on error"
+    )
+    error: Optional[str] = Field(
+        None,
+        description="Reason this complaint could not be diagnosed, absent on success",
+        example=None
+    )
+
+
+class BatchDiagnosisResponse(BaseModel):
+    """Response schema for batch diagnosis endpoint."""
+    
+    results: List[BatchDiagnosisItem] = Field(
+        ...,
+        description="Per-complaint results in request order"
+    )
+    succeeded: int = Field(
+        ...,
+        ge=0,
+        description="Number of complaints diagnosed successfully",
+        example=2
+    )
+    failed: int = Field(
+        ...,
+        ge=0,
+        description="Number of complaints that produced an error",
+        example=0
+    )
+    timestamp: datetime = Field(
+        ...,
+        description="ISO8601 timestamp of when diagnosis was performed",
+        example="2024-01-15T10:30:00.123456Z"
+    )
+
+
+class ExplainedBatchDiagnosisItem(BatchDiagnosisItem):
+    """Batch result for a single complaint when explain is requested."""
+    
+    issues: Optional[List[ExplainedIssue]] = Field(
+        None,
+        description="List of diagnosed issues with their contributing terms, absent on error"
+    )
+
+
+class ExplainedBatchDiagnosisResponse(BatchDiagnosisResponse):
+    """Response schema for batch diagnosis endpoint when explain is requested."""
+    
+    results: List[ExplainedBatchDiagnosisItem] = Field(
+        ...,
+        description="Per-complaint results in request order"
+    )
+
+
+class StreamDiagnosisItem(BaseModel):
+    """Diagnosis result for one line of a streamed NDJSON request."""
+    
+    id: Optional[Union[int, str]] = Field(
+        None,
+        description="Client-supplied id echoed from the input line",
+        example="ODI-11234567"
+    )
+    line: int = Field(
+        ...,
+        ge=1,
+        description="Line number of the complaint in the request body (1-based)",
+        example=1
+    )
+    issues: Optional[List[DiagnosedIssue]] = Field(
+        None,
+        description="List of diagnosed issues (top-3 predictions), absent on error"
+    )
+    suppression_applied: Optional[SuppressionInfo] = Field(
+        None,
+        description="Information about suppression that was applied, absent on error"
+    )
+    error: Optional[str] = Field(
+        None,
+        description="Reason this line could not be diagnosed, absent on success",
+        example=None
+    )
+
+
 class TranscriptionResponse(BaseModel):
     """Response schema for transcription endpoint."""
     
@@ -83,3 +214,17 @@ class TranscriptionResponse(BaseModel):
         description="Transcribed text from audio file",
         example="My car engine is making a strange noise when I accelerate"
     )
+
+
+class VoiceDiagnosisResponse(BaseModel):
+    """Response schema for the transcribe-then-diagnose endpoint."""
+    
+    text: str = Field(
+        ...,
+        description="Transcribed text from audio file, diagnosed as the complaint",
+        example="My car engine is making a strange noise when I accelerate"
+    )
+    diagnosis: DiagnosisResponse = Field(
+        ...,
+        description="Diagnosis of the transcribed complaint"
+    )
@@ -14,10 +14,114 @@ class Settings(BaseSettings):
     model_path: str = "artifacts/model.joblib"
     vectorizer_path: str = "artifacts/vectorizer.joblib"
     
+    # Requests run through the diagnose pipeline at startup; /ready reports
+    # not-ready until they finish
+    warmup_enabled: bool = True
+    warmup_batch_size: int = 16
+    
+    # Model hot reload: poll the model files every N seconds (0 disables watching);
+    # POST /admin/reload-model requires a matching X-Admin-Token and is disabled
+    # while admin_token is empty
+    reload_watch_interval_seconds: float = 0.0
+    admin_token: str = ""
+    
+    # Candidate model evaluated next to the serving one: "shadow" scores a sample of
+    # /api/diagnose traffic in the background, "canary" serves a share of it ("off" disables).
+    # An empty candidate_artifacts_dir loads the candidate's joblib files only.
+    candidate_mode: str = "off"
+    candidate_model_path: str = ""
+    candidate_vectorizer_path: str = ""
+    candidate_artifacts_dir: str = ""
+    shadow_sample_rate: float = 0.1
+    shadow_queue_size: int = 256
+    canary_percent: float = 5.0
+    
+    # Exported pickle-free artifacts (preferred over the joblib files when present)
+    artifacts_dir: str = "artifacts/compiled"
+    artifacts_mmap: bool = True
+    verify_artifact_checksums: bool = True
+    
+    # Use the pure-NumPy scoring engine (falls back to sklearn if parity fails)
+    compiled_inference: bool = True
+    
+    # Keep the vocabulary of exported artifacts in memory-mapped arrays shared by all
+    # workers instead of a private dict per worker (the joblib path always uses the dict)
+    compact_vocabulary: bool = True
+    
+    # Precision of the compiled engine's coefficients: "float64" (exact), "float32" or
+    # "int8" (per-class scales); compare them with scripts/evaluation/quantization_report.py
+    inference_precision: str = "float64"
+    
+    # Number of predictions scored per complaint (the API returns the top 3)
+    prediction_top_k: int = 3
+    
+    # Contributing terms returned per issue when a request sets explain
+    explain_top_terms: int = 5
+    
     # Suppression Thresholds
     unknown_suppression_threshold: float = 0.5
     other_suppression_threshold: float = 0.5
     
+    # Batch Diagnosis
+    batch_max_complaints: int = 1000
+    
+    # Streamed NDJSON diagnosis: lines scored per chunk and the longest accepted line
+    stream_chunk_size: int = 256
+    stream_max_line_bytes: int = 16384
+    
+    # Voice transcription backend: "off", "whisper" (needs requirements-voice.txt) or
+    # "stub" (deterministic, no model weights). The speech model is loaded once per
+    # worker process; requests beyond the workers plus max_pending are rejected with 503.
+    transcriber_backend: str = "off"
+    whisper_model: str = "base"
+    whisper_language: str = "en"
+    whisper_device: str = "cpu"
+    whisper_threads: int = 0
+    transcription_stub_latency_ms: float = 0.0
+    transcription_workers: int = 1
+    transcription_max_pending: int = 8
+    transcription_max_upload_bytes: int = 25 * 1024 * 1024
+    
+    # Streamed voice diagnosis over WebSocket (/api/transcribe/stream): concurrent
+    # streams, audio accepted per stream, minimum gaps between partial transcriptions
+    # and between re-scorings of the growing transcript, and seconds a stream may sit
+    # without a client message (or a blocked send) before it is closed
+    voice_stream_max_connections: int = 16
+    voice_stream_max_bytes: int = 10 * 1024 * 1024
+    voice_stream_partial_interval_ms: float = 1000.0
+    voice_stream_score_interval_ms: float = 2000.0
+    voice_stream_idle_timeout_seconds: float = 30.0
+    
+    # Admission control for /api/diagnose, /api/diagnose/batch, /api/diagnose/stream and
+    # /api/transcribe/diagnose: requests running at once (0 = twice the inference workers, times the batch size when micro-batching),
+    # requests waiting for a slot and the longest wait before one is shed. Shed requests
+    # get admission_reject_status (503 or 429) with a Retry-After header.
+    admission_enabled: bool = True
+    admission_max_concurrent: int = 0
+    admission_max_queue: int = 64
+    admission_queue_timeout_ms: float = 1000.0
+    admission_reject_status: int = 503
+    
+    # Inference executor ("inline", "thread" or "process") and pool size
+    inference_executor: str = "thread"
+    inference_workers: int = 4
+    
+    # Micro-batching of concurrent /api/diagnose calls
+    batching_enabled: bool = False
+    batching_window_ms: float = 2.0
+    batching_max_batch_size: int = 64
+    
+    # Prediction cache (keyed on cleaned complaint text and model version)
+    prediction_cache_enabled: bool = True
+    prediction_cache_max_entries: int = 10000
+    prediction_cache_max_bytes: int = 0
+    prediction_cache_ttl_seconds: float = 3600.0
+    
+    # Prometheus /metrics endpoint and per-stage timings; Server-Timing adds the
+    # stage breakdown of each /api/diagnose response as a header
+    metrics_enabled: bool = True
+    server_timing_enabled: bool = False
+    
     # CORS Configuration (accepts "*" or comma-separated list)
     cors_origins: Union[str, List[str]] = "*"
     
@@ -1,47 +1,220 @@
 """FastAPI application entry point."""
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import math
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.core.config import settings
-from app.api.routes import diagnose
+from app.api.routes import admin, diagnose, transcribe
+from app.services.admission import AdmissionController, AdmissionMiddleware
 from app.models.predictor import Predictor, ModelLoadError
+from app.services.batching import MicroBatcher
+from app.services.executor import InferenceExecutor, ModelVersionMismatchError
+from app.services.metrics import MetricsMiddleware, MetricsRegistry
+from app.services.model_manager import ModelManager
+from app.services.prediction_cache import PredictionCache
+from app.services.shadow import CANDIDATE_MODES, CandidateEvaluator
+from app.services.transcription import TRANSCRIBER_BACKENDS, TranscriptionPool
+from app.services.voice_stream import VoiceStreams
 
 import logging
 
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
 # Configure logging
 logging.basicConfig(level=getattr(logging, settings.log_level.upper()))
 logger = logging.getLogger(__name__)
 
 
+async def _warm_up(app: FastAPI):
+    """Warm up the diagnose pipeline in the background, then mark the app ready."""
+    if settings.warmup_enabled:
+        started = time.perf_counter()
+        try:
+            first_prediction_at = await diagnose.warm_up(app, settings.warmup_batch_size)
+        except Exception:
+            logger.exception("Warm-up failed; /ready will keep reporting not ready")
+            return
+        app.state.warmup_seconds = time.perf_counter() - started
+        logger.info(f"Time to first prediction: {(first_prediction_at - _IMPORT_STARTED) * 1000:.0f}ms after app import")
+        logger.info(f"Warm-up finished in {app.state.warmup_seconds * 1000:.0f}ms")
+    app.state.ready = True
+
+
+def _on_model_swap(app: FastAPI, predictor: Predictor):
+    """After a hot reload, record the load time and warm up if the app never became ready."""
+    if app.state.metrics is not None:
+        app.state.metrics.set_model_load_seconds(predictor.load_seconds)
+    if not app.state.ready and (app.state.warmup_task is None or app.state.warmup_task.done()):
+        app.state.warmup_task = asyncio.create_task(_warm_up(app))
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Lifespan context manager for startup and shutdown events.
     Loads ML model on startup and stores it in app.state.
     """
+    logger.info(f"App imports took {_IMPORT_SECONDS * 1000:.0f}ms")
+    app.state.ready = False
+    app.state.warmup_seconds = None
+    app.state.warmup_task = None
+    
+    predictor_kwargs = {
+        "model_path": settings.model_path,
+        "vectorizer_path": settings.vectorizer_path,
+        "artifacts_dir": settings.artifacts_dir,
+    }
+    
     # Startup: Load predictor
     logger.info("Loading ML models...")
     try:
-        predictor = Predictor(
-            model_path=settings.model_path,
-            vectorizer_path=settings.vectorizer_path
-        )
+        predictor = Predictor(**predictor_kwargs)
         app.state.predictor = predictor
-        logger.info(f"Successfully loaded model from {settings.model_path}")
-        logger.info(f"Successfully loaded vectorizer from {settings.vectorizer_path}")
+        if predictor.source == "artifacts":
+            logger.info(f"Successfully loaded exported artifacts from {settings.artifacts_dir}")
+        else:
+            logger.info(f"Successfully loaded model from {settings.model_path}")
+            logger.info(f"Successfully loaded vectorizer from {settings.vectorizer_path}")
+        logger.info(f"Model version: {predictor.model_version} (loaded in {predictor.load_seconds:.2f}s)")
+        if app.state.metrics is not None:
+            app.state.metrics.set_model_load_seconds(predictor.load_seconds)
         logger.info(f"Model supports {len(predictor.classes_)} classes: {list(predictor.classes_)}")
     except ModelLoadError as e:
         logger.error(f"Failed to load models: {e}")
-        logger.error("API will start but /api/diagnose will not work until models are available.")
+        logger.error(
+            "API will start but /api/diagnose will not work until models are available "
+            "(POST /admin/reload-model loads them without a restart)."
+        )
         app.state.predictor = None
     except Exception as e:
         logger.error(f"Unexpected error loading models: {e}")
         app.state.predictor = None
     
+    # Start the executor that keeps CPU-bound inference off the event loop
+    executor = InferenceExecutor(
+        mode=settings.inference_executor,
+        max_workers=settings.inference_workers,
+        predictor_kwargs=predictor_kwargs
+    )
+    await executor.start()
+    app.state.executor = executor
+    logger.info(f"Inference executor: {settings.inference_executor} ({settings.inference_workers} workers)")
+    
+    # Start the micro-batcher that coalesces concurrent single-complaint requests
+    app.state.batcher = None
+    if settings.batching_enabled:
+        batcher = MicroBatcher(
+            max_batch_size=settings.batching_max_batch_size,
+            window_ms=settings.batching_window_ms,
+            executor=executor
+        )
+        await batcher.start()
+        app.state.batcher = batcher
+        logger.info(
+            f"Micro-batching enabled (window={settings.batching_window_ms}ms, "
+            f"max_batch_size={settings.batching_max_batch_size})"
+        )
+    
+    # Cache repeated complaints (entries are tied to the loaded model version)
+    app.state.prediction_cache = None
+    if settings.prediction_cache_enabled:
+        app.state.prediction_cache = PredictionCache(
+            max_entries=settings.prediction_cache_max_entries,
+            max_bytes=settings.prediction_cache_max_bytes,
+            ttl_seconds=settings.prediction_cache_ttl_seconds
+        )
+    
+    # Optional candidate model scored in shadow or served as a canary
+    app.state.candidate_evaluator = None
+    if settings.candidate_mode not in CANDIDATE_MODES:
+        logger.error(f"Unknown CANDIDATE_MODE '{settings.candidate_mode}', expected one of {CANDIDATE_MODES}")
+    elif settings.candidate_mode != "off":
+        if not (settings.candidate_model_path or settings.candidate_artifacts_dir):
+            logger.error("CANDIDATE_MODE is set but neither CANDIDATE_MODEL_PATH nor CANDIDATE_ARTIFACTS_DIR is")
+        else:
+            try:
+                candidate = Predictor(
+                    model_path=settings.candidate_model_path or None,
+                    vectorizer_path=settings.candidate_vectorizer_path or None,
+                    artifacts_dir=settings.candidate_artifacts_dir
+                )
+                evaluator = CandidateEvaluator(
+                    candidate,
+                    executor,
+                    mode=settings.candidate_mode,
+                    sample_rate=settings.shadow_sample_rate,
+                    canary_percent=settings.canary_percent,
+                    queue_size=settings.shadow_queue_size
+                )
+                await evaluator.start()
+                app.state.candidate_evaluator = evaluator
+                logger.info(f"Candidate model {candidate.model_version} loaded in {settings.candidate_mode} mode")
+            except Exception as e:
+                logger.error(f"Failed to load candidate model, continuing without it: {e}")
+    
+    # Speech model for /api/transcribe, loaded once per transcription worker process
+    app.state.transcriber = None
+    app.state.voice_streams = VoiceStreams(settings.voice_stream_max_connections)
+    if settings.transcriber_backend not in TRANSCRIBER_BACKENDS:
+        logger.error(
+            f"Unknown TRANSCRIBER_BACKEND '{settings.transcriber_backend}', expected one of {TRANSCRIBER_BACKENDS}"
+        )
+    elif settings.transcriber_backend != "off":
+        if settings.transcriber_backend == "whisper":
+            options = {
+                "model_name": settings.whisper_model,
+                "language": settings.whisper_language,
+                "device": settings.whisper_device,
+                "threads": settings.whisper_threads,
+            }
+        else:
+            options = {"latency_ms": settings.transcription_stub_latency_ms}
+        transcriber = TranscriptionPool(
+            settings.transcriber_backend,
+            options,
+            max_workers=settings.transcription_workers,
+            max_pending=settings.transcription_max_pending
+        )
+        try:
+            await transcriber.start()
+            app.state.transcriber = transcriber
+        except Exception as e:
+            logger.error(f"Transcription is disabled: {e}")
+            transcriber.shutdown()
+    
+    # Hot reloads swap app.state.predictor; requests keep the predictor they started with
+    app.state.model_manager = ModelManager(
+        app.state,
+        predictor_kwargs,
+        watch_interval_seconds=settings.reload_watch_interval_seconds,
+        on_swap=lambda predictor: _on_model_swap(app, predictor)
+    )
+    await app.state.model_manager.start()
+    
+    # Warm up in the background so /health answers immediately; /ready waits for it
+    if app.state.predictor is not None:
+        app.state.warmup_task = asyncio.create_task(_warm_up(app))
+    
     yield
     
     # Shutdown: Cleanup (if needed)
     logger.info("Shutting down...")
+    if app.state.warmup_task is not None and not app.state.warmup_task.done():
+        app.state.warmup_task.cancel()
+    await app.state.model_manager.stop()
+    if app.state.candidate_evaluator is not None:
+        await app.state.candidate_evaluator.stop()
+    if app.state.batcher is not None:
+        await app.state.batcher.stop()
+    app.state.executor.shutdown()
+    if app.state.transcriber is not None:
+        app.state.transcriber.shutdown()
 
 
 # Create FastAPI application with lifespan
@@ -52,6 +225,38 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Shed diagnose requests beyond what the workers can score (added first so the
+# metrics and CORS middleware also see shed responses). A stream holds its slot
+# until it ends, and a voice diagnosis holds one through its transcription, the
+# most CPU the server spends on a request.
+app.state.admission = None
+if settings.admission_enabled:
+    max_concurrent = settings.admission_max_concurrent
+    if max_concurrent <= 0:
+        max_concurrent = 2 * settings.inference_workers
+        if settings.batching_enabled:
+            max_concurrent *= settings.batching_max_batch_size
+    try:
+        app.state.admission = AdmissionController(
+            max_concurrent=max_concurrent,
+            max_queue=settings.admission_max_queue,
+            queue_timeout_ms=settings.admission_queue_timeout_ms,
+            reject_status=settings.admission_reject_status
+        )
+        app.add_middleware(
+            AdmissionMiddleware,
+            controller=app.state.admission,
+            paths=("/api/diagnose", "/api/diagnose/batch", "/api/diagnose/stream", "/api/transcribe/diagnose")
+        )
+    except ValueError as e:
+        logger.error(f"Admission control is disabled: {e}")
+
+# Request counters and latency histograms, served at /metrics
+app.state.metrics = None
+if settings.metrics_enabled:
+    app.state.metrics = MetricsRegistry()
+    app.add_middleware(MetricsMiddleware, registry=app.state.metrics)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -61,8 +266,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(ModelVersionMismatchError)
+async def model_version_mismatch_handler(request, exc: ModelVersionMismatchError):
+    """
+    Answer 503 when an inference worker finds other model files on disk than the served version.
+    
+    Process-pool workers start on demand, so one started after the files changed
+    cannot load the version the app serves; the request can succeed once the
+    change is reloaded (by the watcher, or POST /admin/reload-model).
+    """
+    logger.warning(f"{request.url.path} could not be scored: {exc}")
+    # The watcher picks a change up within two polls; without it an operator reloads
+    retry_after = settings.reload_watch_interval_seconds * 2 if settings.reload_watch_interval_seconds > 0 else 30
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
 # Register API routes
 app.include_router(diagnose.router)
+app.include_router(transcribe.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -78,9 +304,51 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Health check endpoint (liveness only)."""
     return {
         "status": "healthy",
         "model_loaded": app.state.predictor is not None,
     }
 
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: 503 until the model is loaded and the warm-up has finished."""
+    ready = app.state.ready
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "model_loaded": app.state.predictor is not None,
+            "warmup_ms": app.state.warmup_seconds * 1000 if app.state.warmup_seconds is not None else None,
+        }
+    )
+
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Request, error, in-flight, per-stage latency and model-load metrics in Prometheus text format."""
+    if app.state.metrics is None:
+        return PlainTextResponse("Metrics are disabled\n", status_code=404)
+    return PlainTextResponse(app.state.metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/stats")
+async def runtime_stats():
+    """Runtime statistics for tuning throughput against latency."""
+    batcher = app.state.batcher
+    cache = app.state.prediction_cache
+    evaluator = app.state.candidate_evaluator
+    transcriber = app.state.transcriber
+    admission = app.state.admission
+    return {
+        "executor": app.state.executor.stats(),
+        "admission": admission.stats() if admission is not None else None,
+        "batching": batcher.stats() if batcher is not None else None,
+        "prediction_cache": cache.stats() if cache is not None else None,
+        "model": app.state.model_manager.stats(),
+        "candidate": evaluator.stats() if evaluator is not None else None,
+        "transcription": transcriber.stats() if transcriber is not None else None,
+        "voice_streams": app.state.voice_streams.stats() if transcriber is not None else None,
+    }
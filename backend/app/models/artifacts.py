@@ -0,0 +1,308 @@
+"""
+Pickle-free, memory-mappable model artifacts.
+
+An exported artifact directory holds a manifest plus one version directory
+(v-<timestamp>/) of flat NumPy arrays per export:
+
+    manifest.json       format version, model version, class labels, vectorizer
+                        settings and the path, sha256 checksum, shape and dtype
+                        of every array
+    coef.npy            (n_features, n_classes) coefficients, transposed for row gathers
+                        (float64, or float32 / int8 when exported with --precision)
+    coef_scale.npy      (n_classes,) float32 per-class scales of int8 coefficients (int8 only)
+    intercept.npy       (n_classes,) intercepts
+    idf.npy             (n_features,) idf weights
+    vocab_blob.npy      uint8 UTF-8 bytes of every term, in column order
+    vocab_offsets.npy   (n_features + 1,) int64 start offset of each term in the blob
+    vocab_keys.npy      fixed-width term bytes in hash order (CompactVocabulary index)
+    vocab_hashes.npy    (n_features,) uint64 sorted stable term hashes
+    vocab_columns.npy   (n_features,) int32 column of each hash
+    vocab_buckets.npy   int32 first hash position per hash prefix
+
+Workers load the arrays with np.load(mmap_mode="r"), so N processes share one
+set of physical pages and nothing is unpickled at startup. Exports that predate
+the vocabulary index files still load; the index is then built per process.
+
+Re-exporting into a directory that running workers serve from is safe: arrays
+are never written in place (np.save would truncate files other processes have
+mapped). Each export writes a new version directory, renames it into place and
+then replaces the manifest atomically, so a loader sees either the old or the
+new export, never a mix. The previous version directory is kept for loaders
+that read the old manifest just before the switch; older ones are removed.
+
+Export with:
+    python -m app.models.artifacts --model artifacts/model.joblib \\
+        --vectorizer artifacts/vectorizer.joblib --output artifacts/compiled [--precision int8]
+
+Reduced-precision exports are written as format version 2 so that loaders which
+predate quantized coefficients reject them instead of misreading the arrays.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+from app.models.inference_engine import PRECISIONS, CompiledLinearModel, UnsupportedModelError
+from app.models.vocabulary import CompactVocabulary, unpack_terms
+
+FORMAT_VERSION = 1
+QUANTIZED_FORMAT_VERSION = 2
+MANIFEST_NAME = "manifest.json"
+VERSION_DIR_PREFIX = "v-"
+ARRAY_FILES = ("coef", "intercept", "idf", "vocab_blob", "vocab_offsets")
+OPTIONAL_ARRAY_FILES = ("coef_scale", "vocab_keys", "vocab_hashes", "vocab_columns", "vocab_buckets")
+
+
+class ArtifactError(Exception):
+    """Raised when an exported artifact directory is missing, corrupt or incompatible."""
+    pass
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_artifacts(model, vectorizer, output_dir, model_version: str = None,
+                     precision: str = "float64") -> Dict:
+    """
+    Export a fitted vectorizer and model to the pickle-free format.
+    
+    The model is compiled and parity-checked against sklearn first, so only
+    artifacts the compiled engine reproduces exactly are written.
+    
+    Args:
+        model: Fitted LogisticRegression
+        vectorizer: Fitted TfidfVectorizer
+        output_dir: Directory to write into (created if needed)
+        model_version: Identifier stored in the manifest (defaults to a hash of the arrays)
+        precision: Coefficient precision to store, "float64", "float32" or "int8"
+        
+    Returns:
+        The manifest that was written
+        
+    Raises:
+        UnsupportedModelError: If the model cannot be compiled, fails the parity check
+            or the precision is unknown
+    """
+    engine = CompiledLinearModel.from_sklearn(model, vectorizer)
+    engine.check_parity(model, vectorizer)
+    # Parity is checked at full precision; quantization error is measured by
+    # scripts/evaluation/quantization_report.py
+    engine = engine.with_precision(precision)
+    
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    vocabulary = engine.vocabulary
+    if not isinstance(vocabulary, CompactVocabulary):
+        vocabulary = CompactVocabulary.from_dict(vocabulary)
+    arrays = {
+        "coef": engine.coef_t,
+        "intercept": engine.intercept,
+        "idf": engine.idf,
+        "vocab_blob": vocabulary.blob,
+        "vocab_offsets": vocabulary.offsets,
+        "vocab_keys": vocabulary.keys,
+        "vocab_hashes": vocabulary.hashes,
+        "vocab_columns": vocabulary.columns,
+        "vocab_buckets": vocabulary.buckets,
+    }
+    if engine.coef_scale is not None:
+        arrays["coef_scale"] = engine.coef_scale
+    
+    # Write into a private staging directory and rename it into place when complete
+    created_at = datetime.now(timezone.utc)
+    staging = Path(tempfile.mkdtemp(prefix=".export-", dir=output_dir))
+    try:
+        files = {}
+        for name, array in arrays.items():
+            path = staging / f"{name}.npy"
+            np.save(path, np.ascontiguousarray(array), allow_pickle=False)
+            files[name] = {
+                "file": path.name,
+                "sha256": _sha256_file(path),
+                "shape": list(array.shape),
+                "dtype": str(array.dtype),
+            }
+        version_dir = output_dir / f"{VERSION_DIR_PREFIX}{created_at.strftime('%Y%m%dT%H%M%S%fZ')}"
+        os.rename(staging, version_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    for spec in files.values():
+        spec["file"] = f"{version_dir.name}/{spec['file']}"
+    
+    if model_version is None:
+        combined = hashlib.sha256("".join(files[name]["sha256"] for name in files).encode())
+        model_version = combined.hexdigest()[:12]
+    
+    manifest = {
+        "format_version": FORMAT_VERSION if engine.precision == "float64" else QUANTIZED_FORMAT_VERSION,
+        "model_version": model_version,
+        "precision": engine.precision,
+        "created_at": created_at.isoformat(),
+        "classes": [str(label) for label in engine.classes_],
+        "vectorizer": {
+            "ngram_range": list(engine.ngram_range),
+            "token_pattern": engine.token_pattern,
+            "lowercase": engine.lowercase,
+            "stop_words": sorted(engine.stop_words) if engine.stop_words else None,
+            "sublinear_tf": engine.sublinear_tf,
+            "norm": engine.norm,
+        },
+        "multinomial": engine.multinomial,
+        "files": files,
+    }
+    
+    # Manifest last: a directory without one is never treated as a complete export
+    manifest_path = output_dir / MANIFEST_NAME
+    previous_dir = _manifest_version_dir(manifest_path)
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    tmp_path.replace(manifest_path)
+    
+    # Workers that still map a removed version keep their pages until they unmap them
+    for path in output_dir.glob(f"{VERSION_DIR_PREFIX}*"):
+        if path.is_dir() and path.name not in (version_dir.name, previous_dir):
+            shutil.rmtree(path, ignore_errors=True)
+    return manifest
+
+
+def _manifest_version_dir(manifest_path: Path):
+    """Return the version directory an existing manifest points to, or None."""
+    try:
+        files = json.loads(manifest_path.read_text())["files"]
+        return Path(next(iter(files.values()))["file"]).parent.name or None
+    except (OSError, ValueError, KeyError, TypeError, StopIteration):
+        return None
+
+
+def has_artifacts(directory) -> bool:
+    """Return True if directory contains an exported manifest."""
+    return (Path(directory) / MANIFEST_NAME).is_file()
+
+
+def load_artifacts(directory, mmap: bool = True, verify_checksums: bool = True,
+                   compact_vocabulary: bool = True) -> Tuple[CompiledLinearModel, Dict]:
+    """
+    Load an exported artifact directory into a CompiledLinearModel.
+    
+    Args:
+        directory: Directory written by export_artifacts
+        mmap: Memory-map the arrays read-only instead of reading them into private memory
+        verify_checksums: Check every array file against its manifest sha256
+        compact_vocabulary: Keep the vocabulary as a CompactVocabulary over the mapped
+            arrays instead of decoding it into a private term -> column dict
+            
+    Returns:
+        Tuple of (engine, manifest)
+        
+    Raises:
+        ArtifactError: If the manifest is missing, of an unknown version, or a file is corrupt
+    """
+    directory = Path(directory)
+    manifest_path = directory / MANIFEST_NAME
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"Cannot read artifact manifest {manifest_path}: {e}") from e
+    
+    if manifest.get("format_version") not in (FORMAT_VERSION, QUANTIZED_FORMAT_VERSION):
+        raise ArtifactError(
+            f"Unsupported artifact format version {manifest.get('format_version')} "
+            f"(expected {FORMAT_VERSION} or {QUANTIZED_FORMAT_VERSION})"
+        )
+    
+    arrays = {}
+    for name in ARRAY_FILES + OPTIONAL_ARRAY_FILES:
+        spec = manifest["files"].get(name)
+        if spec is None:
+            if name in OPTIONAL_ARRAY_FILES:
+                continue
+            raise ArtifactError(f"Manifest does not list '{name}'")
+        path = directory / spec["file"]
+        if not path.is_file():
+            raise ArtifactError(f"Artifact file not found: {path}")
+        if verify_checksums and _sha256_file(path) != spec["sha256"]:
+            raise ArtifactError(f"Checksum mismatch for {path}")
+        
+        array = np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+        if list(array.shape) != spec["shape"] or str(array.dtype) != spec["dtype"]:
+            raise ArtifactError(f"Shape/dtype mismatch for {path}")
+        arrays[name] = array
+    
+    if compact_vocabulary:
+        vocabulary = CompactVocabulary(
+            arrays["vocab_blob"],
+            arrays["vocab_offsets"],
+            keys=arrays.get("vocab_keys"),
+            hashes=arrays.get("vocab_hashes"),
+            columns=arrays.get("vocab_columns"),
+            buckets=arrays.get("vocab_buckets"),
+        )
+    else:
+        terms = unpack_terms(arrays["vocab_blob"], arrays["vocab_offsets"])
+        vocabulary = {term: column for column, term in enumerate(terms)}
+    
+    config = manifest["vectorizer"]
+    stop_words = config.get("stop_words")
+    try:
+        engine = CompiledLinearModel(
+            vocabulary=vocabulary,
+            idf=arrays["idf"],
+            coef=arrays["coef"].T,
+            intercept=arrays["intercept"],
+            classes=np.array(manifest["classes"]),
+            ngram_range=tuple(config["ngram_range"]),
+            token_pattern=config["token_pattern"],
+            lowercase=config["lowercase"],
+            stop_words=frozenset(stop_words) if stop_words else None,
+            sublinear_tf=config["sublinear_tf"],
+            norm=config["norm"],
+            multinomial=manifest["multinomial"],
+            coef_scale=arrays.get("coef_scale"),
+        )
+    except UnsupportedModelError as e:
+        raise ArtifactError(f"Incompatible artifacts in {directory}: {e}") from e
+    return engine, manifest
+
+
+def main():
+    """Export joblib model files to the pickle-free artifact format."""
+    parser = argparse.ArgumentParser(description="Export model.joblib/vectorizer.joblib to mmap-able artifacts")
+    parser.add_argument("--model", required=True, help="Path to model.joblib")
+    parser.add_argument("--vectorizer", required=True, help="Path to vectorizer.joblib")
+    parser.add_argument("--output", required=True, help="Output artifact directory")
+    parser.add_argument("--precision", choices=PRECISIONS, default="float64",
+                        help="Coefficient precision to store (default: float64)")
+    args = parser.parse_args()
+    
+    import joblib
+    from app.models.predictor import _fingerprint_files
+    
+    model = joblib.load(args.model)
+    vectorizer = joblib.load(args.vectorizer)
+    model_version = _fingerprint_files(Path(args.model), Path(args.vectorizer))
+    if args.precision != "float64":
+        model_version = f"{model_version}-{args.precision}"
+    
+    manifest = export_artifacts(model, vectorizer, args.output, model_version=model_version,
+                                precision=args.precision)
+    print(f"Exported model version {manifest['model_version']} ({manifest['precision']}) to {args.output}")
+    for name, spec in manifest["files"].items():
+        print(f"  {spec['file']:<20} {spec['dtype']:<8} {tuple(spec['shape'])}")
+
+
+if __name__ == "__main__":
+    main()
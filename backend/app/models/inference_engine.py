@@ -0,0 +1,474 @@
+"""Pure-NumPy scoring kernel for TF-IDF + linear (logistic regression) models."""
+import re
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.models.vocabulary import CompactVocabulary
+
+# Complaint-like texts (already cleaned) used to check the engine against sklearn.
+# They cover repeated tokens, out-of-vocabulary words, punctuation, digits and
+# single-character tokens that the default token pattern drops.
+PARITY_CORPUS = (
+    "engine is shaking when idling.",
+    "the vehicle experienced engine failure while driving on the highway.",
+    "air bag warning light came on and the air bags did not deploy in the crash.",
+    "brakes squeal when stopping and the brake pedal goes to the floor.",
+    "steering wheel locked up, power steering pump failed at 45 mph.",
+    "transmission slips between 2nd and 3rd gear; dealer could not duplicate.",
+    "the seat belt would not latch. the seat belt retractor is broken!",
+    "electrical system: battery drains overnight, radio and dash lights flicker.",
+    "fuel leak from the fuel tank, strong smell of gasoline in the cabin.",
+    "car car car car stalled stalled stalled",
+    "a b c d e f g",
+    "zzzqx unknownword qqqxyz",
+    "recall 15v123000 was not performed by the dealer",
+    "the vehicle's abs light illuminated and traction control was disabled.",
+    "while parked the vehicle caught fire in the engine compartment.",
+)
+
+
+# Coefficient precisions, from exact to smallest
+PRECISIONS = ("float64", "float32", "int8")
+
+
+class UnsupportedModelError(ValueError):
+    """Raised when a model/vectorizer configuration cannot be compiled."""
+    pass
+
+
+def quantize_coefficients(coef_t: np.ndarray, precision: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Convert a (n_features, n_classes) float coefficient matrix to a lower precision.
+    
+    int8 uses one symmetric scale per class: coef[:, j] is stored as
+    round(coef[:, j] / scale[j]) with scale[j] = max |coef[:, j]| / 127.
+    
+    Args:
+        coef_t: Transposed coefficients
+        precision: "float64", "float32" or "int8"
+        
+    Returns:
+        Tuple (coefficients, per-class scales or None when not quantized to int8)
+        
+    Raises:
+        UnsupportedModelError: If the precision is unknown
+    """
+    if precision == "float64":
+        return np.ascontiguousarray(coef_t, dtype=np.float64), None
+    if precision == "float32":
+        return np.ascontiguousarray(coef_t, dtype=np.float32), None
+    if precision != "int8":
+        raise UnsupportedModelError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+    
+    coef_t = np.asarray(coef_t, dtype=np.float64)
+    scale = np.abs(coef_t).max(axis=0) / 127.0
+    scale[scale == 0.0] = 1.0
+    quantized = np.rint(coef_t / scale)
+    np.clip(quantized, -127, 127, out=quantized)
+    return np.ascontiguousarray(quantized, dtype=np.int8), scale.astype(np.float32)
+
+
+class CompiledLinearModel:
+    """
+    TF-IDF vectorization and linear scoring implemented directly on flat arrays.
+    
+    Holds the vocabulary, idf weights, a (n_features, n_classes) coefficient matrix
+    and intercepts, and reproduces TfidfVectorizer.transform followed by
+    LogisticRegression.predict_proba without sklearn's per-call validation.
+    The vocabulary is either a plain dict or a CompactVocabulary.
+    
+    The coefficients may be held at reduced precision (see with_precision): as
+    float32, or as int8 with a float32 scale per class. Tf-idf weights are then
+    computed in float32 as well; decision scores and probabilities stay float64.
+    """
+    
+    def __init__(
+        self,
+        vocabulary: Union[Dict[str, int], CompactVocabulary],
+        idf: np.ndarray,
+        coef: np.ndarray,
+        intercept: np.ndarray,
+        classes: np.ndarray,
+        ngram_range: Tuple[int, int] = (1, 1),
+        token_pattern: str = r"(?u)\b\w\w+\b",
+        lowercase: bool = True,
+        stop_words: Optional[frozenset] = None,
+        sublinear_tf: bool = False,
+        norm: Optional[str] = "l2",
+        multinomial: bool = True,
+        coef_scale: Optional[np.ndarray] = None,
+    ):
+        """
+        Initialize the engine from raw arrays.
+        
+        Args:
+            vocabulary: Mapping from term to column index (dict or CompactVocabulary)
+            idf: Inverse document frequency per column (ones when idf is disabled)
+            coef: Coefficient matrix of shape (n_classes, n_features), or (1, n_features) for binary models
+            intercept: Intercepts of shape (n_classes,), or (1,) for binary models
+            classes: Class labels in model order
+            ngram_range: (min_n, max_n) word n-gram range
+            token_pattern: Regular expression selecting tokens
+            lowercase: Whether to lowercase text before tokenizing
+            stop_words: Terms removed before building n-grams
+            sublinear_tf: Whether term frequencies are replaced by 1 + log(tf)
+            norm: Row normalization, "l2", "l1" or None
+            multinomial: Softmax probabilities when True, one-vs-rest normalization otherwise
+            coef_scale: Per-class scales of int8 coefficients (required for int8, None otherwise)
+        """
+        if norm not in ("l2", "l1", None):
+            raise UnsupportedModelError(f"Unsupported norm: {norm}")
+        
+        self.vocabulary = vocabulary
+        # Transposed so one request gathers contiguous rows for its nonzero columns
+        self.coef_t = np.ascontiguousarray(np.asarray(coef).T)
+        if self.coef_t.dtype == np.int8:
+            if coef_scale is None:
+                raise UnsupportedModelError("int8 coefficients need per-class scales")
+            self.precision = "int8"
+        elif self.coef_t.dtype == np.float32:
+            self.precision = "float32"
+        else:
+            self.coef_t = np.ascontiguousarray(self.coef_t, dtype=np.float64)
+            self.precision = "float64"
+        self.coef_scale = None if coef_scale is None else np.ascontiguousarray(coef_scale, dtype=np.float32)
+        self._dtype = np.float64 if self.precision == "float64" else np.float32
+        self.idf = np.ascontiguousarray(idf, dtype=self._dtype)
+        self.intercept = np.ascontiguousarray(intercept, dtype=np.float64)
+        self.classes_ = classes
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+        self.stop_words = stop_words
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+        self.multinomial = multinomial
+        self.token_pattern = token_pattern
+        self._token_pattern = re.compile(token_pattern)
+        self._terms: Optional[np.ndarray] = None
+        
+        if self._token_pattern.groups > 1:
+            raise UnsupportedModelError("Token pattern must have at most one capturing group")
+        if self.coef_t.shape[0] != self.idf.shape[0]:
+            raise UnsupportedModelError(
+                f"Coefficient features ({self.coef_t.shape[0]}) do not match vocabulary ({self.idf.shape[0]})"
+            )
+        if self.coef_scale is not None and self.coef_scale.shape != (self.coef_t.shape[1],):
+            raise UnsupportedModelError("Coefficient scales must have one value per coefficient column")
+    
+    def with_precision(self, precision: str) -> "CompiledLinearModel":
+        """
+        Return an engine holding the coefficients at a reduced precision.
+        
+        The vocabulary and vectorizer settings are shared with this engine.
+        
+        Args:
+            precision: "float64", "float32" or "int8"
+            
+        Returns:
+            This engine when it already has that precision, otherwise a new one
+            
+        Raises:
+            UnsupportedModelError: If the precision is unknown or higher than this
+                engine's (quantized coefficients cannot be restored)
+        """
+        if precision not in PRECISIONS:
+            raise UnsupportedModelError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+        if precision == self.precision:
+            return self
+        if PRECISIONS.index(precision) < PRECISIONS.index(self.precision):
+            raise UnsupportedModelError(f"Cannot raise {self.precision} coefficients to {precision}")
+        
+        coef_t, coef_scale = quantize_coefficients(self.dense_coef_t(), precision)
+        return CompiledLinearModel(
+            vocabulary=self.vocabulary,
+            idf=self.idf,
+            coef=coef_t.T,
+            intercept=self.intercept,
+            classes=self.classes_,
+            ngram_range=self.ngram_range,
+            token_pattern=self.token_pattern,
+            lowercase=self.lowercase,
+            stop_words=self.stop_words,
+            sublinear_tf=self.sublinear_tf,
+            norm=self.norm,
+            multinomial=self.multinomial,
+            coef_scale=coef_scale,
+        )
+    
+    def dense_coef_t(self) -> np.ndarray:
+        """Return the (n_features, n_classes) coefficients as float64, dequantizing int8."""
+        if self.coef_scale is not None:
+            return self.coef_t * self.coef_scale.astype(np.float64)
+        return self.coef_t.astype(np.float64, copy=False)
+    
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the coefficient, scale, intercept and idf arrays."""
+        arrays = (self.coef_t, self.coef_scale, self.intercept, self.idf)
+        return sum(array.nbytes for array in arrays if array is not None)
+    
+    @classmethod
+    def from_sklearn(cls, model, vectorizer, compact_vocabulary: bool = False) -> "CompiledLinearModel":
+        """
+        Compile a fitted TfidfVectorizer and linear classifier.
+        
+        Args:
+            model: Fitted LogisticRegression (or compatible linear classifier)
+            vectorizer: Fitted TfidfVectorizer
+            compact_vocabulary: Store the vocabulary as a CompactVocabulary instead of a dict
+            
+        Returns:
+            CompiledLinearModel equivalent to the sklearn pipeline
+            
+        Raises:
+            UnsupportedModelError: If any setting is not reproduced by the engine
+        """
+        params = vectorizer.get_params()
+        if params.get("analyzer") != "word":
+            raise UnsupportedModelError(f"Unsupported analyzer: {params.get('analyzer')}")
+        for name in ("tokenizer", "preprocessor", "strip_accents"):
+            if params.get(name) is not None:
+                raise UnsupportedModelError(f"Unsupported vectorizer option: {name}")
+        if params.get("input", "content") != "content" or params.get("binary"):
+            raise UnsupportedModelError("Only content input without binary counts is supported")
+        if not all(hasattr(model, attr) for attr in ("coef_", "intercept_", "classes_")):
+            raise UnsupportedModelError("Model is not a fitted linear classifier")
+        
+        stop_words = vectorizer.get_stop_words()
+        idf = vectorizer.idf_ if params.get("use_idf", True) else np.ones(len(vectorizer.vocabulary_))
+        if compact_vocabulary:
+            vocabulary = CompactVocabulary.from_dict(vectorizer.vocabulary_)
+        else:
+            vocabulary = dict(vectorizer.vocabulary_)
+        
+        return cls(
+            vocabulary=vocabulary,
+            idf=idf,
+            coef=model.coef_,
+            intercept=model.intercept_,
+            classes=model.classes_,
+            ngram_range=params.get("ngram_range", (1, 1)),
+            token_pattern=params.get("token_pattern"),
+            lowercase=params.get("lowercase", True),
+            stop_words=frozenset(stop_words) if stop_words else None,
+            sublinear_tf=params.get("sublinear_tf", False),
+            norm=params.get("norm", "l2"),
+            multinomial=_is_multinomial(model),
+        )
+    
+    def analyze(self, text: str) -> List[str]:
+        """Split text into the word n-gram features the vectorizer would produce."""
+        if self.lowercase:
+            text = text.lower()
+        tokens = self._token_pattern.findall(text)
+        if self.stop_words is not None:
+            tokens = [w for w in tokens if w not in self.stop_words]
+        
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+        
+        original_tokens = tokens
+        if min_n == 1:
+            tokens = list(original_tokens)
+            min_n += 1
+        else:
+            tokens = []
+        n_original_tokens = len(original_tokens)
+        space_join = " ".join
+        for n in range(min_n, min(max_n + 1, n_original_tokens + 1)):
+            for i in range(n_original_tokens - n + 1):
+                tokens.append(space_join(original_tokens[i: i + n]))
+        return tokens
+    
+    def lookup(self, features: List[str]) -> np.ndarray:
+        """Map features to columns, -1 for features outside the vocabulary."""
+        if isinstance(self.vocabulary, CompactVocabulary):
+            return self.vocabulary.lookup_many(features)
+        vocabulary_get = self.vocabulary.get
+        return np.fromiter((vocabulary_get(f, -1) for f in features), dtype=np.int64, count=len(features))
+    
+    def term(self, column: int) -> str:
+        """Return the feature (term or n-gram) of a column."""
+        return self.terms([column])[0]
+    
+    def terms(self, columns: Sequence[int]) -> List[str]:
+        """Return the features (terms or n-grams) of many columns at once."""
+        if isinstance(self.vocabulary, CompactVocabulary):
+            return self.vocabulary.terms(columns)
+        if self._terms is None:
+            # Inverted once, on the first explanation
+            terms = np.empty(len(self.vocabulary), dtype=object)
+            for feature, index in self.vocabulary.items():
+                terms[index] = feature
+            self._terms = terms
+        return self._terms[np.asarray(columns, dtype=np.int64)].tolist()
+    
+    def transform(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Vectorize texts into CSR arrays of tf-idf weights.
+        
+        Args:
+            texts: Cleaned texts
+            
+        Returns:
+            Tuple (indptr, indices, data) describing a CSR matrix of shape
+            (len(texts), n_features)
+        """
+        n_texts = len(texts)
+        n_features = self.idf.shape[0]
+        features = [self.analyze(text) for text in texts]
+        columns = self.lookup(list(chain.from_iterable(features)))
+        
+        # Count (row, column) pairs: sort the pair keys and measure each run of equal keys
+        rows = np.repeat(np.arange(n_texts, dtype=np.int64), [len(row) for row in features])
+        known = columns >= 0
+        keys = rows[known] * n_features + columns[known]
+        keys.sort()
+        run_boundaries = np.ones(keys.shape[0], dtype=bool)
+        np.not_equal(keys[1:], keys[:-1], out=run_boundaries[1:])
+        run_starts = np.flatnonzero(run_boundaries)
+        counts = np.diff(run_starts, append=keys.shape[0])
+        keys = keys[run_starts]
+        
+        indptr = np.zeros(n_texts + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // n_features, minlength=n_texts), out=indptr[1:])
+        indices = keys % n_features
+        data = counts.astype(self._dtype)
+        
+        if self.sublinear_tf:
+            np.log(data, out=data)
+            data += 1.0
+        data *= self.idf[indices]
+        
+        if self.norm is not None and data.size:
+            if self.norm == "l2":
+                norms = np.sqrt(_row_sums(data * data, indptr))
+            else:
+                norms = _row_sums(np.abs(data), indptr)
+            norms[norms == 0.0] = 1.0
+            data /= np.repeat(norms, np.diff(indptr))
+        
+        return indptr, indices, data
+    
+    def term_contributions(self, indices: np.ndarray, data: np.ndarray) -> np.ndarray:
+        """
+        Multiply each nonzero tf-idf weight with its coefficients.
+        
+        Returns:
+            Array of shape (nnz, n_columns), before the coef_scale of int8
+            coefficients; summed over the nonzeros of a text, they give its
+            decision scores without the intercept
+        """
+        # int8 coefficients are promoted to float32 by the multiplication
+        return self.coef_t[indices] * data[:, None]
+    
+    def decision_function(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray,
+                          contributions: np.ndarray = None) -> np.ndarray:
+        """
+        Compute X @ coef.T + intercept for CSR arrays produced by transform().
+        
+        contributions are term_contributions(indices, data) when the caller
+        already has them (to explain the scores as well).
+        """
+        if contributions is None:
+            contributions = self.term_contributions(indices, data)
+        scores = _row_sums(contributions, indptr)
+        if self.coef_scale is not None:
+            scores *= self.coef_scale
+        scores += self.intercept
+        return scores
+    
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Return class probabilities for cleaned texts, like model.predict_proba(vectorizer.transform(texts)).
+        
+        Args:
+            texts: Cleaned texts
+            
+        Returns:
+            Array of shape (len(texts), n_classes)
+        """
+        scores = self.decision_function(*self.transform(texts))
+        return self.probabilities_from_scores(scores)
+    
+    def probabilities_from_scores(self, scores: np.ndarray) -> np.ndarray:
+        """Turn decision scores into probabilities the way LogisticRegression does."""
+        if scores.shape[1] == 1:
+            # Binary model: a single decision column for the positive class
+            if self.multinomial:
+                scores = np.hstack([-scores, scores])
+            else:
+                positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+                return np.column_stack([1.0 - positive, positive])
+        
+        if self.multinomial:
+            scores = scores - scores.max(axis=1, keepdims=True)
+            np.exp(scores, out=scores)
+        else:
+            scores = 1.0 / (1.0 + np.exp(-scores))
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+    
+    def check_parity(self, model, vectorizer, corpus: Sequence[str] = None, atol: float = 1e-9) -> float:
+        """
+        Compare engine probabilities with sklearn's on a corpus.
+        
+        Args:
+            model: The sklearn model the engine was compiled from
+            vectorizer: The sklearn vectorizer the engine was compiled from
+            corpus: Cleaned texts to compare on (defaults to PARITY_CORPUS plus vocabulary samples)
+            atol: Maximum allowed absolute probability difference
+            
+        Returns:
+            Maximum absolute difference observed
+            
+        Raises:
+            UnsupportedModelError: If any probability differs by more than atol
+        """
+        if corpus is None:
+            corpus = list(PARITY_CORPUS) + self._vocabulary_samples()
+        
+        expected = model.predict_proba(vectorizer.transform(corpus))
+        actual = self.predict_proba(corpus)
+        if expected.shape != actual.shape:
+            raise UnsupportedModelError(f"Shape mismatch: sklearn {expected.shape}, engine {actual.shape}")
+        
+        max_diff = float(np.max(np.abs(expected - actual))) if expected.size else 0.0
+        if not max_diff <= atol:
+            raise UnsupportedModelError(f"Parity check failed: max probability difference {max_diff:.3e} > {atol:.0e}")
+        return max_diff
+    
+    def _vocabulary_samples(self, n_docs: int = 32, terms_per_doc: int = 24) -> List[str]:
+        """Build deterministic documents from evenly spaced vocabulary terms."""
+        terms = sorted(self.vocabulary)
+        if not terms:
+            return []
+        step = max(1, len(terms) // (n_docs * terms_per_doc))
+        sampled = terms[::step][:n_docs * terms_per_doc]
+        return [
+            " ".join(sampled[i: i + terms_per_doc] + sampled[i: i + 2])
+            for i in range(0, len(sampled), terms_per_doc)
+        ]
+
+
+def _is_multinomial(model) -> bool:
+    """Mirror LogisticRegression.predict_proba's choice between softmax and one-vs-rest."""
+    multi_class = getattr(model, "multi_class", "auto")
+    if multi_class in ("ovr", "warn"):
+        return False
+    if multi_class == "multinomial":
+        return True
+    return len(model.classes_) > 2 and getattr(model, "solver", "lbfgs") != "liblinear"
+
+
+def _row_sums(values: np.ndarray, indptr: np.ndarray) -> np.ndarray:
+    """Sum values per CSR row, returning zeros for empty rows."""
+    n_rows = indptr.shape[0] - 1
+    sums = np.zeros((n_rows,) + values.shape[1:], dtype=np.float64)
+    non_empty = np.flatnonzero(np.diff(indptr))
+    if non_empty.size:
+        sums[non_empty] = np.add.reduceat(values, indptr[non_empty], axis=0)
+    return sums
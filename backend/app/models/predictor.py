@@ -1,10 +1,22 @@
 """ML Model Predictor for loading and using trained TF-IDF + Logistic Regression model."""
-import joblib
+import hashlib
+import logging
+import time
 import numpy as np
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 from app.preprocessing.text_cleaner import clean_text
 from app.core.config import settings
+from app.models.inference_engine import PRECISIONS, CompiledLinearModel, UnsupportedModelError
+from app.models.artifacts import MANIFEST_NAME, ArtifactError, has_artifacts, load_artifacts
+
+logger = logging.getLogger(__name__)
+
+# Label that apply_suppression may demote in favour of the next prediction
+UNKNOWN_LABEL = "UNKNOWN OR OTHER"
+
+# Terms contributing to a label, largest contribution first
+Explanation = List[Tuple[str, float]]
 
 
 class ModelLoadError(Exception):
@@ -12,27 +24,114 @@ class ModelLoadError(Exception):
     pass
 
 
+def _fingerprint_files(*paths: Path) -> str:
+    """Short content hash identifying a set of artifact files."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
 class Predictor:
     """ML model predictor that loads and uses trained TF-IDF vectorizer and Logistic Regression model."""
     
-    def __init__(self, model_path: str = None, vectorizer_path: str = None):
+    def __init__(self, model_path: str = None, vectorizer_path: str = None, artifacts_dir: str = None):
         """
         Initialize predictor by loading model and vectorizer from disk.
         
+        Exported pickle-free artifacts (see app.models.artifacts) are preferred when
+        artifacts_dir contains a manifest; otherwise the joblib files are loaded.
+        
         Args:
             model_path: Path to model.joblib file (defaults to settings.model_path)
             vectorizer_path: Path to vectorizer.joblib file (defaults to settings.vectorizer_path)
-            
+            artifacts_dir: Path to an exported artifact directory (defaults to settings.artifacts_dir;
+                an empty string loads the joblib files only)
+                
         Raises:
             ModelLoadError: If model files are missing or cannot be loaded
         """
+        started = time.perf_counter()
         self.model_path = model_path or settings.model_path
         self.vectorizer_path = vectorizer_path or settings.vectorizer_path
+        self.artifacts_dir = settings.artifacts_dir if artifacts_dir is None else artifacts_dir
         self.model = None
         self.vectorizer = None
         self.classes_ = None
+        self.engine = None
+        self.model_version = None
+        self.source = None
+        self.precision = "float64"
+        self.load_seconds = None
+        
+        if not self._load_exported_artifacts():
+            self._load_models()
+            self.source = "joblib"
+            if settings.compiled_inference:
+                self.engine = self._compile_engine()
+        self._apply_precision(settings.inference_precision)
+        
+        self._has_unknown = UNKNOWN_LABEL in set(self.classes_)
         
-        self._load_models()
+        # Built on the first explanation
+        self._coef_t: Optional[np.ndarray] = None
+        self._feature_names: Optional[np.ndarray] = None
+        self.load_seconds = time.perf_counter() - started
+    
+    @property
+    def init_kwargs(self) -> dict:
+        """Arguments that recreate this predictor in another process."""
+        return {
+            "model_path": self.model_path,
+            "vectorizer_path": self.vectorizer_path,
+            "artifacts_dir": self.artifacts_dir,
+        }
+    
+    def _load_exported_artifacts(self) -> bool:
+        """
+        Load memory-mapped, pickle-free artifacts if they were exported.
+        
+        Returns:
+            True if artifacts were loaded, False if none exist, they are unusable or
+            the joblib files are newer than the export (the caller then falls back
+            to the joblib files)
+        """
+        if not self.artifacts_dir:
+            return False
+        
+        backend_dir = Path(__file__).parent.parent.parent
+        artifacts_full_path = backend_dir / self.artifacts_dir
+        if not has_artifacts(artifacts_full_path):
+            return False
+        
+        # A model retrained after the export would otherwise never be served
+        manifest_mtime = (artifacts_full_path / MANIFEST_NAME).stat().st_mtime_ns
+        for path in (backend_dir / self.model_path, backend_dir / self.vectorizer_path):
+            if path.exists() and path.stat().st_mtime_ns > manifest_mtime:
+                logger.warning(
+                    f"{path} is newer than the export in {artifacts_full_path}; loading the joblib files "
+                    f"instead (re-export with python -m app.models.artifacts to serve from artifacts again)"
+                )
+                return False
+        
+        try:
+            engine, manifest = load_artifacts(
+                artifacts_full_path,
+                mmap=settings.artifacts_mmap,
+                verify_checksums=settings.verify_artifact_checksums,
+                compact_vocabulary=settings.compact_vocabulary
+            )
+        except (ArtifactError, UnsupportedModelError, KeyError) as e:
+            logger.error(f"Exported artifacts in {artifacts_full_path} are unusable, falling back to joblib: {e}")
+            return False
+        
+        self.engine = engine
+        self.classes_ = engine.classes_
+        self.model_version = manifest["model_version"]
+        self.source = "artifacts"
+        return True
     
     def _load_models(self):
         """Load model and vectorizer from disk."""
@@ -54,8 +153,10 @@ class Predictor:
                 f"Please ensure vectorizer.joblib is placed in the artifacts directory."
             )
         
-        # Load model and vectorizer
+        # Load model and vectorizer (joblib, and sklearn through unpickling, are only
+        # imported on this path; exported artifacts need neither)
         try:
+            import joblib
             self.model = joblib.load(model_full_path)
             self.vectorizer = joblib.load(vectorizer_full_path)
             
@@ -65,25 +166,324 @@ class Predictor:
             else:
                 raise ModelLoadError("Loaded model does not have 'classes_' attribute.")
             
+            # Identify this exact model for caches, responses and logs
+            self.model_version = _fingerprint_files(model_full_path, vectorizer_full_path)
+        
         except Exception as e:
             raise ModelLoadError(
                 f"Error loading model files: {str(e)}. "
                 f"Please ensure the files are valid joblib files."
             ) from e
     
-    def predict(self, text: str) -> List[Tuple[str, float]]:
+    def _compile_engine(self):
+        """
+        Build the pure-NumPy scoring engine and verify it against sklearn.
+        
+        Returns:
+            CompiledLinearModel, or None when the model cannot be compiled or its
+            probabilities do not match sklearn's (sklearn is then used for scoring)
+        """
+        try:
+            # The vectorizer's dict is loaded anyway; compact arrays would only add to it
+            engine = CompiledLinearModel.from_sklearn(self.model, self.vectorizer)
+            max_diff = engine.check_parity(self.model, self.vectorizer)
+        except UnsupportedModelError as e:
+            logger.warning(f"Compiled inference disabled, falling back to sklearn: {e}")
+            return None
+        except Exception as e:
+            logger.warning(f"Compiled inference failed to build, falling back to sklearn: {e}")
+            return None
+        
+        logger.info(f"Compiled inference engine enabled (max parity difference {max_diff:.2e})")
+        return engine
+    
+    def _apply_precision(self, precision: str):
+        """
+        Hold the engine's coefficients at the configured precision.
+        
+        Quantization needs the compiled engine; with sklearn scoring, or when
+        exported artifacts already hold lower-precision coefficients, the model
+        keeps the precision it has.
+        """
+        if self.engine is None:
+            if precision != "float64":
+                logger.warning(f"Inference precision {precision} needs the compiled engine, scoring in float64")
+            return
+        
+        if precision in PRECISIONS and PRECISIONS.index(precision) < PRECISIONS.index(self.engine.precision):
+            logger.info(f"Exported artifacts hold {self.engine.precision} coefficients, using them instead of {precision}")
+        else:
+            try:
+                self.engine = self.engine.with_precision(precision)
+            except UnsupportedModelError as e:
+                logger.warning(f"Keeping {self.engine.precision} coefficients: {e}")
+        self.precision = self.engine.precision
+        if self.precision != "float64":
+            logger.info(f"Scoring with {self.precision} coefficients ({self.engine.nbytes / 1e6:.1f} MB of weights)")
+    
+    def _predict_proba(self, cleaned_texts: List[str], timings: Dict[str, float] = None,
+                       with_features: bool = False):
+        """
+        Score cleaned texts with the compiled engine, or with sklearn when it is unavailable.
+        
+        When timings is given, the seconds spent in "vectorize" and "predict_proba"
+        are added to it. With with_features, returns (probabilities, features,
+        contributions) where features are the CSR arrays (indptr, indices, data)
+        of the tf-idf rows and contributions the engine's term contributions the
+        scores were summed from (None with sklearn scoring), for _explain.
+        """
+        started = time.perf_counter()
+        contributions = None
+        if self.engine is not None:
+            features = self.engine.transform(cleaned_texts)
+            vectorized = time.perf_counter()
+            if with_features:
+                contributions = self.engine.term_contributions(features[1], features[2])
+            scores = self.engine.decision_function(*features, contributions=contributions)
+            probabilities = self.engine.probabilities_from_scores(scores)
+        else:
+            text_vectorized = self.vectorizer.transform(cleaned_texts)
+            vectorized = time.perf_counter()
+            probabilities = self.model.predict_proba(text_vectorized)
+            features = (text_vectorized.indptr, text_vectorized.indices, text_vectorized.data)
+        
+        if timings is not None:
+            timings["vectorize"] = timings.get("vectorize", 0.0) + vectorized - started
+            timings["predict_proba"] = timings.get("predict_proba", 0.0) + time.perf_counter() - vectorized
+        if with_features:
+            return probabilities, features, contributions
+        return probabilities
+    
+    def _feature_terms(self, columns: np.ndarray) -> List[str]:
+        """Return the vocabulary terms of tf-idf columns."""
+        if self.engine is not None:
+            return self.engine.terms(columns)
+        if self._feature_names is None:
+            self._feature_names = self.vectorizer.get_feature_names_out()
+        return self._feature_names[columns].astype(str).tolist()
+    
+    def _explain(self, features: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                 rankings: List[List[Tuple[str, float]]], label_columns: np.ndarray,
+                 top_terms: int, term_contributions: np.ndarray = None) -> List[Dict[str, Explanation]]:
+        """
+        Find the terms that contributed most to each ranked label.
+        
+        The model's score for a class is the sum, over the nonzero columns of the
+        row, of the term's tf-idf weight times the class coefficient (plus the
+        intercept), so that product is each term's exact contribution. Only the
+        nonzero columns are read, O(nnz) per explained label, where a perturbation
+        method such as LIME would re-score the text hundreds of times. The compiled
+        engine computes those products to score the text anyway, so they are
+        reused rather than gathered from the coefficients again. The positive
+        contributions of the whole batch are ranked by one sort, and only the
+        selected terms become Python objects. A single row (the /api/diagnose
+        case) skips the grouping of the batch (see _explain_row).
+        
+        Args:
+            features: CSR arrays (indptr, indices, data) from _predict_proba
+            rankings: Ranked (label, confidence) lists from _rank, one per row
+                (all of the same length)
+            label_columns: (n_rows, n_labels) class columns of the ranked labels,
+                as returned by _rank with with_columns
+            top_terms: Terms to keep per label
+            term_contributions: (nnz, n_columns) products of the tf-idf weights with
+                their coefficients from _predict_proba; computed here when None
+                
+        Returns:
+            One dict per row mapping each ranked label to its terms with a positive
+            contribution, as (term, contribution) sorted by contribution (descending)
+        """
+        indptr, indices, data = features
+        n_rows = len(rankings)
+        if n_rows == 0 or not rankings[0]:
+            return [{} for _ in rankings]
+        
+        # The engine's coefficients are used as stored (possibly float32 or int8 plus scales)
+        coef_scale = self.engine.coef_scale if self.engine is not None else None
+        if term_contributions is None:
+            if self.engine is not None:
+                term_contributions = self.engine.term_contributions(indices, data)
+            else:
+                if self._coef_t is None:
+                    self._coef_t = np.ascontiguousarray(self.model.coef_.T, dtype=np.float64)
+                term_contributions = self._coef_t[indices] * data[:, None]
+        
+        if n_rows == 1:
+            return [self._explain_row(indices, rankings[0], label_columns[0], top_terms,
+                                      term_contributions, coef_scale)]
+        
+        # (nnz, n_labels) contributions of every nonzero term to its row's ranked labels
+        lengths = indptr[1:] - indptr[:-1]
+        rows = np.repeat(np.arange(n_rows), lengths)
+        if term_contributions.shape[1] == 1:
+            # Binary models keep one coefficient column, for the second class
+            signs = np.where(label_columns == 1, 1.0, -1.0)
+            if coef_scale is not None:
+                signs = signs * coef_scale[0]
+            contributions = term_contributions[:, :1] * signs[rows]
+        else:
+            # Gathered from the flattened (contiguous) array, cheaper than 2-d fancy indexing
+            row_labels = label_columns[rows]
+            n_columns = term_contributions.shape[1]
+            contributions = term_contributions.ravel()[np.arange(len(indices))[:, None] * n_columns + row_labels]
+            if coef_scale is not None:
+                contributions *= coef_scale[row_labels]
+        
+        # Only positive contributions are reported, and they are few (about one in
+        # eight): collect them per (row, label) group, in term order
+        n_labels = label_columns.shape[1]
+        n_groups = n_rows * n_labels
+        term_positions, label_positions = np.nonzero(contributions > 0.0)
+        values = contributions[term_positions, label_positions]
+        groups = rows[term_positions] * n_labels + label_positions
+        order = np.argsort(groups, kind="stable")
+        groups, term_positions, values = groups[order], term_positions[order], values[order]
+        
+        # Lay them out as one line per group, padding with -inf, so one sort ranks
+        # every group; the width is the most positive terms of a group, not the
+        # longest complaint of the batch
+        counts = np.bincount(groups, minlength=n_groups)
+        starts = np.cumsum(counts) - counts
+        width = int(counts.max())
+        padded = np.full((n_groups, width), -np.inf)
+        padded[groups, np.arange(len(groups)) - starts[groups]] = values
+        
+        # The default sort is not stable, but only ties among the kept terms (or
+        # with the next one) can change the result; those lines are sorted again
+        # stably, so ties keep the term order
+        keep = min(top_terms + 1, width)
+        top = (-padded).argsort(axis=1)[:, :keep]
+        top_values = np.take_along_axis(padded, top, axis=1)
+        tied = np.flatnonzero(((top_values[:, 1:] == top_values[:, :-1]) & (top_values[:, 1:] > 0.0)).any(axis=1))
+        if len(tied):
+            top[tied] = (-padded[tied]).argsort(axis=1, kind="stable")[:, :keep]
+            top_values[tied] = np.take_along_axis(padded[tied], top[tied], axis=1)
+        top, top_values = top[:, :top_terms], top_values[:, :top_terms]
+        
+        # (group, rank) of the selected terms, in order
+        selected_groups, ranks = np.nonzero(top_values > 0.0)
+        columns = indices[term_positions[starts[selected_groups] + top[selected_groups, ranks]]]
+        terms = list(zip(self._feature_terms(columns), top_values[selected_groups, ranks].tolist()))
+        
+        # Each group owns a contiguous run of the selected terms
+        bounds = np.cumsum(np.bincount(selected_groups, minlength=n_groups)).tolist()
+        runs = map(terms.__getitem__, map(slice, [0] + bounds, bounds))
+        return [{label: next(runs) for label, _ in ranked} for ranked in rankings]
+    
+    def _explain_row(self, indices: np.ndarray, ranked: List[Tuple[str, float]], label_columns: np.ndarray,
+                     top_terms: int, term_contributions: np.ndarray,
+                     coef_scale: np.ndarray = None) -> Dict[str, Explanation]:
+        """
+        _explain for a single row, with the same contributions and order.
+        
+        A single row has a few dozen terms, so the cost is in the number of NumPy
+        calls rather than in the data: one gather selects the ranked labels'
+        contributions, one argsort ranks them, and the terms of all candidates
+        are looked up at once, without the grouping of the batch path.
+        
+        Args:
+            indices: Columns of the row's nonzero tf-idf weights
+            ranked: Ranked (label, confidence) list of the row
+            label_columns: Class columns of the ranked labels
+            top_terms: Terms to keep per label
+            term_contributions: (nnz, n_columns) products of the tf-idf weights
+                with their coefficients
+            coef_scale: Per-column scales of int8 coefficients, or None
+            
+        Returns:
+            Dict mapping each ranked label to its (term, contribution) list
+        """
+        # (n_labels, nnz) contributions of the terms to the ranked labels
+        if term_contributions.shape[1] == 1:
+            signs = np.where(label_columns == 1, 1.0, -1.0)
+            if coef_scale is not None:
+                signs = signs * coef_scale[0]
+            contributions = term_contributions[:, 0] * signs[:, None]
+        else:
+            contributions = term_contributions.take(label_columns, axis=1).T
+            if coef_scale is not None:
+                contributions *= coef_scale.take(label_columns)[:, None]
+        
+        # Ranked by the same stable argsort as the batch path; a label's positive
+        # contributions come first and only those are kept
+        top = (-contributions).argsort(axis=1, kind="stable")[:, :top_terms]
+        candidate_terms = iter(self._feature_terms(indices[top].ravel()))
+        return {
+            label: [(term, values[i]) for i, term in zip(label_top, candidate_terms) if values[i] > 0.0]
+            for (label, _), values, label_top in zip(ranked, contributions.tolist(), top.tolist())
+        }
+    
+    def _rank(self, probabilities: np.ndarray, top_k: int = None, with_columns: bool = False):
+        """
+        Turn a (n_rows, n_classes) probability matrix into sorted (label, confidence) lists.
+        
+        With top_k, the best candidates are found with a partial selection
+        (argpartition) and only those are sorted and turned into Python objects.
+        One extra candidate is kept when the model has an "UNKNOWN OR OTHER" class,
+        so apply_suppression still has top_k other labels to promote. Ties are broken
+        by class order, exactly like a full stable sort.
+        
+        Args:
+            probabilities: Probability matrix from _predict_proba
+            top_k: Number of predictions to keep per row (None keeps all classes)
+            with_columns: Also return the (n_rows, k) class columns of the ranked labels
+            
+        Returns:
+            One list of (label, confidence) tuples per row, sorted by confidence
+            (descending); with with_columns, a tuple (rankings, columns)
+        """
+        n_rows, n_classes = probabilities.shape
+        neg_probabilities = -probabilities
+        
+        k = n_classes
+        if top_k is not None:
+            k = min(n_classes, top_k + 1 if self._has_unknown else top_k)
+        
+        if k >= n_classes:
+            order = np.argsort(neg_probabilities, axis=1, kind="stable")
+        else:
+            candidates = np.argpartition(neg_probabilities, k - 1, axis=1)[:, :k]
+            candidate_values = np.take_along_axis(neg_probabilities, candidates, axis=1)
+            
+            # Rows with ties at the cut-off need a full sort to keep the lowest class indices
+            cutoff = candidate_values.max(axis=1, keepdims=True)
+            tied_rows = np.flatnonzero((neg_probabilities <= cutoff).sum(axis=1) > k)
+            
+            order = np.take_along_axis(
+                candidates, np.lexsort((candidates, candidate_values), axis=1), axis=1
+            )
+            for row in tied_rows:
+                order[row] = np.argsort(neg_probabilities[row], kind="stable")[:k]
+        
+        classes = self.classes_
+        rankings = [
+            [(classes[j], row_probabilities[j]) for j in row_order]
+            for row_order, row_probabilities in zip(order, probabilities)
+        ]
+        if with_columns:
+            return rankings, order
+        return rankings
+    
+    def predict(self, text: str, top_k: int = None,
+                explain_terms: int = 0) -> Union[List[Tuple[str, float]], Tuple[List[Tuple[str, float]], Dict[str, Explanation]]]:
         """
         Predict fault classes for a given complaint text.
         
-        Applies text cleaning, vectorization, and returns ALL class predictions
-        sorted by confidence (descending). Does NOT apply suppression or truncation.
+        Applies text cleaning, vectorization, and returns class predictions
+        sorted by confidence (descending). Does NOT apply suppression.
         
         Args:
             text: Raw complaint text (will be cleaned and preprocessed)
-            
+            top_k: Keep only the best top_k predictions (plus one spare when the
+                model has an "UNKNOWN OR OTHER" class). None returns ALL classes.
+            explain_terms: When above 0, also return up to this many contributing
+                terms per predicted label (see _explain)
+                
         Returns:
             List of tuples (label, confidence) sorted by confidence (descending).
-            Confidence values are between 0.0 and 1.0.
+            Confidence values are between 0.0 and 1.0. With explain_terms, a tuple
+            (predictions, explanations) where explanations maps each predicted label
+            to its (term, contribution) list.
             
         Raises:
             ValueError: If text is empty or invalid
@@ -97,17 +497,79 @@ class Predictor:
         if not cleaned_text or not cleaned_text.strip():
             raise ValueError("Text is empty after cleaning")
         
-        # Vectorize the cleaned text
-        text_vectorized = self.vectorizer.transform([cleaned_text])
+        # Vectorize the cleaned text and get prediction probabilities for all classes
+        if explain_terms > 0:
+            probabilities, features, contributions = self._predict_proba([cleaned_text], with_features=True)
+            rankings, columns = self._rank(probabilities, top_k, with_columns=True)
+            return rankings[0], self._explain(features, rankings, columns, explain_terms, contributions)[0]
+        probabilities = self._predict_proba([cleaned_text])
+        
+        # Pair model classes with probabilities, sorted by confidence (descending)
+        return self._rank(probabilities, top_k)[0]
+    
+    def predict_batch(self, texts: Sequence[str], top_k: int = None, timings: Dict[str, float] = None,
+                      explain_terms: int = 0) -> List[Union[List[Tuple[str, float]], Tuple, ValueError]]:
+        """
+        Predict fault classes for many complaint texts in one vectorized pass.
+        
+        All valid texts are cleaned, stacked into a single sparse matrix and scored
+        with one predict_proba call. Invalid texts do not fail the batch: their slot
+        in the result holds the ValueError that predict() would have raised.
+        
+        Args:
+            texts: Sequence of raw complaint texts
+            top_k: Keep only the best top_k predictions per text, as in predict()
+            timings: Optional dict that receives the seconds spent per stage
+                ("clean", "vectorize", "predict_proba", "rank" and, when explaining, "explain")
+            explain_terms: When above 0, each successful entry is a tuple
+                (predictions, explanations) as returned by predict()
+                
+        Returns:
+            List aligned with texts. Each entry is either a list of (label, confidence)
+            tuples sorted by confidence (descending), or a ValueError for that text.
+        """
+        started = time.perf_counter()
+        results: List[Union[List[Tuple[str, float]], ValueError]] = [None] * len(texts)
+        
+        # Clean every text, recording per-item errors instead of raising
+        valid_indices = []
+        cleaned_texts = []
+        for i, text in enumerate(texts):
+            if not text or not isinstance(text, str):
+                results[i] = ValueError("Text cannot be empty and must be a string")
+                continue
+            cleaned_text = clean_text(text)
+            if not cleaned_text or not cleaned_text.strip():
+                results[i] = ValueError("Text is empty after cleaning")
+                continue
+            valid_indices.append(i)
+            cleaned_texts.append(cleaned_text)
+        
+        if timings is not None:
+            timings["clean"] = timings.get("clean", 0.0) + time.perf_counter() - started
+        if not cleaned_texts:
+            return results
         
-        # Get prediction probabilities for all classes
-        probabilities = self.model.predict_proba(text_vectorized)[0]
+        # Vectorize and score the whole batch as one sparse matrix; the term
+        # contributions (nnz x classes) are only kept to explain them
+        if explain_terms > 0:
+            probabilities, features, contributions = self._predict_proba(cleaned_texts, timings, with_features=True)
+        else:
+            probabilities = self._predict_proba(cleaned_texts, timings)
         
-        # Pair model classes with probabilities
-        predictions = list(zip(self.classes_, probabilities))
+        ranking_started = time.perf_counter()
+        rankings, columns = self._rank(probabilities, top_k, with_columns=True)
+        ranked = time.perf_counter()
+        if timings is not None:
+            timings["rank"] = timings.get("rank", 0.0) + ranked - ranking_started
         
-        # Sort by confidence (descending)
-        predictions.sort(key=lambda x: x[1], reverse=True)
+        if explain_terms > 0:
+            explanations = self._explain(features, rankings, columns, explain_terms, contributions)
+            rankings = list(zip(rankings, explanations))
+            if timings is not None:
+                timings["explain"] = timings.get("explain", 0.0) + time.perf_counter() - ranked
         
-        return predictions
+        for i, predictions in zip(valid_indices, rankings):
+            results[i] = predictions
+        return results
 
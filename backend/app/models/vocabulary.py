@@ -0,0 +1,359 @@
+"""
+Compact term -> column index used in place of the vectorizer's vocabulary_ dict.
+
+The dict keeps one Python str object per term plus a hash table entry, which for
+50,000 uni/bi-grams is several megabytes per process and cannot be shared between
+process-pool workers. CompactVocabulary stores the same mapping in flat arrays:
+
+    blob      uint8 UTF-8 bytes of every term, in column order
+    offsets   (n_terms + 1,) int64 start offset of each term in the blob
+    keys      (n_terms,) fixed-width bytes of every term, in hash order
+    hashes    (n_terms,) uint64 stable hashes of the keys, sorted
+    columns   (n_terms,) int32 column of the term at the same position in hashes
+    buckets   (2**bits + 1,) int32 first position in hashes of each value of the
+              top bits of a hash (bits chosen so buckets hold about one term)
+
+The hash (see term_hashes) depends only on the term bytes, not on the
+interpreter's salted str hash, so the index is computed once at export time and
+every array is saved with the artifacts and memory-mapped: workers share all of
+it and build nothing at load time.
+
+Lookups are batched: the queries are packed into the keys' fixed width, hashed
+with a few array operations and found in the sorted hashes (through the buckets
+for large batches, whose binary search would miss the cache at every step, with
+one searchsorted call for small ones). Every hit is confirmed by comparing its
+key, so results agree exactly with the dict (hash collisions only cost an extra
+comparison).
+
+Compare against the dict on a real vectorizer with:
+    python -m app.models.vocabulary --vectorizer artifacts/vectorizer.joblib
+"""
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Below this many queries one searchsorted call beats walking the buckets
+_BUCKET_LOOKUP_MIN = 256
+
+# Odd 64-bit multipliers, one per 8-byte word of a key (cycled for wider keys)
+_HASH_MULTIPLIERS = np.array([
+    0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5,
+    0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9,
+], dtype=np.uint64)
+
+
+def pack_terms(terms: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pack terms into one UTF-8 byte array plus start offsets.
+    
+    Args:
+        terms: Terms to pack
+        
+    Returns:
+        Tuple (data, offsets) where term i is data[offsets[i]:offsets[i + 1]]
+    """
+    joined = "".join(terms)
+    encoded = joined.encode("utf-8")
+    if len(encoded) == len(joined):
+        # Pure ASCII: byte lengths equal character lengths, no per-term encode needed
+        lengths = np.fromiter(map(len, terms), dtype=np.int64, count=len(terms))
+    else:
+        parts = [term.encode("utf-8") for term in terms]
+        encoded = b"".join(parts)
+        lengths = np.fromiter(map(len, parts), dtype=np.int64, count=len(parts))
+    
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return np.frombuffer(encoded, dtype=np.uint8), offsets
+
+
+def unpack_terms(data: np.ndarray, offsets: np.ndarray) -> List[str]:
+    """
+    Decode terms packed by pack_terms, in column order.
+    
+    Args:
+        data: uint8 array of UTF-8 bytes
+        offsets: Start offsets of each term in data, plus the end offset
+        
+    Returns:
+        List of terms
+    """
+    view = memoryview(np.asarray(data)).cast("B")
+    bounds = np.asarray(offsets).tolist()
+    return [str(view[bounds[i]:bounds[i + 1]], "utf-8") for i in range(len(bounds) - 1)]
+
+
+@lru_cache(maxsize=None)
+def _multipliers(n_words: int) -> np.ndarray:
+    """Multiplier of each 8-byte word of a key n_words words wide."""
+    return np.resize(_HASH_MULTIPLIERS, n_words)
+
+
+def term_hashes(keys: np.ndarray) -> np.ndarray:
+    """
+    Stable 64-bit hashes of fixed-width byte keys.
+    
+    Each key is read as little-endian 64-bit words, which are multiplied by odd
+    constants, summed (wrapping) and mixed; the result is the same in every
+    process and on every platform, unlike str hashes.
+    
+    Args:
+        keys: Contiguous bytes array whose itemsize is a multiple of 8
+        
+    Returns:
+        uint64 array with one hash per key
+    """
+    n_words = keys.dtype.itemsize // 8
+    words = np.ascontiguousarray(keys).view("<u8").reshape(keys.shape[0], n_words)
+    hashes = words.dot(_multipliers(n_words))
+    hashes ^= hashes >> np.uint64(29)
+    return hashes
+
+
+def build_index(data: np.ndarray, offsets: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build the hash index of terms packed by pack_terms.
+    
+    Args:
+        data: uint8 array of UTF-8 bytes
+        offsets: Start offsets of each term in data, plus the end offset
+        
+    Returns:
+        Tuple (keys, hashes, columns, buckets) as stored by CompactVocabulary
+        
+    Raises:
+        ValueError: If a term ends in a NUL byte (fixed-width keys cannot represent it)
+    """
+    view = memoryview(np.asarray(data)).cast("B")
+    bounds = np.asarray(offsets).tolist()
+    encoded = [bytes(view[bounds[i]:bounds[i + 1]]) for i in range(len(bounds) - 1)]
+    if any(term.endswith(b"\0") for term in encoded):
+        raise ValueError("Vocabulary terms cannot end in a NUL byte")
+    
+    # Keys are padded to whole 64-bit words for hashing
+    width = max(8, -(-max(map(len, encoded), default=0) // 8) * 8)
+    keys = np.array(encoded, dtype=f"S{width}")
+    hashes = term_hashes(keys)
+    order = np.argsort(hashes, kind="stable")
+    hashes = hashes[order]
+    
+    bits = max(1, int(np.ceil(np.log2(max(hashes.shape[0], 2)))))
+    prefixes = np.arange(2 ** bits + 1, dtype=np.uint64)
+    buckets = np.searchsorted(hashes >> np.uint64(64 - bits), prefixes).astype(np.int32)
+    return keys[order], hashes, order.astype(np.int32), buckets
+
+
+class CompactVocabulary:
+    """Read-only term -> column mapping backed by flat (optionally memory-mapped) arrays."""
+    
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray, keys: np.ndarray = None,
+                 hashes: np.ndarray = None, columns: np.ndarray = None, buckets: np.ndarray = None):
+        """
+        Initialize the index from packed terms.
+        
+        Args:
+            blob: uint8 array holding the UTF-8 bytes of every term, in column order
+            offsets: int64 array of n_terms + 1 start offsets into blob
+            keys: Fixed-width term bytes in hash order, as returned by build_index
+            hashes: Sorted uint64 term hashes, as returned by build_index
+            columns: int32 column of each entry in hashes, as returned by build_index
+            buckets: First position in hashes per hash prefix, as returned by build_index
+                (the four are built from blob and offsets when not given)
+        """
+        self.blob = blob
+        self.offsets = offsets
+        if keys is None or hashes is None or columns is None or buckets is None:
+            keys, hashes, columns, buckets = build_index(blob, offsets)
+        self.keys = keys
+        self.hashes = hashes
+        self.columns = columns
+        self.buckets = buckets
+        self._bucket_shift = np.uint64(64 - int(np.log2(buckets.shape[0] - 1)))
+        
+        # Byte view of the blob without copying it; a mapped blob stays in the page cache
+        self._view = memoryview(np.asarray(blob)).cast("B")
+        
+        # Collisions are rare; lookups only scan for them when the index has any
+        self._has_collisions = bool(hashes.shape[0] > 1 and np.any(hashes[1:] == hashes[:-1]))
+    
+    @classmethod
+    def from_dict(cls, vocabulary: Dict[str, int]) -> "CompactVocabulary":
+        """
+        Build the index from a term -> column dict such as vectorizer.vocabulary_.
+        
+        Args:
+            vocabulary: Mapping whose columns are exactly 0..len(vocabulary) - 1
+            
+        Returns:
+            CompactVocabulary with the same mapping
+        """
+        terms = [None] * len(vocabulary)
+        for term, column in vocabulary.items():
+            terms[column] = term
+        if any(term is None for term in terms):
+            raise ValueError("Vocabulary columns must be exactly 0..n_terms - 1")
+        return cls(*pack_terms(terms))
+    
+    def __len__(self) -> int:
+        return self.offsets.shape[0] - 1
+    
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over terms in column order."""
+        for column in range(len(self)):
+            yield self.term(column)
+    
+    def __contains__(self, term: str) -> bool:
+        return self.get(term) is not None
+    
+    def term(self, column: int) -> str:
+        """Return the term stored for a column."""
+        return str(self._view[self.offsets[column]:self.offsets[column + 1]], "utf-8")
+    
+    def terms(self, columns: Sequence[int]) -> List[str]:
+        """Return the terms stored for many columns."""
+        columns = np.asarray(columns, dtype=np.int64)
+        view = self._view
+        return [
+            str(view[start:end], "utf-8")
+            for start, end in zip(self.offsets[columns].tolist(), self.offsets[columns + 1].tolist())
+        ]
+    
+    def get(self, term: str, default: Optional[int] = None) -> Optional[int]:
+        """Return the column of a term, or default when it is not in the vocabulary."""
+        column = int(self.lookup_many([term])[0])
+        return default if column < 0 else column
+    
+    def lookup_many(self, terms: Sequence[str]) -> np.ndarray:
+        """
+        Look up many terms at once.
+        
+        Args:
+            terms: Terms to look up
+            
+        Returns:
+            int64 array with the column of each term, or -1 where the term is unknown
+        """
+        n_terms = len(terms)
+        if n_terms == 0 or self.hashes.shape[0] == 0:
+            return np.full(n_terms, -1, dtype=np.int64)
+        
+        # Pack the queries like the keys; numpy encodes ASCII str directly
+        key_type = self.keys.dtype
+        try:
+            query = np.array(terms, dtype=key_type)
+        except UnicodeEncodeError:
+            query = np.array([term.encode("utf-8") for term in terms], dtype=key_type)
+        query_hashes = term_hashes(query)
+        
+        # Queries longer than the key width were truncated and cannot be terms;
+        # only those filling the whole width need their length checked
+        width = key_type.itemsize
+        full = query.view(np.uint8)[width - 1::width].nonzero()[0]
+        truncated = [index for index in full.tolist() if len(terms[index].encode("utf-8")) > width]
+        
+        # First position of each hash, confirmed by comparing the keys
+        if n_terms < _BUCKET_LOOKUP_MIN:
+            positions = self.hashes.searchsorted(query_hashes)
+        else:
+            positions = self._find(query_hashes)
+        positions[positions == self.hashes.shape[0]] = 0
+        miss = self.keys[positions] != query
+        if truncated:
+            miss[truncated] = True
+        result = self.columns[positions].astype(np.int64)
+        result[miss] = -1
+        
+        if self._has_collisions:
+            # A term sharing its hash with another can sit after the first entry
+            retry = miss & (self.hashes[positions] == query_hashes)
+            retry[truncated] = False
+            for index in retry.nonzero()[0].tolist():
+                result[index] = self._resolve_collision(query[index], query_hashes[index], positions[index])
+        return result
+    
+    def _find(self, query_hashes: np.ndarray) -> np.ndarray:
+        """Return np.searchsorted(self.hashes, query_hashes) by walking the buckets."""
+        hashes = self.hashes
+        prefixes = (query_hashes >> self._bucket_shift).astype(np.intp)
+        positions = self.buckets[prefixes].astype(np.intp)
+        ends = self.buckets[prefixes + 1]
+        
+        # Buckets hold about one hash, so almost every query is done after one step
+        active = np.flatnonzero(positions < ends)
+        while active.size:
+            active = active[hashes[positions[active]] < query_hashes[active]]
+            positions[active] += 1
+            active = active[positions[active] < ends[active]]
+        return positions
+    
+    def _resolve_collision(self, key: bytes, key_hash: np.uint64, position: int) -> int:
+        """Scan every entry sharing a hash for the exact key (rare)."""
+        while position < self.hashes.shape[0] and self.hashes[position] == key_hash:
+            if self.keys[position] == key:
+                return int(self.columns[position])
+            position += 1
+        return -1
+    
+    def nbytes(self) -> int:
+        """Bytes held by the index arrays (their pages are shared when they are memory-mapped)."""
+        return int(self.blob.nbytes + self.offsets.nbytes + self.keys.nbytes + self.hashes.nbytes
+                   + self.columns.nbytes + self.buckets.nbytes)
+
+
+def _dict_nbytes(vocabulary: Dict[str, int]) -> int:
+    """Approximate bytes held by a str -> int dict, including its keys and values."""
+    import sys
+    size = sys.getsizeof(vocabulary)
+    for term, column in vocabulary.items():
+        size += sys.getsizeof(term) + sys.getsizeof(column)
+    return size
+
+
+def main():
+    """Compare memory use, lookup throughput and agreement with the vectorizer's dict."""
+    import argparse
+    import time
+    
+    import joblib
+    
+    parser = argparse.ArgumentParser(description="Compare CompactVocabulary with vectorizer.vocabulary_")
+    parser.add_argument("--vectorizer", required=True, help="Path to vectorizer.joblib")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions (best is reported)")
+    args = parser.parse_args()
+    
+    vocabulary = dict(joblib.load(args.vectorizer).vocabulary_)
+    index = CompactVocabulary.from_dict(vocabulary)
+    
+    # Every vocabulary term, plus unknown terms of similar shape
+    terms = list(vocabulary)
+    unknown = [term + "zq" for term in terms[::5]] + [term.upper() for term in terms[::7] if term.upper() != term]
+    queries = terms + unknown
+    
+    columns = index.lookup_many(queries)
+    expected = [vocabulary.get(term, -1) for term in queries]
+    mismatches = int(np.count_nonzero(columns != np.asarray(expected, dtype=np.int64)))
+    single_mismatches = sum(index.get(term, -1) != vocabulary.get(term, -1) for term in queries[::50])
+    
+    def best_time(fn) -> float:
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+    
+    dict_time = best_time(lambda: [vocabulary.get(term, -1) for term in queries])
+    index_time = best_time(lambda: index.lookup_many(queries))
+    
+    print(f"Terms: {len(vocabulary):,} known + {len(unknown):,} unknown queries")
+    print(f"Agreement: {mismatches} batched mismatches, {single_mismatches} single-lookup mismatches")
+    print(f"Memory:   dict {_dict_nbytes(vocabulary) / 1e6:8.2f} MB   compact {index.nbytes() / 1e6:8.2f} MB")
+    print(f"Lookups:  dict {len(queries) / dict_time / 1e6:8.2f} M/s    compact {len(queries) / index_time / 1e6:8.2f} M/s")
+    
+    if mismatches or single_mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
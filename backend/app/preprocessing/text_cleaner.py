@@ -1,53 +1,92 @@
 import re
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+
+# Remove NHTSA markers (e.g., *TR, *JB, *BF, *JS, *SMD, *DT*JB, TL*)
+_TL_MARKER = re.compile(r'\bTL\*\s*', flags=re.IGNORECASE)
+_STAR_MARKER = re.compile(
+    r'\s*\*[A-Z]{1,4}(?:\*[A-Z]{1,4})*\s*',
+    flags=re.IGNORECASE
+)
+
+# Remove numeric dates (MM/DD/YYYY, M/D/YY, etc.)
+_NUMERIC_DATE = re.compile(r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b')
+
+# Remove VIN-like alphanumeric tokens (>10 chars AND contains digit)
+_LONG_ALNUM = re.compile(r'\b[A-Z0-9][A-Z0-9.\-]{9,}\b', flags=re.IGNORECASE)
+
+# Date and VIN passes can only change text that contains a digit
+_ANY_DIGIT = re.compile(r'\d')
+_ASCII_DIGIT = re.compile(r'[0-9]')
+
+
+def _replace_long_alnum(match):
+    token = match.group(0)
+    if len(token) > 10 and _ASCII_DIGIT.search(token):
+        return ' '
+    return token
 
 
 def clean_text(text: str) -> str:
     """
     Apply minimal text cleaning to preserve sentence structure.
     MUST match training preprocessing exactly.
+
+    Passes that cannot match are skipped (marker removal needs a '*', date and
+    VIN removal need a digit), so output is identical to running every pass.
     """
-    if pd.isna(text) or not isinstance(text, str):
+    if not isinstance(text, str):
         return text
 
     cleaned = text
 
-    # Remove NHTSA markers (e.g., *TR, *JB, *BF, *JS, *SMD, *DT*JB, TL*)
-    cleaned = re.sub(r'\bTL\*\s*', ' ', cleaned, flags=re.IGNORECASE)
-    cleaned = re.sub(
-        r'\s*\*[A-Z]{1,4}(?:\*[A-Z]{1,4})*\s*',
-        ' ',
-        cleaned,
-        flags=re.IGNORECASE
-    )
+    if '*' in cleaned:
+        cleaned = _TL_MARKER.sub(' ', cleaned)
+        cleaned = _STAR_MARKER.sub(' ', cleaned)
 
     # Convert to lowercase (after removing markers)
     cleaned = cleaned.lower()
 
-    # Remove numeric dates (MM/DD/YYYY, M/D/YY, etc.)
-    cleaned = re.sub(
-        r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',
-        ' ',
-        cleaned
-    )
-
-    # Remove VIN-like alphanumeric tokens (>10 chars AND contains digit)
-    def replace_long_alnum(match):
-        token = match.group(0)
-        if len(token) > 10 and any(c.isdigit() for c in token):
-            return ' '
-        return token
-
-    cleaned = re.sub(
-        r'\b[A-Z0-9][A-Z0-9.\-]{9,}\b',
-        replace_long_alnum,
-        cleaned,
-        flags=re.IGNORECASE
-    )
-
-    # Normalize whitespace
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    if _ANY_DIGIT.search(cleaned):
+        if '/' in cleaned or '-' in cleaned:
+            cleaned = _NUMERIC_DATE.sub(' ', cleaned)
+        cleaned = _LONG_ALNUM.sub(_replace_long_alnum, cleaned)
+
+    # Normalize whitespace (str.split uses the same whitespace set as \s)
+    return ' '.join(cleaned.split())
+
+
+def _clean_chunk(texts: List) -> List:
+    return [clean_text(text) for text in texts]
+
+
+def clean_batch(texts, n_jobs: int = 1, chunksize: int = 2000):
+    """
+    Apply clean_text to many texts.
+
+    Args:
+        texts: List/sequence of texts or a pandas Series
+        n_jobs: Number of worker processes (1 cleans in the current process)
+        chunksize: Number of texts sent to a worker at a time
+
+    Returns:
+        A list of cleaned texts, or a Series with the same index and name when
+        a Series was given. Non-string values (e.g. NaN) pass through unchanged,
+        as with clean_text.
+    """
+    values = list(texts)
+
+    if n_jobs > 1 and len(values) > chunksize:
+        chunks = [values[i:i + chunksize] for i in range(0, len(values), chunksize)]
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            cleaned = [text for chunk in pool.map(_clean_chunk, chunks) for text in chunk]
+    else:
+        cleaned = _clean_chunk(values)
 
+    # pandas Series in, Series out (without importing pandas here)
+    if hasattr(texts, 'index') and hasattr(texts, 'name') and hasattr(texts, 'to_numpy'):
+        return type(texts)(cleaned, index=texts.index, name=texts.name)
     return cleaned
 
 
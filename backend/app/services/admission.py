@@ -0,0 +1,278 @@
+"""
+Admission control, load shedding and client deadlines for the diagnose routes.
+
+Inference is CPU-bound, so accepting more concurrent requests than the workers
+can score only makes every request wait longer. The admission controller lets
+max_concurrent requests run at a time, makes up to max_queue more wait in FIFO
+order, and answers anything beyond that immediately with 503 (or 429) and a
+Retry-After header. A queued request that does not get a slot within the
+queue timeout is shed the same way.
+
+Clients may send the time they are still willing to wait in the
+X-Request-Deadline-Ms header (milliseconds, counted from when the request
+arrives). Work whose deadline has passed is dropped with 504 before inference
+starts: on arrival, while queued, and once more in the route just before the
+model is called (see deadline_passed).
+"""
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+# Request header carrying the client's remaining time budget in milliseconds
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+# Status codes a full queue may be answered with
+REJECT_STATUSES = (429, 503)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted."""
+    
+    def __init__(self, status: int, detail: str, retry_after: Optional[int] = None):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def deadline_passed(state) -> bool:
+    """Return True if the request state carries a client deadline that has passed."""
+    deadline = getattr(state, "deadline", None)
+    return deadline is not None and time.monotonic() >= deadline
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded FIFO wait queue.
+    
+    Everything runs on the event loop thread, so the counters need no locks.
+    A released slot is handed directly to the oldest waiter, so a request that
+    arrives later can never overtake one that is already queued.
+    """
+    
+    def __init__(self, max_concurrent: int, max_queue: int = 0, queue_timeout_ms: float = 1000.0,
+                 reject_status: int = 503, stats_window: int = 2048):
+        """
+        Initialize the controller.
+        
+        Args:
+            max_concurrent: Requests allowed to run at the same time
+            max_queue: Requests allowed to wait for a slot; beyond that they are rejected
+            queue_timeout_ms: Longest time a request waits for a slot before it is shed
+            reject_status: Status of shed requests, 503 or 429
+            stats_window: Number of recent queue-wait samples kept for percentiles
+            
+        Raises:
+            ValueError: If a limit is invalid
+        """
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue cannot be negative")
+        if queue_timeout_ms < 0:
+            raise ValueError("queue_timeout_ms cannot be negative")
+        if reject_status not in REJECT_STATUSES:
+            raise ValueError(f"reject_status must be one of {REJECT_STATUSES}")
+        
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self.reject_status = reject_status
+        
+        self._active = 0
+        self._waiters = deque()
+        
+        # Exponentially weighted average of how long a request holds its slot,
+        # used to estimate Retry-After
+        self._mean_hold = 0.0
+        
+        # Stats
+        self._admitted = 0
+        self._queued = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._expired = 0
+        self._max_waiting = 0
+        self._queue_waits = deque(maxlen=stats_window)
+    
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait, estimated from the queue and recent hold times."""
+        backlog = (len(self._waiters) + self.max_concurrent) / self.max_concurrent
+        return max(1, math.ceil(backlog * self._mean_hold))
+    
+    async def acquire(self, deadline: Optional[float] = None):
+        """
+        Wait for a slot; call release() when the request finishes.
+        
+        Args:
+            deadline: time.monotonic() value after which the client no longer wants the result
+            
+        Raises:
+            AdmissionRejected: If the queue is full, the queue timeout passes, or the
+                deadline passes before a slot is free
+        """
+        if deadline is not None and time.monotonic() >= deadline:
+            self.record_expired()
+            raise AdmissionRejected(504, "Deadline exceeded before the request was admitted")
+        
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            self._admitted += 1
+            return
+        
+        if len(self._waiters) >= self.max_queue:
+            self._rejected += 1
+            raise AdmissionRejected(self.reject_status, "Server is overloaded, retry later", self.retry_after())
+        
+        # Wait in line until the queue timeout or the client's deadline, whichever is first
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._queued += 1
+        self._max_waiting = max(self._max_waiting, len(self._waiters))
+        enqueued_at = time.monotonic()
+        timeout = self.queue_timeout
+        if deadline is not None:
+            timeout = min(timeout, deadline - enqueued_at)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Cancelled just after being handed a slot: pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+                self._waiters.remove(waiter)
+        self._queue_waits.append(time.monotonic() - enqueued_at)
+        
+        if waiter.cancelled():
+            if deadline is not None and time.monotonic() >= deadline:
+                self.record_expired()
+                raise AdmissionRejected(504, "Deadline exceeded while waiting to be admitted")
+            self._timed_out += 1
+            raise AdmissionRejected(self.reject_status, "Timed out waiting for capacity, retry later",
+                                    self.retry_after())
+        # release() handed its slot over; _active already counts this request
+        self._admitted += 1
+    
+    def release(self, held_seconds: float = None):
+        """
+        Free a slot taken by acquire(), handing it to the oldest waiter if any.
+        
+        Args:
+            held_seconds: How long the slot was held, for the Retry-After estimate
+        """
+        if held_seconds is not None:
+            self._mean_hold += 0.1 * (held_seconds - self._mean_hold)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+    
+    def record_expired(self):
+        """Count a request dropped because its client deadline passed."""
+        self._expired += 1
+    
+    def stats(self) -> Dict:
+        """
+        Return limits, shedding counters and queue-wait percentiles for sizing workers.
+        
+        Returns:
+            Dict with the limits, active and waiting requests, admitted, queued,
+            rejected (queue full), timed_out (queue timeout) and expired (client
+            deadline) counts, and queue-wait percentiles in milliseconds over the
+            most recent queued requests
+        """
+        waits = sorted(self._queue_waits)
+        
+        def percentile(q: float) -> float:
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(q * len(waits)))] * 1000.0
+        
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout_ms": self.queue_timeout * 1000.0,
+            "active": self._active,
+            "waiting": len(self._waiters),
+            "max_waiting": self._max_waiting,
+            "admitted": self._admitted,
+            "queued": self._queued,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+            "expired": self._expired,
+            "mean_hold_ms": self._mean_hold * 1000.0,
+            "queue_wait_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": waits[-1] * 1000.0 if waits else 0.0,
+            },
+        }
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware applying the admission controller to a set of paths.
+    
+    Runs before the request body is read, so a shed request costs almost
+    nothing. The client deadline (if any) is stored as state.deadline, a
+    time.monotonic() value, so routes can check it again right before inference.
+    """
+    
+    def __init__(self, app, controller: AdmissionController, paths: Iterable[str]):
+        self.app = app
+        self.controller = controller
+        self.paths = frozenset(paths)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        
+        arrived = time.monotonic()
+        deadline = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-deadline-ms":
+                try:
+                    budget_ms = float(value)
+                except ValueError:
+                    budget_ms = math.nan
+                if not budget_ms >= 0:
+                    await _send_error(send, 400, f"{DEADLINE_HEADER} must be a non-negative number of milliseconds")
+                    return
+                deadline = arrived + budget_ms / 1000.0
+                break
+        
+        controller = self.controller
+        try:
+            await controller.acquire(deadline)
+        except AdmissionRejected as e:
+            await _send_error(send, e.status, e.detail, e.retry_after)
+            return
+        
+        scope.setdefault("state", {})["deadline"] = deadline
+        admitted = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(time.monotonic() - admitted)
+
+
+async def _send_error(send, status: int, detail: str, retry_after: Optional[int] = None):
+    """Send a JSON {"detail": ...} error response, like HTTPException produces."""
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    if retry_after is not None:
+        headers.append((b"retry-after", str(retry_after).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
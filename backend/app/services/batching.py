@@ -0,0 +1,267 @@
+"""Adaptive micro-batching of concurrent single-complaint predictions."""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch-size histogram buckets reported by stats()
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class _PendingPrediction:
+    """A single queued complaint waiting to be scored."""
+    
+    __slots__ = ("predictor", "text", "top_k", "future", "enqueued_at", "timings")
+    
+    def __init__(self, predictor, text: str, top_k: int, future: asyncio.Future, timings: Dict[str, float] = None):
+        self.predictor = predictor
+        self.text = text
+        self.top_k = top_k
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+        self.timings = timings
+
+
+class MicroBatcher:
+    """
+    Collects concurrent predict() calls and scores them with one predict_batch() call.
+    
+    A batch is flushed when it reaches max_batch_size or when window_ms has passed
+    since its first request was queued, whichever comes first. The window is adaptive:
+    while recent batches have been singletons (light traffic), requests are flushed
+    immediately instead of paying the window as extra latency. As soon as requests
+    start queuing up behind each other the window is applied again.
+    
+    Requests are grouped by predictor, so each result always comes from the model
+    that was current when the request was submitted. When an InferenceExecutor is
+    given, batches are scored in its pool and several batches may be in flight at
+    once; otherwise they are scored on the event loop.
+    """
+    
+    def __init__(self, max_batch_size: int = 64, window_ms: float = 2.0,
+                 executor=None, stats_window: int = 2048):
+        """
+        Initialize the batcher. Call start() from a running event loop before use.
+        
+        Args:
+            max_batch_size: Maximum number of complaints scored in one call
+            window_ms: Maximum time in milliseconds a request waits for others to join its batch
+            executor: Optional InferenceExecutor that runs the batched predictions
+            stats_window: Number of recent queue-wait samples kept for percentiles
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if window_ms < 0:
+            raise ValueError("window_ms cannot be negative")
+        
+        self.max_batch_size = max_batch_size
+        self.window_seconds = window_ms / 1000.0
+        self.executor = executor
+        
+        self._pending = deque()
+        self._has_pending = None
+        self._batch_full = None
+        self._task = None
+        self._scoring_tasks = set()
+        
+        # Exponentially weighted average of recent batch sizes, drives the adaptive window
+        self._recent_batch_size = 1.0
+        
+        # Stats
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._size_histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._queue_waits = deque(maxlen=stats_window)
+        self._max_queue_wait = 0.0
+    
+    async def start(self):
+        """Start the background flush loop on the running event loop."""
+        if self._task is not None:
+            return
+        self._has_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the flush loop and fail any requests that are still queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        
+        # Let batches already handed to the executor finish
+        if self._scoring_tasks:
+            await asyncio.gather(*self._scoring_tasks, return_exceptions=True)
+        
+        while self._pending:
+            item = self._pending.popleft()
+            if not item.future.done():
+                item.future.set_exception(RuntimeError("Batcher stopped before request was scored"))
+    
+    async def predict(self, predictor, text: str, top_k: int = None,
+                      timings: Dict[str, float] = None) -> List[Tuple[str, float]]:
+        """
+        Queue a complaint and wait for its batched prediction.
+        
+        Args:
+            predictor: Predictor that should score this complaint
+            text: Raw complaint text
+            top_k: Number of predictions to keep (None keeps all classes)
+            timings: Optional dict that receives the queue wait ("batch_wait") and the
+                per-stage seconds of the batch this complaint was scored in
+                
+        Returns:
+            Same result as predictor.predict(text, top_k)
+            
+        Raises:
+            ValueError: If the text is invalid, exactly like predictor.predict()
+        """
+        if self._task is None:
+            raise RuntimeError("MicroBatcher.start() has not been called")
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(_PendingPrediction(predictor, text, top_k, future, timings))
+        self._has_pending.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._batch_full.set()
+        return await future
+    
+    async def _run(self):
+        """Flush loop: wait for work, collect a batch, score it, repeat."""
+        while True:
+            await self._has_pending.wait()
+            
+            # Hold the batch open for the rest of the window unless traffic is light
+            if len(self._pending) < self.max_batch_size and self._recent_batch_size >= 1.5:
+                remaining = self.window_seconds - (time.perf_counter() - self._pending[0].enqueued_at)
+                if remaining > 0:
+                    try:
+                        await asyncio.wait_for(self._batch_full.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+            
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                batch.append(self._pending.popleft())
+            
+            if len(self._pending) < self.max_batch_size:
+                self._batch_full.clear()
+            if not self._pending:
+                self._has_pending.clear()
+            
+            # When the queue did not drain completely, traffic is heavy enough to batch
+            backlog = len(batch) + len(self._pending)
+            self._recent_batch_size = 0.8 * self._recent_batch_size + 0.2 * backlog
+            
+            if self.executor is None:
+                await self._score(batch)
+            else:
+                # Keep collecting while this batch runs in the pool
+                task = asyncio.create_task(self._score(batch))
+                self._scoring_tasks.add(task)
+                task.add_done_callback(self._scoring_tasks.discard)
+            
+            # Let the awaiting requests and new arrivals run before the next flush
+            await asyncio.sleep(0)
+    
+    async def _score(self, batch: List[_PendingPrediction]):
+        """Score one batch, grouped by predictor, and resolve every waiting future."""
+        started = time.perf_counter()
+        for item in batch:
+            wait = started - item.enqueued_at
+            self._queue_waits.append(wait)
+            if wait > self._max_queue_wait:
+                self._max_queue_wait = wait
+            if item.timings is not None:
+                item.timings["batch_wait"] = wait
+        
+        self._record_batch_size(len(batch))
+        
+        groups: Dict[Tuple[int, int], List[_PendingPrediction]] = {}
+        for item in batch:
+            groups.setdefault((id(item.predictor), item.top_k), []).append(item)
+        
+        for items in groups.values():
+            predictor = items[0].predictor
+            top_k = items[0].top_k
+            texts = [item.text for item in items]
+            timings = {}
+            try:
+                if self.executor is None:
+                    results = predictor.predict_batch(texts, top_k, timings)
+                else:
+                    results = await self.executor.predict_batch(predictor, texts, top_k, timings)
+            except Exception as e:
+                logger.exception("Batched prediction failed")
+                self._errors += len(items)
+                for item in items:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                continue
+            
+            for item, result in zip(items, results):
+                if item.timings is not None:
+                    # Every complaint in the batch waited for the whole batch
+                    item.timings.update(timings)
+                if item.future.done():
+                    # The caller went away (e.g. client disconnected)
+                    continue
+                if isinstance(result, Exception):
+                    item.future.set_exception(result)
+                else:
+                    item.future.set_result(result)
+    
+    def _record_batch_size(self, size: int):
+        """Update batch counters and the batch-size histogram."""
+        self._batches += 1
+        self._items += size
+        for bucket, upper in enumerate(BATCH_SIZE_BUCKETS):
+            if size <= upper:
+                self._size_histogram[bucket] += 1
+                break
+        else:
+            self._size_histogram[-1] += 1
+    
+    def stats(self) -> Dict:
+        """
+        Return batch-size and queue-wait statistics for tuning.
+        
+        Returns:
+            Dict with batch counts, mean batch size, a batch-size histogram keyed
+            by bucket upper bound, and queue-wait percentiles in milliseconds over
+            the most recent requests
+        """
+        waits = sorted(self._queue_waits)
+        
+        def percentile(q: float) -> float:
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(q * len(waits)))] * 1000.0
+        
+        histogram = {f"le_{upper}": count for upper, count in zip(BATCH_SIZE_BUCKETS, self._size_histogram)}
+        histogram[f"gt_{BATCH_SIZE_BUCKETS[-1]}"] = self._size_histogram[-1]
+        
+        return {
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.window_seconds * 1000.0,
+            "batches": self._batches,
+            "items": self._items,
+            "errors": self._errors,
+            "queued": len(self._pending),
+            "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+            "batch_size_histogram": histogram,
+            "queue_wait_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": self._max_queue_wait * 1000.0,
+            },
+        }
@@ -0,0 +1,216 @@
+"""Executors that run CPU-bound inference off the asyncio event loop."""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+# Predictors loaded once per process-pool worker, keyed by their constructor
+# arguments (the serving model and, when configured, the candidate model)
+_worker_predictors = {}
+
+# Versions the parent asked for that the files on disk did not provide, per key
+_missing_versions = {}
+
+
+class ModelVersionMismatchError(RuntimeError):
+    """Raised when a worker cannot load the model version the parent is serving."""
+    pass
+
+
+def _load_worker_predictor(predictor_kwargs: dict, model_version: str = None):
+    """
+    Load (or reuse) the predictor for predictor_kwargs held by this worker process.
+    
+    The predictor is reloaded when the parent serves a different model_version
+    for the same arguments (after a hot reload). If the files on disk hold yet
+    another version (changed but not reloaded, or rejected by validation), the
+    call fails instead of scoring with an unvalidated model, and later calls for
+    that version fail without loading the files again.
+    
+    Raises:
+        ModelVersionMismatchError: If the files on disk do not hold model_version
+    """
+    key = tuple(sorted(predictor_kwargs.items()))
+    predictor = _worker_predictors.get(key)
+    if predictor is not None and (model_version is None or predictor.model_version == model_version):
+        return predictor
+    if model_version is not None and _missing_versions.get(key) == model_version:
+        raise ModelVersionMismatchError(
+            f"Model version {model_version} is no longer on disk; reload the model to serve the current files"
+        )
+    
+    # Imported here so the parent process never pays for it twice at import time
+    from app.models.predictor import Predictor
+    loaded = Predictor(**predictor_kwargs)
+    _worker_predictors[key] = loaded
+    if model_version is not None and loaded.model_version != model_version:
+        # Kept for when the parent reloads to it, but not used for this version
+        _missing_versions[key] = model_version
+        logger.error(
+            f"Inference worker expected model version {model_version} but found {loaded.model_version} on disk"
+        )
+        raise ModelVersionMismatchError(
+            f"Model version {model_version} is no longer on disk; reload the model to serve the current files"
+        )
+    _missing_versions.pop(key, None)
+    return loaded
+
+
+def _init_worker(predictor_kwargs: dict):
+    """Process-pool initializer: load the model once when the worker starts."""
+    try:
+        _load_worker_predictor(predictor_kwargs)
+    except Exception as e:
+        # Keep the worker alive; the model is loaded on first use (e.g. after a reload)
+        logger.error(f"Inference worker could not load the model at startup: {e}")
+
+
+def _worker_ready() -> bool:
+    """No-op task used to make the pool start its workers eagerly."""
+    return bool(_worker_predictors)
+
+
+def _predict_batch_in_worker(predictor_kwargs: dict, model_version: str, texts: List[str], top_k: int = None,
+                             explain_terms: int = 0):
+    """Score a batch inside a process-pool worker; returns (results, stage timings)."""
+    timings = {}
+    results = _load_worker_predictor(predictor_kwargs, model_version).predict_batch(
+        texts, top_k=top_k, timings=timings, explain_terms=explain_terms
+    )
+    return results, timings
+
+
+class InferenceExecutor:
+    """
+    Runs Predictor calls in a bounded pool so the event loop stays responsive.
+    
+    Modes:
+    - "inline": call the predictor directly on the event loop (previous behaviour)
+    - "thread": run in a ThreadPoolExecutor with max_workers threads
+    - "process": run in a ProcessPoolExecutor; each worker loads the model once
+      at startup and reuses it for every request
+    """
+    
+    def __init__(self, mode: str = "thread", max_workers: int = 4, predictor_kwargs: dict = None):
+        """
+        Initialize the executor.
+        
+        Args:
+            mode: One of "inline", "thread" or "process"
+            max_workers: Number of pool threads or processes
+            predictor_kwargs: Predictor arguments preloaded by process-pool workers (process mode only)
+            
+        Raises:
+            ValueError: If mode or max_workers is invalid
+        """
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode '{mode}', expected one of {EXECUTOR_MODES}")
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        
+        self.mode = mode
+        self.max_workers = max_workers
+        self._in_flight = 0
+        self._completed = 0
+        self._pool = None
+        
+        if mode == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        elif mode == "process":
+            if predictor_kwargs is None:
+                raise ValueError("Process mode requires predictor_kwargs")
+            self._pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(predictor_kwargs,)
+            )
+    
+    async def start(self):
+        """Start process-pool workers eagerly so models are loaded before traffic arrives."""
+        if self.mode != "process":
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(self._pool, _worker_ready) for _ in range(self.max_workers)
+        ])
+        logger.info(f"Started {self.max_workers} inference worker processes")
+    
+    async def predict_batch(self, predictor, texts: Sequence[str], top_k: int = None,
+                            timings: Dict[str, float] = None,
+                            explain_terms: int = 0) -> List[Union[List[Tuple[str, float]], Tuple, ValueError]]:
+        """
+        Run predictor.predict_batch(texts, top_k) in the pool.
+        
+        Args:
+            predictor: Predictor to score with (process workers load the same artifacts)
+            texts: Raw complaint texts
+            top_k: Number of predictions to keep per text (None keeps all classes)
+            timings: Optional dict that receives the predictor's per-stage seconds
+            explain_terms: Contributing terms to return per label (0 disables explanations)
+            
+        Returns:
+            Same result as predictor.predict_batch(texts, top_k, explain_terms=explain_terms)
+            
+        Raises:
+            ModelVersionMismatchError: In process mode, if the model files on disk no
+                longer hold predictor.model_version
+        """
+        if self.mode == "inline":
+            return predictor.predict_batch(texts, top_k, timings, explain_terms)
+        
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        try:
+            if self.mode == "thread":
+                return await loop.run_in_executor(
+                    self._pool, predictor.predict_batch, texts, top_k, timings, explain_terms
+                )
+            results, worker_timings = await loop.run_in_executor(
+                self._pool,
+                _predict_batch_in_worker,
+                predictor.init_kwargs,
+                predictor.model_version,
+                list(texts),
+                top_k,
+                explain_terms
+            )
+            if timings is not None:
+                timings.update(worker_timings)
+            return results
+        finally:
+            self._in_flight -= 1
+            self._completed += 1
+    
+    async def predict(self, predictor, text: str, top_k: int = None,
+                      timings: Dict[str, float] = None, explain_terms: int = 0):
+        """
+        Run a single prediction in the pool.
+        
+        Raises:
+            ValueError: If the text is invalid, exactly like predictor.predict()
+        """
+        result = (await self.predict_batch(predictor, [text], top_k, timings, explain_terms))[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+    
+    def shutdown(self):
+        """Shut down the pool, waiting for running jobs to finish."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+    
+    def stats(self) -> Dict:
+        """Return pool mode, size and job counters."""
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+        }
@@ -0,0 +1,226 @@
+"""Background model reloads with validation and an atomic predictor swap."""
+import asyncio
+import logging
+import math
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.models.artifacts import MANIFEST_NAME
+from app.models.predictor import Predictor
+
+logger = logging.getLogger(__name__)
+
+# Backend directory, which model paths in settings are relative to
+_BACKEND_DIR = Path(__file__).parent.parent.parent
+
+# Raw complaints used to validate a freshly loaded model and to warm up the
+# pipeline (markers, dates and a VIN exercise every cleaning pass)
+SMOKE_COMPLAINTS = (
+    "ENGINE IS SHAKING WHEN IDLING. *TR",
+    "TL* THE VEHICLE EXPERIENCED ENGINE FAILURE ON 6/30/2015 WHILE DRIVING ON THE HIGHWAY.",
+    "AIR BAG WARNING LIGHT CAME ON AND THE AIR BAGS DID NOT DEPLOY IN THE CRASH. *JB",
+    "BRAKES SQUEAL WHEN STOPPING AND THE BRAKE PEDAL GOES TO THE FLOOR.",
+    "STEERING WHEEL LOCKED UP, POWER STEERING PUMP FAILED AT 45 MPH. VIN 1HGCM82633A123456",
+    "TRANSMISSION SLIPS BETWEEN 2ND AND 3RD GEAR; DEALER COULD NOT DUPLICATE. *DT*JB",
+    "THE SEAT BELT WOULD NOT LATCH. THE SEAT BELT RETRACTOR IS BROKEN!",
+    "FUEL LEAK FROM THE FUEL TANK, STRONG SMELL OF GASOLINE IN THE CABIN.",
+)
+
+
+class ModelReloadError(Exception):
+    """Raised when a new model cannot be loaded or fails validation."""
+    pass
+
+
+def validate_predictor(predictor: Predictor):
+    """
+    Score the smoke complaints and check every result is usable.
+    
+    Args:
+        predictor: Freshly loaded predictor
+        
+    Raises:
+        ModelReloadError: If any smoke complaint fails or yields invalid confidences
+    """
+    results = predictor.predict_batch(list(SMOKE_COMPLAINTS), top_k=settings.prediction_top_k)
+    labels = set(str(label) for label in predictor.classes_)
+    for complaint, result in zip(SMOKE_COMPLAINTS, results):
+        if isinstance(result, Exception):
+            raise ModelReloadError(f"Smoke complaint failed ({complaint[:40]!r}): {result}")
+        if not result:
+            raise ModelReloadError(f"Smoke complaint returned no predictions ({complaint[:40]!r})")
+        for label, confidence in result:
+            if str(label) not in labels:
+                raise ModelReloadError(f"Unknown label {label!r} in smoke predictions")
+            if not (math.isfinite(confidence) and 0.0 <= confidence <= 1.0):
+                raise ModelReloadError(f"Invalid confidence {confidence!r} for {label!r}")
+
+
+class ModelManager:
+    """
+    Loads new model versions in the background and swaps them in atomically.
+    
+    A reload builds a new Predictor in a worker thread, validates it on the smoke
+    complaints and only then replaces state.predictor. Requests hold a reference
+    to the predictor they started with, so in-flight requests finish on the old
+    model. A failed load or validation leaves the current model serving.
+    
+    Reloads are triggered with reload() (e.g. from the admin endpoint) or, when
+    watch_interval_seconds > 0, by polling the model files for changes.
+    """
+    
+    def __init__(self, state, predictor_kwargs: Dict, watch_interval_seconds: float = 0.0,
+                 on_swap: Optional[Callable[[Predictor], None]] = None):
+        """
+        Initialize the manager.
+        
+        Args:
+            state: Object whose predictor attribute is served (app.state)
+            predictor_kwargs: Arguments used to construct each new Predictor
+            watch_interval_seconds: Poll interval for file changes (0 disables watching)
+            on_swap: Called with the new predictor right after it starts serving
+        """
+        self.state = state
+        self.predictor_kwargs = dict(predictor_kwargs)
+        self.watch_interval_seconds = watch_interval_seconds
+        self.on_swap = on_swap
+        
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._signature = None
+        self._pending_signature = None
+        
+        # Stats
+        self._reloads = 0
+        self._failures = 0
+        self._last_error = None
+        self._last_reload_at = None
+    
+    def _source_paths(self) -> Tuple[Path, ...]:
+        """Files whose change means a new model version is available."""
+        return (
+            _BACKEND_DIR / self.predictor_kwargs["model_path"],
+            _BACKEND_DIR / self.predictor_kwargs["vectorizer_path"],
+            _BACKEND_DIR / self.predictor_kwargs["artifacts_dir"] / MANIFEST_NAME,
+        )
+    
+    def _source_signature(self) -> Tuple:
+        """Size and modification time of each model file (None when missing)."""
+        signature = []
+        for path in self._source_paths():
+            try:
+                stat = path.stat()
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+    
+    async def start(self):
+        """Start watching the model files if a watch interval is configured."""
+        self._signature = self._source_signature()
+        if self.watch_interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._watch())
+            logger.info(f"Watching model files for changes every {self.watch_interval_seconds}s")
+    
+    async def stop(self):
+        """Stop the file watcher."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+    
+    async def _watch(self):
+        """Poll the model files and reload once a change has settled."""
+        while True:
+            await asyncio.sleep(self.watch_interval_seconds)
+            signature = self._source_signature()
+            if signature == self._signature:
+                self._pending_signature = None
+                continue
+            
+            # Wait one more interval so a copy in progress is not loaded half-written
+            if signature != self._pending_signature:
+                self._pending_signature = signature
+                continue
+            
+            self._signature = signature
+            self._pending_signature = None
+            try:
+                await self.reload(reason="file change")
+            except ModelReloadError:
+                # Already logged; keep serving the current model
+                pass
+    
+    def _load_and_validate(self) -> Predictor:
+        """Build and validate a new predictor (runs in a worker thread)."""
+        predictor = Predictor(**self.predictor_kwargs)
+        validate_predictor(predictor)
+        return predictor
+    
+    async def reload(self, reason: str = "manual") -> Dict:
+        """
+        Load, validate and swap in the model currently on disk.
+        
+        Args:
+            reason: Why the reload was requested (logged)
+            
+        Returns:
+            Dict with status ("reloaded" or "unchanged"), model_version and previous_version
+            
+        Raises:
+            ModelReloadError: If loading or validation fails (the current model keeps serving)
+        """
+        async with self._lock:
+            current: Optional[Predictor] = self.state.predictor
+            previous_version = current.model_version if current is not None else None
+            logger.info(f"Reloading model ({reason}); serving version {previous_version}")
+            
+            started = time.perf_counter()
+            try:
+                predictor = await asyncio.to_thread(self._load_and_validate)
+            except Exception as e:
+                self._failures += 1
+                self._last_error = str(e)
+                logger.error(f"Model reload failed, still serving version {previous_version}: {e}")
+                raise ModelReloadError(str(e)) from e
+            
+            if predictor.model_version == previous_version:
+                logger.info(f"Model version {previous_version} is unchanged, keeping the loaded predictor")
+                return {"status": "unchanged", "model_version": previous_version, "previous_version": previous_version}
+            
+            # Single reference assignment: new requests see the new model, requests
+            # already holding the old predictor finish on it
+            self.state.predictor = predictor
+            self._reloads += 1
+            self._last_error = None
+            self._last_reload_at = time.time()
+            logger.info(
+                f"Model version {predictor.model_version} is now serving "
+                f"(was {previous_version}, loaded and validated in {time.perf_counter() - started:.2f}s)"
+            )
+            if self.on_swap is not None:
+                self.on_swap(predictor)
+            return {
+                "status": "reloaded",
+                "model_version": predictor.model_version,
+                "previous_version": previous_version,
+            }
+    
+    def stats(self) -> Dict:
+        """Return the serving version and reload counters."""
+        predictor = self.state.predictor
+        return {
+            "model_version": predictor.model_version if predictor is not None else None,
+            "precision": predictor.precision if predictor is not None else None,
+            "watching": self._task is not None,
+            "reloads": self._reloads,
+            "failures": self._failures,
+            "last_error": self._last_error,
+            "last_reload_at": self._last_reload_at,
+        }
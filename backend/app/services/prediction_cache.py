@@ -0,0 +1,182 @@
+"""Bounded LRU/TTL cache of predictions keyed on cleaned complaint text."""
+import asyncio
+import hashlib
+import sys
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+
+def _estimate_size(key: bytes, value: List[Tuple[str, float]]) -> int:
+    """Approximate memory held by one cache entry, in bytes."""
+    size = sys.getsizeof(key) + sys.getsizeof(value)
+    for label, confidence in value:
+        size += sys.getsizeof((label, confidence)) + sys.getsizeof(label) + sys.getsizeof(confidence)
+    return size
+
+
+class _CacheEntry:
+    """A cached prediction with its expiry time and size estimate."""
+    
+    __slots__ = ("value", "expires_at", "size")
+    
+    def __init__(self, value, expires_at: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class PredictionCache:
+    """
+    LRU cache of raw predictions with a TTL, an entry limit and an optional memory budget.
+    
+    Keys hash the model version, top_k and the cleaned complaint text, so repeats
+    that differ only in dates, VINs or NHTSA markers share one entry. When a request
+    arrives for a new model version, entries from the previous version are dropped.
+    Concurrent misses for the same key share a single computation.
+    """
+    
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 0, ttl_seconds: float = 3600.0):
+        """
+        Initialize the cache.
+        
+        Args:
+            max_entries: Maximum number of cached predictions
+            max_bytes: Approximate memory budget in bytes (0 disables the budget)
+            ttl_seconds: Time after which an entry expires (0 disables expiry)
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        
+        self._entries: "OrderedDict[bytes, _CacheEntry]" = OrderedDict()
+        self._in_flight: Dict[bytes, asyncio.Task] = {}
+        self._bytes = 0
+        self._model_version = None
+        
+        # Stats
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+    
+    @staticmethod
+    def make_key(model_version: str, cleaned_text: str, top_k: int = None) -> bytes:
+        """Hash the model version, top_k and cleaned text into a cache key."""
+        material = f"{model_version}\0{top_k}\0{cleaned_text}".encode("utf-8")
+        return hashlib.blake2b(material, digest_size=16).digest()
+    
+    async def get_or_compute(
+        self,
+        model_version: str,
+        cleaned_text: str,
+        top_k: int,
+        compute: Callable[[], Awaitable[List[Tuple[str, float]]]]
+    ) -> List[Tuple[str, float]]:
+        """
+        Return the cached prediction, or compute it once and cache it.
+        
+        Args:
+            model_version: Version of the model that will compute the prediction
+            cleaned_text: Complaint text after clean_text
+            top_k: Number of predictions requested
+            compute: Coroutine function producing the prediction on a miss
+            
+        Returns:
+            Raw predictions (list of (label, confidence) tuples)
+            
+        Raises:
+            Whatever compute() raises; errors are never cached
+        """
+        if model_version != self._model_version:
+            self.invalidate()
+            self._model_version = model_version
+        
+        key = self.make_key(model_version, cleaned_text, top_k)
+        
+        entry = self._entries.get(key)
+        if entry is not None:
+            if self.ttl_seconds and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._expirations += 1
+            else:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry.value
+        
+        # Identical request already being computed: wait for its result
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._coalesced += 1
+            return await asyncio.shield(task)
+        
+        self._misses += 1
+        task = asyncio.ensure_future(compute())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._on_computed(key, model_version, done))
+        # Shielded so one caller disconnecting does not cancel the shared computation
+        return await asyncio.shield(task)
+    
+    def _on_computed(self, key: bytes, model_version: str, task: asyncio.Task):
+        """Store a finished computation and release its waiters."""
+        self._in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        if model_version != self._model_version:
+            # The model changed while this prediction was running
+            return
+        self._store(key, task.result())
+    
+    def _store(self, key: bytes, value: List[Tuple[str, float]]):
+        """Insert an entry and evict least recently used entries over the limits."""
+        if key in self._entries:
+            self._remove(key)
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else float("inf")
+        entry = _CacheEntry(value, expires_at, _estimate_size(key, value))
+        self._entries[key] = entry
+        self._bytes += entry.size
+        
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self._evictions += 1
+    
+    def _remove(self, key: bytes):
+        """Remove one entry and release its bytes."""
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+    
+    def invalidate(self):
+        """Drop every cached prediction (e.g. after the model changed)."""
+        if self._entries:
+            self._invalidations += 1
+        self._entries.clear()
+        self._bytes = 0
+    
+    def stats(self) -> Dict:
+        """Return hit/miss/eviction counters and current size."""
+        lookups = self._hits + self._misses + self._coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "model_version": self._model_version,
+            "hits": self._hits,
+            "misses": self._misses,
+            "coalesced": self._coalesced,
+            "hit_rate": (self._hits + self._coalesced) / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "invalidations": self._invalidations,
+            "in_flight": len(self._in_flight),
+        }
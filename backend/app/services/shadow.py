@@ -0,0 +1,227 @@
+"""Shadow and canary evaluation of a candidate model next to the serving model."""
+import asyncio
+import logging
+import random
+import time
+import zlib
+from collections import Counter, deque
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+CANDIDATE_MODES = ("off", "shadow", "canary")
+
+# Number of most frequent (serving label, candidate label) disagreements reported
+_TOP_DISAGREEMENTS = 10
+
+
+class CandidateEvaluator:
+    """
+    Compares a candidate Predictor with the serving one on live /api/diagnose traffic.
+    
+    Modes:
+    - "shadow": a sampled fraction of requests is queued for the candidate after
+      the response has been computed. A single background task drains the queue,
+      so at most one shadow prediction occupies the inference pool at a time.
+      When the queue is full new work is dropped instead of waiting, so shadow
+      scoring never adds latency to the request path.
+    - "canary": a fixed share of complaints is served by the candidate. Routing
+      hashes the complaint text, so the same complaint always gets the same model.
+      
+    Shadow results are compared with the serving model's predictions (top-1
+    agreement and probability deltas of the serving model's top-k labels), and
+    model-call latency is collected per model in both modes.
+    """
+    
+    def __init__(self, candidate, executor, mode: str = "shadow", sample_rate: float = 0.1,
+                 canary_percent: float = 5.0, queue_size: int = 256, stats_window: int = 2048):
+        """
+        Initialize the evaluator. Call start() from a running event loop before use.
+        
+        Args:
+            candidate: Candidate Predictor
+            executor: InferenceExecutor used to score shadow requests
+            mode: "shadow" or "canary"
+            sample_rate: Fraction of requests scored by the candidate in shadow mode
+            canary_percent: Percentage of requests served by the candidate in canary mode
+            queue_size: Maximum number of shadow requests waiting to be scored
+            stats_window: Number of recent latency samples kept per model for percentiles
+            
+        Raises:
+            ValueError: If mode or a rate is invalid
+        """
+        if mode not in ("shadow", "canary"):
+            raise ValueError(f"Unknown candidate mode '{mode}', expected 'shadow' or 'canary'")
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        if not 0.0 <= canary_percent <= 100.0:
+            raise ValueError("canary_percent must be between 0 and 100")
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        
+        self.candidate = candidate
+        self.executor = executor
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.canary_percent = canary_percent
+        
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._task = None
+        self._random = random.Random()
+        
+        # Stats
+        self._submitted = 0
+        self._dropped = 0
+        self._compared = 0
+        self._errors = 0
+        self._top1_agreements = 0
+        self._delta_sum = 0.0
+        self._delta_count = 0
+        self._max_delta = 0.0
+        self._disagreements = Counter()
+        self._served = {"primary": 0, "candidate": 0}
+        self._latencies = {
+            "primary": deque(maxlen=stats_window),
+            "candidate": deque(maxlen=stats_window),
+        }
+    
+    async def start(self):
+        """Start the background task that scores shadow requests."""
+        if self.mode == "shadow" and self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop scoring; queued shadow requests are discarded."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+    
+    def routes_to_candidate(self, complaint: str) -> bool:
+        """Return True if this complaint should be served by the candidate (canary mode)."""
+        if self.mode != "canary":
+            return False
+        bucket = zlib.crc32(complaint.encode("utf-8")) % 10000
+        return bucket < self.canary_percent * 100
+    
+    def is_candidate(self, predictor) -> bool:
+        """Return True if predictor is the candidate model."""
+        return predictor is self.candidate
+    
+    def record_served(self, predictor):
+        """Count a /api/diagnose response produced by predictor."""
+        role = "candidate" if self.is_candidate(predictor) else "primary"
+        self._served[role] += 1
+    
+    def record_latency(self, predictor, latency_seconds: float):
+        """Record one model-call latency for predictor."""
+        role = "candidate" if self.is_candidate(predictor) else "primary"
+        self._latencies[role].append(latency_seconds)
+    
+    def submit_shadow(self, complaint: str, primary_predictions: List[Tuple[str, float]]):
+        """
+        Queue a complaint for shadow scoring if it is sampled (never blocks).
+        
+        Args:
+            complaint: Raw complaint text
+            primary_predictions: Predictions the serving model returned for it
+        """
+        if self.mode != "shadow" or self._task is None:
+            return
+        if self._random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait((complaint, primary_predictions))
+            self._submitted += 1
+        except asyncio.QueueFull:
+            self._dropped += 1
+    
+    async def _run(self):
+        """Score queued shadow requests one at a time and compare the results."""
+        while True:
+            complaint, primary_predictions = await self._queue.get()
+            started = time.perf_counter()
+            try:
+                # All classes, so every serving label can be compared
+                candidate_predictions = await self.executor.predict(self.candidate, complaint, None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._errors += 1
+                logger.debug(f"Shadow prediction failed: {e}")
+                continue
+            self._latencies["candidate"].append(time.perf_counter() - started)
+            self._compare(primary_predictions, candidate_predictions)
+    
+    def _compare(self, primary_predictions: List[Tuple[str, float]],
+                 candidate_predictions: List[Tuple[str, float]]):
+        """Update agreement and probability-delta statistics for one complaint."""
+        if not primary_predictions or not candidate_predictions:
+            return
+        self._compared += 1
+        
+        primary_top = str(primary_predictions[0][0])
+        candidate_top = str(candidate_predictions[0][0])
+        if primary_top == candidate_top:
+            self._top1_agreements += 1
+        else:
+            self._disagreements[(primary_top, candidate_top)] += 1
+        
+        candidate_probabilities = {str(label): confidence for label, confidence in candidate_predictions}
+        for label, confidence in primary_predictions:
+            delta = abs(confidence - candidate_probabilities.get(str(label), 0.0))
+            self._delta_sum += delta
+            self._delta_count += 1
+            if delta > self._max_delta:
+                self._max_delta = delta
+    
+    def stats(self) -> Dict:
+        """
+        Return comparison statistics for the candidate model.
+        
+        Returns:
+            Dict with the mode and candidate version, shadow queue and agreement
+            counters, requests served per model, and model-call latency percentiles
+            in milliseconds per model over the most recent requests
+        """
+        def latency_summary(samples) -> Dict:
+            ordered = sorted(samples)
+            
+            def percentile(q: float) -> float:
+                if not ordered:
+                    return 0.0
+                return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000.0
+            
+            return {
+                "samples": len(ordered),
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+            }
+        
+        return {
+            "mode": self.mode,
+            "model_version": self.candidate.model_version,
+            "sample_rate": self.sample_rate,
+            "canary_percent": self.canary_percent,
+            "shadow": {
+                "submitted": self._submitted,
+                "dropped": self._dropped,
+                "queued": self._queue.qsize(),
+                "compared": self._compared,
+                "errors": self._errors,
+                "top1_agreement": self._top1_agreements / self._compared if self._compared else None,
+                "mean_abs_probability_delta": self._delta_sum / self._delta_count if self._delta_count else None,
+                "max_abs_probability_delta": self._max_delta,
+                "top_disagreements": [
+                    {"primary": primary, "candidate": candidate, "count": count}
+                    for (primary, candidate), count in self._disagreements.most_common(_TOP_DISAGREEMENTS)
+                ],
+            },
+            "served": dict(self._served),
+            "latency_ms": {role: latency_summary(samples) for role, samples in self._latencies.items()},
+        }
@@ -0,0 +1,306 @@
+"""Speech-to-text backends and the process pool that runs them."""
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.services.model_manager import SMOKE_COMPLAINTS
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIBER_BACKENDS = ("off", "whisper", "stub")
+
+
+class TranscriptionError(Exception):
+    """Raised when an audio file cannot be transcribed."""
+    pass
+
+
+class TranscriberUnavailableError(Exception):
+    """Raised when the speech backend cannot be loaded (e.g. missing dependencies)."""
+    pass
+
+
+class TranscriberBusyError(Exception):
+    """Raised when too many transcriptions are already waiting for the pool."""
+    pass
+
+
+class Transcriber(ABC):
+    """Interface of a speech-to-text backend. Instances are created once per worker process."""
+    
+    name = "base"
+    
+    @abstractmethod
+    def transcribe(self, audio_path: str) -> str:
+        """
+        Transcribe an audio file.
+        
+        Args:
+            audio_path: Path of the uploaded audio file
+            
+        Returns:
+            Transcribed text
+            
+        Raises:
+            TranscriptionError: If the audio cannot be decoded or transcribed
+        """
+
+
+class WhisperTranscriber(Transcriber):
+    """OpenAI Whisper model (installed with requirements-voice.txt), loaded once."""
+    
+    name = "whisper"
+    
+    def __init__(self, model_name: str = "base", language: str = "en", device: str = "cpu", threads: int = 0):
+        """
+        Load the Whisper model.
+        
+        Args:
+            model_name: Whisper model size or checkpoint path (e.g. "base", "small")
+            language: Spoken language code ("" lets Whisper detect it)
+            device: Torch device
+            threads: Torch CPU threads per worker (0 keeps the torch default)
+            
+        Raises:
+            TranscriberUnavailableError: If whisper/torch are not installed or the model cannot be loaded
+        """
+        try:
+            import torch
+            import whisper
+        except ImportError as e:
+            raise TranscriberUnavailableError(
+                f"Whisper is not installed ({e}); install it with: pip install -r requirements-voice.txt"
+            )
+        
+        # Several workers each using every core would oversubscribe the CPU
+        if threads > 0:
+            torch.set_num_threads(threads)
+        try:
+            self.model = whisper.load_model(model_name, device=device)
+        except Exception as e:
+            raise TranscriberUnavailableError(f"Could not load Whisper model '{model_name}': {e}")
+        self.language = language or None
+        self.fp16 = device != "cpu"
+    
+    def transcribe(self, audio_path: str) -> str:
+        try:
+            result = self.model.transcribe(audio_path, language=self.language, fp16=self.fp16)
+        except Exception as e:
+            raise TranscriptionError(f"Could not transcribe audio: {e}")
+        return result["text"].strip()
+
+
+class StubTranscriber(Transcriber):
+    """
+    Deterministic local backend for tests and benchmarks; needs no model weights.
+    
+    An upload that is UTF-8 text is "transcribed" to that text, so tests can
+    choose the transcript. Any other file maps to one of the smoke complaints,
+    picked by a hash of its content. latency_ms adds a fixed delay per call to
+    stand in for model time.
+    """
+    
+    name = "stub"
+    
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+    
+    def transcribe(self, audio_path: str) -> str:
+        data = Path(audio_path).read_bytes()
+        if not data:
+            raise TranscriptionError("Audio file is empty")
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+        
+        try:
+            text = data.decode("utf-8").strip()
+            if text and text.isprintable():
+                return text
+        except UnicodeDecodeError:
+            pass
+        digest = hashlib.sha256(data).digest()
+        return SMOKE_COMPLAINTS[int.from_bytes(digest[:4], "big") % len(SMOKE_COMPLAINTS)]
+
+
+def create_transcriber(backend: str, options: Dict) -> Transcriber:
+    """
+    Create the transcriber for a backend name.
+    
+    Args:
+        backend: "whisper" or "stub"
+        options: Keyword arguments of the backend's constructor
+        
+    Raises:
+        ValueError: If the backend is unknown
+        TranscriberUnavailableError: If the backend cannot be loaded
+    """
+    if backend == "whisper":
+        return WhisperTranscriber(**options)
+    if backend == "stub":
+        return StubTranscriber(**options)
+    raise ValueError(f"Unknown transcriber backend '{backend}', expected 'whisper' or 'stub'")
+
+
+# Transcriber loaded once per process-pool worker, or the reason it could not be
+_worker_transcriber: Optional[Transcriber] = None
+_worker_error: Optional[str] = None
+
+
+def _init_worker(backend: str, options: Dict):
+    """Process-pool initializer: load the speech model once when the worker starts."""
+    global _worker_transcriber, _worker_error
+    try:
+        _worker_transcriber = create_transcriber(backend, options)
+    except Exception as e:
+        # Keep the worker alive so the pool reports the error instead of breaking
+        _worker_error = str(e)
+        logger.error(f"Transcription worker could not load the {backend} backend: {e}")
+
+
+def _worker_status() -> Optional[str]:
+    """Return the worker's load error, or None when its transcriber is ready."""
+    return _worker_error
+
+
+def _transcribe_in_worker(audio_path: str) -> str:
+    """Transcribe a file inside a process-pool worker."""
+    if _worker_transcriber is None:
+        raise TranscriberUnavailableError(_worker_error or "Transcriber not loaded")
+    return _worker_transcriber.transcribe(audio_path)
+
+
+class TranscriptionPool:
+    """
+    Runs a Transcriber in a bounded process pool.
+    
+    Each worker loads the speech model once at startup. At most max_workers files
+    are transcribed at a time and at most max_pending more wait for a worker;
+    further requests are rejected instead of queueing without bound. An upload
+    can take its place with reserve() before its body is read, so a full pool
+    turns requests away without receiving their audio.
+    """
+    
+    def __init__(self, backend: str, options: Dict = None, max_workers: int = 1, max_pending: int = 8):
+        """
+        Initialize the pool.
+        
+        Args:
+            backend: "whisper" or "stub"
+            options: Keyword arguments of the backend's constructor
+            max_workers: Worker processes (each holds one model)
+            max_pending: Requests allowed to wait for a free worker
+            
+        Raises:
+            ValueError: If the backend or a size is invalid
+        """
+        if backend not in ("whisper", "stub"):
+            raise ValueError(f"Unknown transcriber backend '{backend}', expected 'whisper' or 'stub'")
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_pending < 0:
+            raise ValueError("max_pending must be at least 0")
+        
+        self.backend = backend
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(backend, dict(options or {}))
+        )
+        
+        # Stats
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._seconds = 0.0
+    
+    async def start(self):
+        """
+        Start the workers and load the speech model in each of them.
+        
+        Raises:
+            TranscriberUnavailableError: If no worker could load the backend
+        """
+        loop = asyncio.get_running_loop()
+        errors = await asyncio.gather(*[
+            loop.run_in_executor(self._pool, _worker_status) for _ in range(self.max_workers)
+        ])
+        if all(error is not None for error in errors):
+            raise TranscriberUnavailableError(errors[0])
+        logger.info(f"Started {self.max_workers} transcription worker processes ({self.backend})")
+    
+    @contextmanager
+    def reserve(self):
+        """
+        Hold one of the pool's places (workers plus pending) for the duration of the block.
+        
+        Raises:
+            TranscriberBusyError: If the pool and its queue are full
+        """
+        if self._in_flight >= self.max_workers + self.max_pending:
+            self._rejected += 1
+            raise TranscriberBusyError("Too many transcriptions in progress")
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+    
+    async def transcribe(self, audio_path: Path, reserved: bool = False) -> str:
+        """
+        Transcribe an audio file in the pool.
+        
+        Args:
+            audio_path: File to transcribe (must stay on disk until this returns)
+            reserved: The caller already holds a place from reserve()
+            
+        Returns:
+            Transcribed text
+            
+        Raises:
+            TranscriberBusyError: If the pool and its queue are full
+            TranscriptionError: If the audio cannot be transcribed
+        """
+        if not reserved:
+            with self.reserve():
+                return await self.transcribe(audio_path, reserved=True)
+        
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            text = await loop.run_in_executor(self._pool, _transcribe_in_worker, str(audio_path))
+        except Exception:
+            self._failed += 1
+            raise
+        self._completed += 1
+        self._seconds += time.perf_counter() - started
+        return text
+    
+    def shutdown(self):
+        """Shut down the pool, waiting for running transcriptions to finish."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+    
+    def stats(self) -> Dict:
+        """Return the backend, pool size and job counters (in_flight includes reserved uploads)."""
+        return {
+            "backend": self.backend,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "mean_ms": self._seconds / self._completed * 1000 if self._completed else None,
+        }
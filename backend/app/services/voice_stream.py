@@ -0,0 +1,438 @@
+"""Incremental transcription and diagnosis of audio streamed over a WebSocket."""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from app.services.executor import ModelVersionMismatchError
+from app.services.transcription import (
+    TranscriberBusyError,
+    TranscriberUnavailableError,
+    TranscriptionError,
+    TranscriptionPool,
+)
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close codes (RFC 6455)
+CLOSE_NORMAL = 1000
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_TOO_BIG = 1009
+CLOSE_INTERNAL_ERROR = 1011
+CLOSE_TRY_AGAIN_LATER = 1013
+
+# RuntimeError messages Starlette and uvicorn raise for a send on a closed WebSocket
+_SEND_AFTER_CLOSE_MESSAGES = (
+    'Cannot call "send" once a close message has been sent',
+    "after sending 'websocket.close'",
+)
+
+
+def _is_send_after_close(error: BaseException) -> bool:
+    """
+    Whether error only says the WebSocket was already closed.
+    
+    Starlette and uvicorn report that case as a plain RuntimeError; subclasses
+    such as BrokenProcessPool or ModelVersionMismatchError are real failures.
+    """
+    return type(error) is RuntimeError and any(
+        message in str(error) for message in _SEND_AFTER_CLOSE_MESSAGES
+    )
+
+
+class VoiceStreams:
+    """Limits the number of concurrent voice streams and counts what they did."""
+    
+    def __init__(self, max_streams: int):
+        """
+        Initialize the limiter.
+        
+        Args:
+            max_streams: Streams allowed at the same time
+            
+        Raises:
+            ValueError: If max_streams is less than 1
+        """
+        if max_streams < 1:
+            raise ValueError("max_streams must be at least 1")
+        self.max_streams = max_streams
+        
+        # Stats
+        self.active = 0
+        self.opened = 0
+        self.rejected = 0
+        self.partials = 0
+        self.scored = 0
+        self.skipped = 0
+        self.replaced = 0
+    
+    def acquire(self) -> bool:
+        """Reserve a stream slot; returns False when every slot is in use."""
+        if self.active >= self.max_streams:
+            self.rejected += 1
+            return False
+        self.active += 1
+        self.opened += 1
+        return True
+    
+    def release(self):
+        """Free a slot reserved by acquire()."""
+        self.active -= 1
+    
+    def stats(self) -> Dict:
+        """Return the stream limit and counters."""
+        return {
+            "max_streams": self.max_streams,
+            "active": self.active,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "partials": self.partials,
+            "scored": self.scored,
+            "skipped_partials": self.skipped,
+            "replaced_messages": self.replaced,
+        }
+
+
+class _LatestMessages:
+    """
+    Outgoing messages of one connection, keeping only the newest of each kind.
+    
+    Each connection sends from its own task, so a client that reads slowly only
+    delays itself. Instead of queueing up behind it, a newer partial result
+    replaces the unsent older one; memory per connection stays bounded and the
+    client always receives the latest state.
+    """
+    
+    def __init__(self, streams: VoiceStreams):
+        self._streams = streams
+        self._pending: Dict[str, str] = {}
+        self._ready = asyncio.Event()
+        self._closed = False
+    
+    def put(self, kind: str, message: Dict):
+        """Queue a message, replacing an unsent one of the same kind."""
+        if kind in self._pending:
+            del self._pending[kind]
+            self._streams.replaced += 1
+        self._pending[kind] = json.dumps(message)
+        self._ready.set()
+    
+    def close(self):
+        """Stop the sender once the queued messages are sent."""
+        self._closed = True
+        self._ready.set()
+    
+    async def run(self, websocket: WebSocket, send_timeout: float):
+        """Send queued messages until close() is called and the queue is empty."""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._pending:
+                kind = next(iter(self._pending))
+                message = self._pending.pop(kind)
+                await asyncio.wait_for(websocket.send_text(message), send_timeout)
+            if self._closed:
+                return
+
+
+class VoiceStreamSession:
+    """
+    One WebSocket voice stream.
+    
+    Protocol: the client sends audio as binary messages while it records and then
+    the text message {"type": "end"}. The server replies with
+    {"type": "partial", "text": ...} as the transcript grows,
+    {"type": "diagnosis", "text": ..., "diagnosis": ...} when a grown transcript
+    is re-scored, and finally {"type": "final", "text": ..., "diagnosis": ...,
+    "error": ...} before closing. Problems are reported as
+    {"type": "error", "detail": ...} followed by a close code.
+    
+    Audio is appended to a temporary file, so memory does not grow with the
+    recording. Whisper needs decodable audio, and a compressed recording is only
+    decodable as a whole, so each partial transcript re-transcribes the audio
+    received so far. To bound the CPU a stream can use, it has at most one
+    transcription in the pool at a time, starts one at most every
+    partial_interval seconds, stops growing at max_bytes, and re-scores the
+    transcript at most every score_interval seconds. A transcript that grows
+    inside that interval is re-scored once it has passed, even if no more
+    audio arrives. A transcript longer than a complaint may be is scored from
+    its beginning (see the score callable).
+    
+    Partial results are best effort: a failure to produce one is logged and
+    the stream carries on. A failure of the final result is sent as an error
+    and closes the stream with CLOSE_TRY_AGAIN_LATER (model reload in
+    progress) or CLOSE_INTERNAL_ERROR.
+    """
+    
+    def __init__(self, websocket: WebSocket, transcriber: TranscriptionPool, streams: VoiceStreams,
+                 score: Callable[[str], Awaitable[Dict]], max_bytes: int, partial_interval: float,
+                 score_interval: float, idle_timeout: float):
+        """
+        Initialize the session.
+        
+        Args:
+            websocket: Accepted WebSocket connection
+            transcriber: Pool that transcribes the audio file
+            streams: Limiter whose counters the session updates
+            score: Coroutine returning the JSON diagnosis of a transcript; raises
+                ValueError if the transcript is not a valid complaint
+            max_bytes: Audio accepted per stream
+            partial_interval: Minimum seconds between partial transcriptions
+            score_interval: Minimum seconds between re-scorings of partial transcripts
+            idle_timeout: Seconds to wait for a client message or a send to complete
+        """
+        self.websocket = websocket
+        self.transcriber = transcriber
+        self.streams = streams
+        self.score = score
+        self.max_bytes = max_bytes
+        self.partial_interval = partial_interval
+        self.score_interval = score_interval
+        self.idle_timeout = idle_timeout
+        
+        self._outbox = _LatestMessages(streams)
+        self._audio_ready = asyncio.Event()
+        self._ended = asyncio.Event()
+        self._path: Optional[Path] = None
+        self._file = None
+        self._size = 0
+        self._transcribed_size = 0
+        self._text: Optional[str] = None
+        self._scored_text: Optional[str] = None
+        self._diagnosis: Optional[Dict] = None
+        self._pending_score: Optional[str] = None
+        self._next_score = 0.0
+    
+    async def run(self):
+        """Serve the stream until the client ends it, disconnects or breaks a limit."""
+        fd, name = tempfile.mkstemp(prefix="voice-stream-")
+        self._path = Path(name)
+        self._file = os.fdopen(fd, "wb")
+        sender = asyncio.create_task(self._outbox.run(self.websocket, self.idle_timeout))
+        partials = asyncio.create_task(self._transcribe_partials())
+        try:
+            code, detail = await self._receive()
+            
+            # The running partial transcription finishes first; a stream never
+            # has more than one job in the pool
+            self._ended.set()
+            await partials
+            if code == CLOSE_NORMAL:
+                code, detail = await self._finish()
+            if detail is not None:
+                self._outbox.put("error", {"type": "error", "detail": detail})
+            self._outbox.close()
+            await sender
+            await self.websocket.close(code)
+        except Exception as e:
+            # A client that went away (or stopped reading) needs nothing more;
+            # anything else is a failure of ours
+            if not isinstance(e, (WebSocketDisconnect, asyncio.TimeoutError)) and not _is_send_after_close(e):
+                sender.cancel()
+                await self._abort(e)
+        finally:
+            self._ended.set()
+            if not partials.done():
+                await asyncio.shield(partials)
+            sender.cancel()
+            self._file.close()
+            self._path.unlink(missing_ok=True)
+    
+    async def _abort(self, error: Exception):
+        """Log an unexpected failure and close the stream with CLOSE_INTERNAL_ERROR."""
+        logger.error(f"Voice stream failed: {error!r}", exc_info=error)
+        try:
+            await asyncio.wait_for(
+                self.websocket.send_json({"type": "error", "detail": "Internal error"}), self.idle_timeout
+            )
+            await self.websocket.close(CLOSE_INTERNAL_ERROR)
+        except (WebSocketDisconnect, asyncio.TimeoutError):
+            pass
+        except RuntimeError as e:
+            if not _is_send_after_close(e):
+                raise
+    
+    async def _receive(self) -> Tuple[int, Optional[str]]:
+        """
+        Append audio messages to the stream file until the client sends "end".
+        
+        Returns:
+            Tuple of (close code, error detail); (CLOSE_NORMAL, None) when the client ended the stream
+            
+        Raises:
+            WebSocketDisconnect: If the client disconnects
+        """
+        while True:
+            try:
+                message = await asyncio.wait_for(self.websocket.receive(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                return CLOSE_POLICY_VIOLATION, f"No message for {self.idle_timeout:g} seconds"
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", CLOSE_NORMAL))
+            
+            data = message.get("bytes")
+            if data is not None:
+                if self._size + len(data) > self.max_bytes:
+                    return CLOSE_TOO_BIG, f"Audio stream exceeds {self.max_bytes} bytes"
+                if data:
+                    await asyncio.to_thread(self._append, data)
+                    self._size += len(data)
+                    self._audio_ready.set()
+                continue
+            
+            try:
+                control = json.loads(message.get("text") or "")
+            except ValueError:
+                control = None
+            if isinstance(control, dict) and control.get("type") == "end":
+                return CLOSE_NORMAL, None
+            return CLOSE_POLICY_VIOLATION, 'Expected binary audio or {"type": "end"}'
+    
+    def _append(self, data: bytes):
+        """Append audio and flush it so pool workers see it."""
+        self._file.write(data)
+        self._file.flush()
+    
+    async def _transcribe(self) -> str:
+        """Transcribe the audio received so far and remember how much that was."""
+        size = self._size
+        text = await self.transcriber.transcribe(self._path)
+        self._transcribed_size = size
+        return text
+    
+    async def _wait_ended(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for the stream to end; returns whether it did."""
+        try:
+            await asyncio.wait_for(self._ended.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+    
+    async def _transcribe_partials(self):
+        """Background task: transcribe new audio and re-score the transcript while the client records."""
+        try:
+            await self._partials_loop()
+        except Exception as e:
+            # Partial results stop; the final one is still produced at the end
+            logger.error(f"Partial results of a voice stream failed: {e!r}", exc_info=e)
+    
+    async def _partials_loop(self):
+        """Produce partial results until the stream ends."""
+        next_partial = 0.0
+        while not self._ended.is_set():
+            now = time.monotonic()
+            
+            # Trailing edge of the debounce: a transcript that changed while
+            # re-scoring was held back is scored once the interval has passed
+            if self._pending_score is not None and now >= self._next_score:
+                await self._score_partial(self._pending_score)
+                continue
+            
+            if self._audio_ready.is_set() and now >= next_partial:
+                self._audio_ready.clear()
+                next_partial = now + self.partial_interval
+                await self._transcribe_partial()
+                continue
+            
+            # Sleep until new audio, the end of the stream, or the next partial
+            # transcription or re-score is due; audio accumulates in the meantime
+            events = [self._ended]
+            due = []
+            if self._audio_ready.is_set():
+                due.append(next_partial)
+            else:
+                events.append(self._audio_ready)
+            if self._pending_score is not None:
+                due.append(self._next_score)
+            waiters = [asyncio.ensure_future(event.wait()) for event in events]
+            timeout = min(due) - now if due else None
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for waiter in waiters:
+                waiter.cancel()
+    
+    async def _transcribe_partial(self):
+        """Transcribe the audio so far, queue the grown transcript and re-score it or schedule that."""
+        try:
+            text = await self._transcribe()
+        except (TranscriberBusyError, TranscriptionError, TranscriberUnavailableError) as e:
+            # A partial result is best effort; the final one is retried at the end
+            self.streams.skipped += 1
+            logger.debug(f"Skipped partial transcription: {e}")
+            return
+        if not text or text == self._text:
+            return
+        self._text = text
+        self.streams.partials += 1
+        self._outbox.put("partial", {"type": "partial", "text": text})
+        
+        # Debounce re-scoring of the growing transcript: score now if the
+        # interval has passed, otherwise when it does (newest transcript wins)
+        if time.monotonic() >= self._next_score:
+            await self._score_partial(text)
+        else:
+            self._pending_score = text
+    
+    async def _score_partial(self, text: str):
+        """Re-score a partial transcript and queue its diagnosis."""
+        self._pending_score = None
+        self._next_score = time.monotonic() + self.score_interval
+        try:
+            diagnosis = await self.score(text)
+        except ValueError:
+            # Too short or otherwise not yet a valid complaint
+            return
+        except ModelVersionMismatchError as e:
+            # A model reload is in progress; the next transcript is scored again
+            self.streams.skipped += 1
+            logger.info(f"Skipped partial diagnosis: {e}")
+            return
+        self._scored_text = text
+        self._diagnosis = diagnosis
+        self.streams.scored += 1
+        self._outbox.put("diagnosis", {"type": "diagnosis", "text": text, "diagnosis": diagnosis})
+    
+    async def _finish(self) -> Tuple[int, Optional[str]]:
+        """
+        Transcribe the whole recording, score it and queue the final message.
+        
+        Returns:
+            Tuple of (close code, error detail)
+            
+        Raises:
+            Exception: Anything the transcriber or score raise besides the
+                errors reported through the close code
+        """
+        if self._size == 0:
+            return CLOSE_POLICY_VIOLATION, "Audio stream is empty"
+        
+        text = self._text
+        if text is None or self._transcribed_size != self._size:
+            try:
+                text = await self._transcribe()
+            except TranscriberBusyError as e:
+                return CLOSE_TRY_AGAIN_LATER, str(e)
+            except TranscriberUnavailableError as e:
+                return CLOSE_TRY_AGAIN_LATER, f"Transcription is unavailable: {e}"
+            except TranscriptionError as e:
+                return CLOSE_POLICY_VIOLATION, str(e)
+        
+        # The last partial diagnosis is reused when the transcript did not change
+        diagnosis = self._diagnosis if text == self._scored_text else None
+        error = None
+        if diagnosis is None:
+            try:
+                diagnosis = await self.score(text)
+                self.streams.scored += 1
+            except ValueError as e:
+                error = f"Transcript is not a valid complaint: {e}"
+            except ModelVersionMismatchError as e:
+                return CLOSE_TRY_AGAIN_LATER, str(e)
+        
+        self._outbox.put("final", {"type": "final", "text": text, "diagnosis": diagnosis, "error": error})
+        return CLOSE_NORMAL, None
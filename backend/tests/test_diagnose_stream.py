@@ -0,0 +1,196 @@
+"""Line splitting and parsing of /api/diagnose/stream, and one round-trip through the app."""
+import asyncio
+import json
+
+import joblib
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from app.api.routes.diagnose import _iter_lines, _parse_stream_line
+from app.core.config import settings
+from app.models.predictor import UNKNOWN_LABEL
+
+MAX_LINE_BYTES = 16
+
+
+class _StreamedRequest:
+    """Stand-in for a Request whose body arrives in the given chunks."""
+    
+    def __init__(self, chunks):
+        self.chunks = chunks
+    
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def _lines(chunks, max_line_bytes=MAX_LINE_BYTES):
+    async def collect():
+        return [item async for item in _iter_lines(_StreamedRequest(chunks), max_line_bytes)]
+    return asyncio.run(collect())
+
+
+def _expected_lines(body, max_line_bytes=MAX_LINE_BYTES):
+    """Reference: split the whole body at once, a final newline ending the last line."""
+    lines = body.split(b"\n")
+    if lines[-1] == b"":
+        lines.pop()
+    return [(i, None if len(line) > max_line_bytes else line) for i, line in enumerate(lines, start=1)]
+
+
+def _split(body, cuts):
+    cuts = [0, *sorted(cuts), len(body)]
+    return [body[start:end] for start, end in zip(cuts, cuts[1:])]
+
+
+BODIES = [
+    b"",
+    b"\n",
+    b"one\ntwo\nthree\n",
+    b"no final newline",
+    b"\n\nblank lines\n\n",
+    b"x" * MAX_LINE_BYTES + b"\n" + b"y" * (MAX_LINE_BYTES + 1) + b"\nshort\n",
+    b"a\n" + b"z" * (5 * MAX_LINE_BYTES) + b"\nb\n",
+    b"short\n" + b"z" * (MAX_LINE_BYTES + 1),
+    b"z" * (3 * MAX_LINE_BYTES),
+    b"\xc3\xa9t\xc3\xa9\n{\"id\": 1}\r\n",
+]
+
+
+@pytest.mark.parametrize("body", BODIES)
+def test_iter_lines_splits_like_the_whole_body(body):
+    assert _lines([body]) == _expected_lines(body)
+
+
+@pytest.mark.parametrize("body", BODIES)
+def test_iter_lines_with_lines_split_across_every_chunk_boundary(body):
+    expected = _expected_lines(body)
+    
+    for cut in range(1, len(body)):
+        assert _lines(_split(body, [cut])) == expected
+    assert _lines([bytes([b]) for b in body]) == expected
+
+
+def test_iter_lines_with_random_chunking():
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        lengths = rng.choice([0, 1, 3, MAX_LINE_BYTES, MAX_LINE_BYTES + 1, 40], size=rng.integers(0, 8))
+        body = b"\n".join(b"w" * int(n) for n in lengths) + (b"\n" if rng.random() < 0.5 else b"")
+        cuts = rng.integers(0, len(body) + 1, size=rng.integers(0, 6)).tolist()
+        
+        assert _lines(_split(body, cuts)) == _expected_lines(body)
+
+
+def test_iter_lines_skips_oversized_lines_but_keeps_counting():
+    body = b"ok\n" + b"x" * 100 + b"\n" + b"also ok\n"
+    
+    assert _lines(_split(body, [5, 20, 40, 103])) == [(1, b"ok"), (2, None), (3, b"also ok")]
+
+
+def test_iter_lines_with_empty_chunks():
+    assert _lines([b"", b"a", b"", b"\nb", b""]) == [(1, b"a"), (2, b"b")]
+
+
+@pytest.mark.parametrize("line_id", ["ODI-1", "", 0, 12345678901234567890, -3, None])
+def test_parse_stream_line_echoes_the_id(line_id):
+    line = json.dumps({"id": line_id, "complaint": "  Engine is shaking when idling.  "}).encode()
+    
+    assert _parse_stream_line(line) == (line_id, "Engine is shaking when idling.", None)
+
+
+def test_parse_stream_line_without_id():
+    assert _parse_stream_line(b'{"complaint": "Brakes squeal"}') == (None, "Brakes squeal", None)
+
+
+@pytest.mark.parametrize("line_id", [True, 1.5, [1], {"a": 1}])
+def test_parse_stream_line_rejects_other_id_types(line_id):
+    line = json.dumps({"id": line_id, "complaint": "Brakes squeal"}).encode()
+    
+    assert _parse_stream_line(line) == (None, None, "id must be a string or an integer")
+
+
+@pytest.mark.parametrize("line", [b"{", b"not json", b'{"complaint": "x"', b"\xff\xfe{}", b"{'id': 1}"])
+def test_parse_stream_line_reports_malformed_json(line):
+    assert _parse_stream_line(line) == (None, None, "Line is not valid JSON")
+
+
+@pytest.mark.parametrize("line", [b"[]", b'"complaint"', b"3", b"null"])
+def test_parse_stream_line_requires_an_object(line):
+    assert _parse_stream_line(line) == (None, None, "Line must be a JSON object")
+
+
+@pytest.mark.parametrize("complaint, message", [
+    (None, "valid string"),
+    (42, "valid string"),
+    ("   ", "Complaint cannot be empty"),
+    ("x" * 501, "at most 500 characters"),
+])
+def test_parse_stream_line_keeps_the_id_of_an_invalid_complaint(complaint, message):
+    line = json.dumps({"id": 7, "complaint": complaint}).encode()
+    
+    line_id, parsed, error = _parse_stream_line(line)
+    
+    assert (line_id, parsed) == (7, None)
+    assert message in error
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """The app serving a small model, streaming in chunks of two lines."""
+    texts = ["engine stalled", "engine misfire oil", "brake pedal squeal", "brakes grinding",
+             "radio noise", "something odd"]
+    labels = ["ENGINE", "ENGINE", "BRAKES", "BRAKES", UNKNOWN_LABEL, UNKNOWN_LABEL]
+    vectorizer = TfidfVectorizer()
+    model = LogisticRegression(max_iter=1000).fit(vectorizer.fit_transform(texts), labels)
+    joblib.dump(model, tmp_path / "model.joblib")
+    joblib.dump(vectorizer, tmp_path / "vectorizer.joblib")
+    
+    monkeypatch.setattr(settings, "model_path", str(tmp_path / "model.joblib"))
+    monkeypatch.setattr(settings, "vectorizer_path", str(tmp_path / "vectorizer.joblib"))
+    monkeypatch.setattr(settings, "artifacts_dir", "")
+    monkeypatch.setattr(settings, "stream_chunk_size", 2)
+    monkeypatch.setattr(settings, "stream_max_line_bytes", 200)
+    
+    from app.main import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_diagnose_stream_round_trip(client):
+    body = b"".join([
+        b'{"id": "a", "complaint": "engine stalled on the highway"}\n',
+        b"\n",
+        b'{"id": 2, "complaint": "brake pedal squeal"}\n',
+        b"not json\n",
+        b'{"id": "too long", "complaint": "' + b"x" * 300 + b'"}\n',
+        b'{"id": "blank", "complaint": "  "}\n',
+        b'{"complaint": "engine misfire"}',
+    ])
+    
+    response = client.post(
+        "/api/diagnose/stream",
+        content=_split(body, [10, 60, 61, 150]),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["X-Model-Version"]
+    items = [json.loads(line) for line in response.text.splitlines()]
+    assert [(item["id"], item["line"]) for item in items] == [
+        ("a", 1), (2, 3), (None, 4), (None, 5), ("blank", 6), (None, 7)
+    ]
+    assert [item["error"] for item in items] == [
+        None, None, "Line is not valid JSON", "Line exceeds 200 bytes", "Value error, Complaint cannot be empty", None
+    ]
+    for item in items:
+        if item["error"] is None:
+            assert item["issues"] and item["suppression_applied"] is not None
+            assert item["issues"][0]["name"] in ("ENGINE", "BRAKES")
+        else:
+            assert item["issues"] is None
+    assert items[0]["issues"][0]["name"] == "ENGINE"
+    assert items[1]["issues"][0]["name"] == "BRAKES"
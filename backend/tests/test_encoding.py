@@ -0,0 +1,165 @@
+"""Byte parity of the direct response encoder with the Pydantic response models."""
+import itertools
+import math
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+
+from app.api.schemas.encoding import CRITICAL_CONFIDENCE, render_batch, render_diagnosis
+from app.api.schemas.response import (
+    BatchDiagnosisItem,
+    BatchDiagnosisResponse,
+    DiagnosedIssue,
+    DiagnosisResponse,
+    ExplainedBatchDiagnosisItem,
+    ExplainedBatchDiagnosisResponse,
+    ExplainedDiagnosisResponse,
+    ExplainedIssue,
+    SuppressionInfo,
+    TermContribution,
+)
+
+TIMESTAMPS = [
+    datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc),
+    datetime(2024, 1, 15, 10, 30, 0, 123000, tzinfo=timezone.utc),
+    datetime(2024, 1, 15, 10, 30, 59, 654321, tzinfo=timezone.utc),
+]
+
+PREDICTIONS = [
+    [],
+    [("ENGINE", 0.91), ("POWER TRAIN", 0.05), ("ELECTRICAL SYSTEM", 0.02)],
+    [("AIR BAGS", 0.8), ("UNKNOWN OR OTHER", 0.7999999999999999), ("BRAKES", 1e-05)],
+    [("SIÈGE ENFANT", 1.0), ('LATCH "ANCHORS"', 0.0), ("tab\there ✓", 0.1 + 0.2)],
+    [("back\\slash", 3.2e-07)],
+]
+
+SUPPRESSION = [
+    {"unknown_suppressed": unknown, "other_suppressed": other}
+    for unknown, other in itertools.product((False, True), repeat=2)
+]
+
+NO_SUPPRESSION = SUPPRESSION[0]
+
+
+def _severity(confidence: float) -> str:
+    return "critical" if confidence >= CRITICAL_CONFIDENCE else "warning"
+
+
+def _explanations(predictions):
+    terms = [("engine", 0.41), ("won't start", 0.18), ("naïve", 1e-06), ('quote"d', 0.5 / 7)]
+    return {name: terms[:i] for i, (name, _) in enumerate(predictions)}
+
+
+def _issues(predictions, explanations=None):
+    if explanations is None:
+        return [
+            DiagnosedIssue(name=name, confidence=confidence, severity=_severity(confidence))
+            for name, confidence in predictions
+        ]
+    return [
+        ExplainedIssue(
+            name=name,
+            confidence=confidence,
+            severity=_severity(confidence),
+            terms=[TermContribution(term=term, weight=weight) for term, weight in explanations[name]]
+        )
+        for name, confidence in predictions
+    ]
+
+
+def _wire_bytes(model) -> bytes:
+    """Body FastAPI sends for a response_model result: JSON-mode dump through JSONResponse."""
+    return JSONResponse(model.model_dump(mode="json")).body
+
+
+@pytest.mark.parametrize("predictions", PREDICTIONS)
+@pytest.mark.parametrize("suppression_info", SUPPRESSION)
+@pytest.mark.parametrize("timestamp", TIMESTAMPS)
+def test_render_diagnosis_matches_pydantic(predictions, suppression_info, timestamp):
+    expected = DiagnosisResponse(
+        issues=_issues(predictions),
+        timestamp=timestamp,
+        suppression_applied=SuppressionInfo(**suppression_info)
+    )
+    
+    assert render_diagnosis(predictions, suppression_info, timestamp) == _wire_bytes(expected)
+
+
+@pytest.mark.parametrize("predictions", PREDICTIONS)
+@pytest.mark.parametrize("suppression_info", SUPPRESSION)
+def test_render_explained_diagnosis_matches_pydantic(predictions, suppression_info):
+    explanations = _explanations(predictions)
+    expected = ExplainedDiagnosisResponse(
+        issues=_issues(predictions, explanations),
+        timestamp=TIMESTAMPS[1],
+        suppression_applied=SuppressionInfo(**suppression_info)
+    )
+    
+    assert render_diagnosis(predictions, suppression_info, TIMESTAMPS[1], explanations) == _wire_bytes(expected)
+
+
+def test_render_diagnosis_agrees_with_model_dump_json():
+    predictions = PREDICTIONS[1]
+    expected = DiagnosisResponse(
+        issues=_issues(predictions),
+        timestamp=TIMESTAMPS[2],
+        suppression_applied=SuppressionInfo(**SUPPRESSION[1])
+    )
+    
+    body = render_diagnosis(predictions, SUPPRESSION[1], TIMESTAMPS[2])
+    
+    assert DiagnosisResponse.model_validate_json(body) == expected
+
+
+@pytest.mark.parametrize("explained", [False, True])
+def test_render_batch_matches_pydantic(explained):
+    items = [
+        (PREDICTIONS[1], SUPPRESSION[0], None),
+        (None, None, "Complaint cannot be empty"),
+        (PREDICTIONS[3], SUPPRESSION[3], None),
+        (None, None, 'bad "input" ✗'),
+        (PREDICTIONS[0], SUPPRESSION[2], None),
+    ]
+    explanations = [_explanations(p) if error is None else None for p, _, error in items] if explained else None
+    item_model = ExplainedBatchDiagnosisItem if explained else BatchDiagnosisItem
+    results = [
+        item_model(index=i, error=error) if error is not None else item_model(
+            index=i,
+            issues=_issues(predictions, explanations[i] if explained else None),
+            suppression_applied=SuppressionInfo(**info)
+        )
+        for i, (predictions, info, error) in enumerate(items)
+    ]
+    response_model = ExplainedBatchDiagnosisResponse if explained else BatchDiagnosisResponse
+    expected = response_model(results=results, succeeded=3, failed=2, timestamp=TIMESTAMPS[1])
+    
+    assert render_batch(items, TIMESTAMPS[1], explanations) == _wire_bytes(expected)
+
+
+@pytest.mark.parametrize("confidence", [math.nan, 1.5, -0.1])
+def test_invalid_confidence_falls_back_to_failing_model(confidence):
+    predictions = [("ENGINE", confidence)]
+    
+    body = render_diagnosis(predictions, NO_SUPPRESSION, TIMESTAMPS[0])
+    
+    assert body is None
+    with pytest.raises(ValidationError):
+        DiagnosisResponse(
+            issues=_issues(predictions),
+            timestamp=TIMESTAMPS[0],
+            suppression_applied=SuppressionInfo(**NO_SUPPRESSION)
+        )
+
+
+def test_non_string_label_is_not_encoded():
+    assert render_diagnosis([(7, 0.5)], NO_SUPPRESSION, TIMESTAMPS[0]) is None
+
+
+@pytest.mark.parametrize("weight", [math.nan, math.inf, -math.inf])
+def test_non_finite_term_weight_is_not_encoded(weight):
+    explanations = {"ENGINE": [("engine", weight)]}
+    
+    assert render_diagnosis([("ENGINE", 0.5)], NO_SUPPRESSION, TIMESTAMPS[0], explanations) is None
+    assert render_batch([([("ENGINE", 0.5)], NO_SUPPRESSION, None)], TIMESTAMPS[0], [explanations]) is None
@@ -0,0 +1,165 @@
+"""Parity of the compiled NumPy engine with the sklearn pipeline it is compiled from."""
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from app.models.inference_engine import PARITY_CORPUS, CompiledLinearModel, UnsupportedModelError
+
+TOPICS = {
+    "ENGINE": "engine stalled idle shaking oil misfire",
+    "BRAKES": "brake pedal squeal stopping rotor abs",
+    "AIR BAGS": "air bag deploy crash warning light sensor",
+    "ELECTRICAL SYSTEM": "battery drains radio dash lights flicker fuse",
+}
+
+FILLER = "the vehicle car when while driving dealer was not and on it".split()
+
+VECTORIZERS = {
+    "unigram": dict(),
+    "bigram_sublinear_stop_words": dict(ngram_range=(1, 2), sublinear_tf=True, stop_words="english"),
+    "l1_without_idf": dict(norm="l1", use_idf=False),
+}
+
+
+def _corpus(labels, n_per_label=30, seed=0):
+    """Complaint-like texts mixing topic words with filler, labelled by topic."""
+    rng = np.random.default_rng(seed)
+    texts, y = [], []
+    for label in labels:
+        words = TOPICS[label].split()
+        for _ in range(n_per_label):
+            tokens = list(rng.choice(words, size=4)) + list(rng.choice(FILLER, size=5))
+            rng.shuffle(tokens)
+            texts.append(" ".join(tokens))
+            y.append(label)
+    return texts, y
+
+
+def _fit(labels, vectorizer_params, **model_params):
+    texts, y = _corpus(labels)
+    vectorizer = TfidfVectorizer(**vectorizer_params)
+    model = LogisticRegression(max_iter=1000, **model_params).fit(vectorizer.fit_transform(texts), y)
+    return model, vectorizer
+
+
+def _eval_texts(labels):
+    texts, _ = _corpus(labels, n_per_label=10, seed=1)
+    return list(PARITY_CORPUS) + texts + ["", "zzzqx"]
+
+
+MODELS = {
+    "binary": (["ENGINE", "BRAKES"], {}),
+    "ovr": (list(TOPICS), {"solver": "liblinear"}),
+    "multinomial": (list(TOPICS), {}),
+}
+
+
+@pytest.fixture(scope="module", params=[(m, v) for m in MODELS for v in VECTORIZERS], ids=lambda p: "-".join(p))
+def fitted(request):
+    model_kind, vectorizer_kind = request.param
+    labels, model_params = MODELS[model_kind]
+    model, vectorizer = _fit(labels, VECTORIZERS[vectorizer_kind], **model_params)
+    return model_kind, model, vectorizer, _eval_texts(labels)
+
+
+@pytest.mark.parametrize("compact_vocabulary", [False, True])
+def test_predict_proba_matches_sklearn(fitted, compact_vocabulary):
+    model_kind, model, vectorizer, texts = fitted
+    engine = CompiledLinearModel.from_sklearn(model, vectorizer, compact_vocabulary=compact_vocabulary)
+    
+    expected = model.predict_proba(vectorizer.transform(texts))
+    actual = engine.predict_proba(texts)
+    
+    assert engine.multinomial == (model_kind == "multinomial")
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(engine.classes_, model.classes_)
+
+
+def test_transform_matches_vectorizer(fitted):
+    _, model, vectorizer, texts = fitted
+    engine = CompiledLinearModel.from_sklearn(model, vectorizer)
+    
+    indptr, indices, data = engine.transform(texts)
+    expected = vectorizer.transform(texts).tocsr()
+    expected.sort_indices()
+    
+    np.testing.assert_array_equal(indptr, expected.indptr)
+    np.testing.assert_array_equal(indices, expected.indices)
+    np.testing.assert_allclose(data, expected.data, rtol=0, atol=1e-12)
+
+
+def test_check_parity_passes_on_the_compiled_pipeline(fitted):
+    _, model, vectorizer, texts = fitted
+    engine = CompiledLinearModel.from_sklearn(model, vectorizer)
+    
+    assert engine.check_parity(model, vectorizer) <= 1e-9
+    assert engine.check_parity(model, vectorizer, corpus=texts) <= 1e-9
+
+
+def test_check_parity_rejects_a_different_model():
+    labels, model_params = MODELS["multinomial"]
+    model, vectorizer = _fit(labels, VECTORIZERS["unigram"], **model_params)
+    engine = CompiledLinearModel.from_sklearn(model, vectorizer)
+    texts, y = _corpus(labels)
+    other = LogisticRegression(max_iter=1000, C=0.01).fit(vectorizer.transform(texts), y)
+    
+    with pytest.raises(UnsupportedModelError, match="Parity check failed"):
+        engine.check_parity(other, vectorizer)
+
+
+def test_check_parity_rejects_a_shape_mismatch():
+    model, vectorizer = _fit(list(TOPICS), VECTORIZERS["unigram"])
+    texts, y = _corpus(["ENGINE", "BRAKES"])
+    binary = LogisticRegression(max_iter=1000).fit(vectorizer.transform(texts), y)
+    engine = CompiledLinearModel.from_sklearn(model, vectorizer)
+    
+    with pytest.raises(UnsupportedModelError, match="Shape mismatch"):
+        engine.check_parity(binary, vectorizer)
+
+
+def test_float32_drift_is_bounded(fitted):
+    _, model, vectorizer, texts = fitted
+    engine = CompiledLinearModel.from_sklearn(model, vectorizer)
+    reduced = engine.with_precision("float32")
+    
+    assert reduced.precision == "float32"
+    assert reduced.coef_t.dtype == np.float32
+    assert reduced.nbytes < engine.nbytes
+    np.testing.assert_allclose(reduced.predict_proba(texts), engine.predict_proba(texts), rtol=0, atol=1e-5)
+
+
+def test_int8_drift_is_within_the_quantization_bound(fitted):
+    _, model, vectorizer, texts = fitted
+    engine = CompiledLinearModel.from_sklearn(model, vectorizer)
+    reduced = engine.with_precision("int8")
+    
+    exact = engine.decision_function(*engine.transform(texts))
+    quantized = reduced.decision_function(*reduced.transform(texts))
+    # Each coefficient is off by at most half its column scale, so a text's
+    # score moves by at most half the scale times the L1 norm of its weights
+    l1 = np.asarray(abs(vectorizer.transform(texts)).sum(axis=1)).ravel()
+    bound = np.outer(l1, reduced.coef_scale.astype(np.float64) / 2) + 1e-5
+    
+    assert reduced.precision == "int8"
+    assert reduced.coef_t.dtype == np.int8
+    assert np.all(np.abs(quantized - exact) <= bound)
+    # and no probability moves by more than the largest score
+    drift = np.abs(reduced.predict_proba(texts) - engine.predict_proba(texts))
+    assert drift.max() <= np.abs(quantized - exact).max() + 1e-5
+    coef_error = np.abs(reduced.dense_coef_t() - engine.dense_coef_t())
+    assert np.all(coef_error <= reduced.coef_scale / 2 + 1e-6 * np.abs(engine.coef_t).max(axis=0))
+
+
+def test_with_precision_only_lowers_precision():
+    model, vectorizer = _fit(list(TOPICS), VECTORIZERS["unigram"])
+    engine = CompiledLinearModel.from_sklearn(model, vectorizer)
+    
+    assert engine.with_precision("float64") is engine
+    int8 = engine.with_precision("float32").with_precision("int8")
+    assert int8.with_precision("int8") is int8
+    with pytest.raises(UnsupportedModelError, match="Cannot raise"):
+        int8.with_precision("float32")
+    with pytest.raises(UnsupportedModelError, match="Unknown precision"):
+        engine.with_precision("float16")
@@ -0,0 +1,135 @@
+"""Predictor._rank against a full stable sort, before and after apply_suppression."""
+import numpy as np
+import pytest
+
+from app.models.predictor import UNKNOWN_LABEL, Predictor
+from app.utils.suppression import apply_suppression
+
+LABELS = ["AIR BAGS", "BRAKES", "ELECTRICAL SYSTEM", "ENGINE", "FUEL SYSTEM", "POWER TRAIN", "STEERING"]
+
+TOP_KS = [1, 2, 3, 5]
+
+
+def _predictor(classes):
+    """A Predictor with only the state _rank reads, without loading artifacts."""
+    predictor = Predictor.__new__(Predictor)
+    predictor.classes_ = np.array(classes, dtype=object)
+    predictor._has_unknown = UNKNOWN_LABEL in set(classes)
+    return predictor
+
+
+def _classes(unknown_position):
+    classes = list(LABELS)
+    if unknown_position is not None:
+        classes.insert(unknown_position, UNKNOWN_LABEL)
+    return classes
+
+
+def _full_ranking(classes, probabilities):
+    """Reference: every class, sorted by descending confidence, ties in class order."""
+    return [
+        [(classes[j], row[j]) for j in np.argsort(-row, kind="stable")]
+        for row in probabilities
+    ]
+
+
+def _random_rows(n_classes, n_rows=200, levels=None, seed=0):
+    """Probability rows; with levels, values are drawn from that many distinct values so rows tie."""
+    rng = np.random.default_rng(seed)
+    if levels is None:
+        rows = rng.random((n_rows, n_classes))
+    else:
+        rows = rng.integers(1, levels + 1, size=(n_rows, n_classes)).astype(np.float64)
+    return rows / rows.sum(axis=1, keepdims=True)
+
+
+def _unknown_at_rank(classes, rank, n_rows=20, seed=0):
+    """Rows where UNKNOWN OR OTHER is the rank-th best class (0 is the best)."""
+    rng = np.random.default_rng(seed)
+    unknown = classes.index(UNKNOWN_LABEL)
+    rows = []
+    for _ in range(n_rows):
+        values = np.sort(rng.random(len(classes)))[::-1]
+        others = rng.permutation([j for j in range(len(classes)) if j != unknown])
+        order = list(others[:rank]) + [unknown] + list(others[rank:])
+        row = np.empty(len(classes))
+        row[order] = values
+        rows.append(row / row.sum())
+    return np.array(rows)
+
+
+def _assert_matches_full_sort(classes, probabilities, top_k):
+    predictor = _predictor(classes)
+    expected = _full_ranking(classes, probabilities)
+    k = len(classes) if top_k is None else min(len(classes), top_k + (UNKNOWN_LABEL in classes))
+    
+    rankings, columns = predictor._rank(probabilities, top_k=top_k, with_columns=True)
+    
+    assert rankings == [row[:k] for row in expected]
+    assert columns.shape == (len(probabilities), k)
+    assert [[classes[j] for j in row] for row in columns] == [[label for label, _ in row] for row in rankings]
+    return rankings, expected
+
+
+@pytest.mark.parametrize("unknown_position", [None, 0, 3, 7])
+@pytest.mark.parametrize("top_k", TOP_KS + [None, 8, 20])
+def test_rank_matches_full_sort(unknown_position, top_k):
+    classes = _classes(unknown_position)
+    
+    _assert_matches_full_sort(classes, _random_rows(len(classes)), top_k)
+
+
+@pytest.mark.parametrize("levels", [1, 2, 3, 6])
+@pytest.mark.parametrize("unknown_position", [None, 0, 4, 7])
+@pytest.mark.parametrize("top_k", TOP_KS)
+def test_rank_breaks_ties_by_class_order(levels, unknown_position, top_k):
+    classes = _classes(unknown_position)
+    probabilities = _random_rows(len(classes), levels=levels, seed=levels)
+    
+    _assert_matches_full_sort(classes, probabilities, top_k)
+
+
+def test_rank_ties_straddling_the_cut_off_keep_the_lowest_classes():
+    classes = _classes(None)
+    row = np.array([0.1, 0.3, 0.1, 0.1, 0.1, 0.2, 0.1])
+    
+    rankings = _predictor(classes)._rank(row[None, :], top_k=3)
+    
+    assert rankings == [[("BRAKES", 0.3), ("POWER TRAIN", 0.2), ("AIR BAGS", 0.1)]]
+
+
+@pytest.mark.parametrize("unknown_rank", [0, 1, 2, 3, 4, 7])
+@pytest.mark.parametrize("top_k", TOP_KS)
+def test_rank_keeps_a_spare_for_unknown_inside_and_outside_the_top_k(unknown_rank, top_k):
+    classes = _classes(2)
+    probabilities = _unknown_at_rank(classes, unknown_rank)
+    
+    rankings, _ = _assert_matches_full_sort(classes, probabilities, top_k)
+    
+    for ranked in rankings:
+        assert len(ranked) == top_k + 1
+        assert (UNKNOWN_LABEL in dict(ranked)) == (unknown_rank <= top_k)
+
+
+@pytest.mark.parametrize("unknown_threshold", [0.0, 0.2, 0.5, 1.1])
+@pytest.mark.parametrize("proximity_threshold", [0.0, 0.15, 1.0])
+@pytest.mark.parametrize("levels", [None, 2, 3])
+def test_suppression_of_top_3_matches_full_ranking(unknown_threshold, proximity_threshold, levels):
+    classes = _classes(1)
+    unknown_first = _unknown_at_rank(classes, 0, n_rows=50, seed=1)
+    probabilities = np.vstack([_random_rows(len(classes), levels=levels), unknown_first])
+    
+    rankings, expected = _assert_matches_full_sort(classes, probabilities, 3)
+    
+    for ranked, full in zip(rankings, expected):
+        assert (apply_suppression(ranked, unknown_threshold, proximity_threshold)
+                == apply_suppression(full, unknown_threshold, proximity_threshold))
+
+
+def test_rank_of_empty_batch():
+    classes = _classes(0)
+    
+    rankings, columns = _predictor(classes)._rank(np.empty((0, len(classes))), top_k=3, with_columns=True)
+    
+    assert rankings == []
+    assert columns.shape[0] == 0
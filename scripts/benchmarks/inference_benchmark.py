@@ -0,0 +1,411 @@
+"""
+Inference Hot-Path Benchmarks
+
+Times the inference hot path against a synthetic TF-IDF + LogisticRegression
+model, so it runs without the private model:
+
+- clean_text on raw complaints (markers, dates and VINs included)
+- Predictor.predict (clean, vectorize, score, rank), plain and with explain
+- Predictor.predict_batch per complaint, plain and with explain
+- apply_suppression on the predictor's output
+- the full /api/diagnose handler, in process through the ASGI app, plain and
+  with explain
+
+The synthetic model mirrors production by default (word 1-2 grams, 50,000
+features, 30 classes including UNKNOWN OR OTHER) and is built from a fixed seed,
+so runs on the same machine are comparable. Each benchmark reports p50/p95/p99
+latency and throughput as JSON.
+
+Comparing against a stored baseline fails the run (exit code 1) when p50 or p95
+latency grows, or throughput drops, by more than --max-regression. Baselines are
+machine specific: save one on the machine that runs the comparison. The run also
+fails when explain mode adds more than --max-explain-overhead to the p50 of
+Predictor.predict or Predictor.predict_batch, measured with plain and explained
+calls interleaved (see paired_overhead).
+
+Usage:
+    python scripts/benchmarks/inference_benchmark.py --output results.json
+    python scripts/benchmarks/inference_benchmark.py --save-baseline scripts/benchmarks/baseline.json
+    python scripts/benchmarks/inference_benchmark.py --baseline scripts/benchmarks/baseline.json --max-regression 0.2
+"""
+import sys
+import os
+import json
+import time
+import platform
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+# Add backend to path to import the app (imported in main, after the settings env is set)
+backend_path = Path(__file__).parent.parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# Real labels used for the first synthetic classes (the rest are numbered)
+_LABELS = [
+    "UNKNOWN OR OTHER", "AIR BAGS", "BRAKES", "ELECTRICAL SYSTEM", "ENGINE",
+    "POWER TRAIN", "SEAT BELTS", "STEERING", "STRUCTURE", "SUSPENSION",
+]
+
+# Metrics compared with the baseline, and whether larger values are better
+_COMPARED = {"p50_ms": False, "p95_ms": False, "throughput_per_s": True}
+
+
+def synthetic_words(rng: np.random.Generator, count: int) -> List[str]:
+    """Distinct lowercase pseudo-words of 3-9 letters."""
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(letters, rng.integers(3, 10))))
+    return sorted(words)
+
+
+def synthetic_complaint(rng: np.random.Generator, words: List[str], n_words: int) -> str:
+    """A raw, NHTSA-style complaint: uppercase words plus a date, VIN or marker."""
+    text = " ".join(words[i] for i in rng.integers(0, len(words), n_words)).upper()
+    extra = rng.integers(0, 4)
+    if extra == 0:
+        text = f"TL* THE CONTACT OWNS A VEHICLE. ON {rng.integers(1, 13)}/{rng.integers(1, 29)}/2015 {text}"
+    elif extra == 1:
+        text = f"{text}. VIN 1HGCM8{rng.integers(10000, 99999)}A12345"
+    elif extra == 2:
+        text = f"{text}. *TR"
+    # The API accepts up to 500 characters
+    return text[:500]
+
+
+def build_synthetic_model(output_dir: Path, vocab_size: int, n_classes: int,
+                          train_docs: int, seed: int = 0) -> Dict:
+    """
+    Fit a TF-IDF vectorizer and LogisticRegression on synthetic complaints and save them.
+
+    Each class draws most of its words from its own slice of the word pool, so
+    the model learns distinct, realistic-looking coefficient patterns.
+
+    Args:
+        output_dir: Directory receiving model.joblib and vectorizer.joblib
+        vocab_size: TF-IDF max_features
+        n_classes: Number of classes (at least 2)
+        train_docs: Number of synthetic training complaints
+        seed: Random seed
+
+    Returns:
+        Dict with model_path, vectorizer_path, the word pool and build statistics
+    """
+    rng = np.random.default_rng(seed)
+    words = synthetic_words(rng, max(vocab_size // 2, n_classes * 20))
+    labels = (_LABELS + [f"SYNTHETIC CLASS {i}" for i in range(len(_LABELS), n_classes)])[:n_classes]
+    slice_size = len(words) // n_classes
+
+    docs, y = [], []
+    for i in range(train_docs):
+        c = i % n_classes
+        own = rng.integers(c * slice_size, (c + 1) * slice_size, 20)
+        shared = rng.integers(0, len(words), 10)
+        docs.append(" ".join(words[j] for j in np.concatenate([own, shared])))
+        y.append(labels[c])
+
+    started = time.perf_counter()
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), max_features=vocab_size)
+    X = vectorizer.fit_transform(docs)
+    model = LogisticRegression(max_iter=200).fit(X, y)
+
+    model_path = output_dir / "model.joblib"
+    vectorizer_path = output_dir / "vectorizer.joblib"
+    joblib.dump(model, model_path)
+    joblib.dump(vectorizer, vectorizer_path)
+    return {
+        "model_path": str(model_path),
+        "vectorizer_path": str(vectorizer_path),
+        "words": words,
+        "features": len(vectorizer.vocabulary_),
+        "classes": len(model.classes_),
+        "build_seconds": time.perf_counter() - started,
+    }
+
+
+def time_calls(func: Callable, inputs: List, iterations: int, warmup: int) -> Dict:
+    """
+    Call func on inputs (cycled) and summarize per-call latency.
+
+    Args:
+        func: Function of one argument
+        inputs: Arguments, used in turn
+        iterations: Timed calls
+        warmup: Untimed calls made first
+
+    Returns:
+        Dict with iterations, mean/p50/p95/p99 latency in milliseconds and throughput per second
+    """
+    for i in range(warmup):
+        func(inputs[i % len(inputs)])
+
+    latencies = np.empty(iterations, dtype=np.float64)
+    clock = time.perf_counter
+    started = clock()
+    for i in range(iterations):
+        call_started = clock()
+        func(inputs[i % len(inputs)])
+        latencies[i] = clock() - call_started
+    total = clock() - started
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000.0
+    return {
+        "iterations": iterations,
+        "mean_ms": float(latencies.mean() * 1000.0),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "throughput_per_s": iterations / total,
+    }
+
+
+def paired_overhead(plain: Callable, explained: Callable, inputs: List, iterations: int, warmup: int) -> float:
+    """
+    Relative p50 cost of explained over plain calls, timed alternately on the same inputs.
+
+    Interleaving the two keeps a burst of machine noise from landing on only one
+    side, so the ratio is stable enough to gate on where two separate runs are not.
+
+    Args:
+        plain: Function of one argument without explanations
+        explained: The same function with explanations
+        inputs: Arguments, used in turn
+        iterations: Timed pairs of calls
+        warmup: Untimed pairs of calls made first
+
+    Returns:
+        p50(explained) / p50(plain) - 1
+    """
+    for i in range(warmup):
+        plain(inputs[i % len(inputs)])
+        explained(inputs[i % len(inputs)])
+
+    latencies = np.empty((iterations, 2), dtype=np.float64)
+    clock = time.perf_counter
+    for i in range(iterations):
+        item = inputs[i % len(inputs)]
+        # Alternate which side goes first, so neither always runs on a warm cache
+        for side in ((0, 1) if i % 2 else (1, 0)):
+            call_started = clock()
+            (plain, explained)[side](item)
+            latencies[i, side] = clock() - call_started
+
+    p50_plain, p50_explained = np.median(latencies, axis=0)
+    return float(p50_explained / p50_plain - 1.0)
+
+
+def run_benchmarks(model_info: Dict, iterations: int, warmup: int, seed: int) -> Tuple[Dict, Dict]:
+    """
+    Run every benchmark against the synthetic model.
+
+    Args:
+        model_info: Result of build_synthetic_model
+        iterations: Timed calls per benchmark
+        warmup: Untimed calls per benchmark
+        seed: Random seed for the complaint corpus
+
+    Returns:
+        Tuple of (benchmark name -> latency summary, benchmark name -> explain
+        mode overhead measured by paired_overhead)
+    """
+    # Point the app at the synthetic model before app.core.config is imported;
+    # distinct complaints and a disabled cache make every handler call a full prediction
+    os.environ.update({
+        "MODEL_PATH": model_info["model_path"],
+        "VECTORIZER_PATH": model_info["vectorizer_path"],
+        "ARTIFACTS_DIR": "",
+        "PREDICTION_CACHE_ENABLED": "false",
+        "CANDIDATE_MODE": "off",
+        "LOG_LEVEL": "WARNING",
+    })
+    from fastapi.testclient import TestClient
+    from app.core.config import settings
+    from app.preprocessing.text_cleaner import clean_text
+    from app.models.predictor import Predictor
+    from app.utils.suppression import apply_suppression
+    from app.main import app
+
+    rng = np.random.default_rng(seed + 1)
+    complaints = [
+        synthetic_complaint(rng, model_info["words"], int(rng.integers(10, 60)))
+        for _ in range(max(iterations + warmup, 1))
+    ]
+
+    predictor = Predictor()
+    predictions = [predictor.predict(text, top_k=settings.prediction_top_k) for text in complaints[:1000]]
+
+    top_k, top_terms = settings.prediction_top_k, settings.explain_top_terms
+
+    def suppress(raw_predictions):
+        return apply_suppression(raw_predictions, settings.unknown_suppression_threshold)
+
+    def predict(text):
+        return predictor.predict(text, top_k=top_k)
+
+    def predict_explain(text):
+        return predictor.predict(text, top_k=top_k, explain_terms=top_terms)
+
+    def batch(texts):
+        return predictor.predict_batch(texts, top_k=top_k)
+
+    def batch_explain(texts):
+        return predictor.predict_batch(texts, top_k=top_k, explain_terms=top_terms)
+
+    results = {}
+    overhead = {}
+    print("Benchmarking clean_text...")
+    results["clean_text"] = time_calls(clean_text, complaints, iterations, warmup)
+    print("Benchmarking Predictor.predict...")
+    results["predictor_predict"] = time_calls(predict, complaints, iterations, warmup)
+    print("Benchmarking Predictor.predict with explain...")
+    results["predictor_predict_explain"] = time_calls(predict_explain, complaints, iterations, warmup)
+    overhead["predictor_predict"] = paired_overhead(predict, predict_explain, complaints, iterations, warmup)
+
+    # Batches of 100 complaints, reported per complaint
+    batches = [complaints[i:i + 100] for i in range(0, max(len(complaints) - 99, 1), 100)]
+    for name, func in (("predictor_batch", batch), ("predictor_batch_explain", batch_explain)):
+        print(f"Benchmarking Predictor.predict_batch{' with explain' if func is batch_explain else ''}...")
+        summary = time_calls(func, batches, max(iterations // 100, 5), 2)
+        results[name] = {
+            key: value * 100 if key in ("iterations", "throughput_per_s") else value / 100
+            for key, value in summary.items()
+        }
+    overhead["predictor_batch"] = paired_overhead(batch, batch_explain, batches, max(iterations // 10, 20), 2)
+
+    print("Benchmarking apply_suppression...")
+    results["apply_suppression"] = time_calls(suppress, predictions, iterations, warmup)
+
+    print("Benchmarking /api/diagnose...")
+    with TestClient(app) as client:
+        def diagnose(text, explain=False):
+            response = client.post("/api/diagnose", json={"complaint": text, "explain": explain})
+            response.raise_for_status()
+
+        results["diagnose_handler"] = time_calls(diagnose, complaints, iterations, warmup)
+        print("Benchmarking /api/diagnose with explain...")
+        def diagnose_explain(text):
+            diagnose(text, explain=True)
+
+        results["diagnose_handler_explain"] = time_calls(diagnose_explain, complaints, iterations, warmup)
+        overhead["diagnose_handler"] = paired_overhead(diagnose, diagnose_explain, complaints, iterations, warmup)
+
+    return results, overhead
+
+
+def compare_with_baseline(results: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """
+    List the metrics that regressed by more than max_regression.
+
+    Args:
+        results: Current benchmark results
+        baseline: Stored benchmark results
+        max_regression: Allowed relative change (0.2 = 20%)
+
+    Returns:
+        One message per regression (empty when within the threshold)
+    """
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for metric, higher_is_better in _COMPARED.items():
+            old, new = reference[metric], current[metric]
+            change = (old - new) / old if higher_is_better else (new - old) / old
+            status = "REGRESSION" if change > max_regression else "ok"
+            print(f"  {name:<20} {metric:<17} {old:>12.4f} -> {new:>12.4f}  regression {change:+.1%}  {status}")
+            if change > max_regression:
+                regressions.append(f"{name} {metric}: {old:.4f} -> {new:.4f} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    """Build the synthetic model, run the benchmarks and check for regressions."""
+    parser = argparse.ArgumentParser(description="Benchmark the inference hot path")
+    parser.add_argument("--vocab-size", type=int, default=50000, help="TF-IDF features of the synthetic model")
+    parser.add_argument("--classes", type=int, default=30, help="Classes of the synthetic model")
+    parser.add_argument("--train-docs", type=int, default=3000, help="Synthetic training complaints")
+    parser.add_argument("--iterations", type=int, default=2000, help="Timed calls per benchmark")
+    parser.add_argument("--warmup", type=int, default=200, help="Untimed calls per benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", default=None, help="Write the results JSON here (default: stdout)")
+    parser.add_argument("--save-baseline", default=None, help="Also store the results as a baseline")
+    parser.add_argument("--baseline", default=None, help="Compare with this baseline")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed relative regression before failing (0.2 = 20%%)")
+    parser.add_argument("--max-explain-overhead", type=float, default=0.15,
+                        help="Allowed p50 cost of explain mode on Predictor.predict and "
+                             "Predictor.predict_batch (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    config = {
+        "vocab_size": args.vocab_size,
+        "classes": args.classes,
+        "train_docs": args.train_docs,
+        "iterations": args.iterations,
+        "seed": args.seed,
+    }
+
+    with tempfile.TemporaryDirectory(prefix="inference-benchmark-") as tmp:
+        print(f"Building synthetic model ({args.vocab_size} features, {args.classes} classes)...")
+        model_info = build_synthetic_model(Path(tmp), args.vocab_size, args.classes, args.train_docs, args.seed)
+        print(f"  Built in {model_info['build_seconds']:.1f}s "
+              f"({model_info['features']} features, {model_info['classes']} classes)")
+        results, overhead = run_benchmarks(model_info, args.iterations, args.warmup, args.seed)
+
+    report = {
+        "config": config,
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+        "explain_overhead": overhead,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+        print(f"Results written to: {args.output}")
+    else:
+        print(text)
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(text + "\n")
+        print(f"Baseline saved to: {args.save_baseline}")
+
+    print("\nExplain mode overhead (p50, paired):")
+    for name, cost in overhead.items():
+        print(f"  {name:<20} {cost:+.1%}")
+    too_slow = [name for name in ("predictor_predict", "predictor_batch")
+                if overhead.get(name, 0.0) > args.max_explain_overhead]
+    if too_slow:
+        print(f"\nFAILED: explain mode adds more than {args.max_explain_overhead:.0%} to {', '.join(too_slow)}")
+        sys.exit(1)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline["config"] != config:
+            raise SystemExit(f"Baseline was recorded with a different config: {baseline['config']}")
+        print(f"\nComparing with baseline {args.baseline} (max regression {args.max_regression:.0%}):")
+        regressions = compare_with_baseline(results, baseline["results"], args.max_regression)
+        if regressions:
+            print(f"\nFAILED: {len(regressions)} regressions")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
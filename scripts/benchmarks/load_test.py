@@ -0,0 +1,420 @@
+"""
+HTTP Load Test for the Diagnosis Service
+
+Starts the FastAPI app under uvicorn (or targets a running server with --url)
+and drives /api/diagnose or /api/diagnose/batch with many concurrent clients.
+
+- Closed loop (default): --concurrency clients each send their next request as
+  soon as the previous one finishes.
+- Open loop (--rate): requests arrive as a Poisson process at the given rate,
+  with at most --concurrency outstanding. Latency is measured from the
+  scheduled arrival, so time spent waiting for a free client counts (no
+  coordinated omission).
+
+Complaints are sampled from a corpus file (CSV column or one complaint per
+line) or generated NHTSA-style, with word counts drawn from a log-normal
+distribution (--mean-words, --words-sigma). While the load runs, GET /health is
+probed every 100ms: its latency shows how long the event loop is blocked.
+
+Each concurrency level reports the latency distribution, error, shed (429/503
+from admission control) and timeout rates and sustained throughput. Passing several levels (--concurrency
+1,2,4,8,16,32) sweeps them and reports the saturation knee: the level with the
+highest power (throughput / mean latency), beyond which added concurrency
+mostly adds queueing.
+
+The load generator is a single asyncio process; check its throughput is well
+below what one Python process can drive (a few thousand requests/s) before
+reading results at very high rates.
+
+Usage:
+    python scripts/benchmarks/load_test.py --concurrency 1,2,4,8,16,32 --duration 10
+    python scripts/benchmarks/load_test.py --workers 4 --rate 200 --concurrency 64 --output load.json
+    python scripts/benchmarks/load_test.py --url http://localhost:8000 --corpus complaints.csv --endpoint batch
+"""
+import sys
+import os
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from inference_benchmark import build_synthetic_model, synthetic_complaint, synthetic_words
+
+backend_path = Path(__file__).parent.parent.parent / "backend"
+
+# Longest complaint the API accepts
+MAX_COMPLAINT_CHARS = 500
+
+# Interval between event-loop probes (GET /health)
+PROBE_INTERVAL_SECONDS = 0.1
+
+
+def load_corpus(path: Path, column: str) -> List[str]:
+    """
+    Read complaints from a CSV column or a text file with one complaint per line.
+
+    Args:
+        path: .csv file or text file
+        column: CSV column holding the complaints
+
+    Returns:
+        Non-empty complaints, truncated to the API limit
+    """
+    if path.suffix.lower() == ".csv":
+        texts = pd.read_csv(path, usecols=[column], dtype=str)[column].dropna().tolist()
+    else:
+        texts = path.read_text(encoding="utf-8").splitlines()
+    texts = [text.strip()[:MAX_COMPLAINT_CHARS] for text in texts]
+    return [text for text in texts if text]
+
+
+def generate_complaints(count: int, mean_words: float, sigma: float, words: List[str], seed: int) -> List[str]:
+    """
+    Generate NHTSA-style complaints with log-normally distributed word counts.
+
+    Args:
+        count: Number of complaints
+        mean_words: Mean words per complaint
+        sigma: Log-normal sigma (0 gives every complaint mean_words words)
+        words: Word pool
+        seed: Random seed
+
+    Returns:
+        Complaints of at most MAX_COMPLAINT_CHARS characters
+    """
+    rng = np.random.default_rng(seed)
+    # Log-normal with the requested mean: mu = ln(mean) - sigma^2 / 2
+    lengths = rng.lognormal(np.log(mean_words) - sigma ** 2 / 2, sigma, count)
+    return [synthetic_complaint(rng, words, max(1, int(round(n)))) for n in lengths]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, env: Dict[str, str]) -> Tuple[subprocess.Popen, str]:
+    """
+    Start uvicorn with the app on a free local port and wait until /ready succeeds.
+
+    Args:
+        workers: uvicorn worker processes
+        env: Extra environment (settings) for the app
+
+    Returns:
+        Tuple of (server process, base URL)
+    """
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=backend_path,
+        env={**os.environ, **env},
+    )
+    url = f"http://127.0.0.1:{port}"
+
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited during startup (code {process.returncode})")
+        try:
+            if httpx.get(f"{url}/ready", timeout=1.0).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("Server did not become ready within 120s")
+
+
+def summarize(latencies: List[float], errors: int, timeouts: int, elapsed: float,
+              probe_latencies: List[float], items_per_request: int, shed: int = 0) -> Dict:
+    """
+    Summarize one load level.
+
+    Args:
+        latencies: Seconds per successful request
+        errors: Requests answered with another non-2xx status or failed to connect
+        timeouts: Requests that exceeded the client timeout
+        elapsed: Measured seconds
+        probe_latencies: Seconds per /health probe
+        items_per_request: Complaints per request (batch size)
+        shed: Requests rejected by admission control (429 or 503)
+
+    Returns:
+        Dict with request counts, rates, throughput and latency percentiles in milliseconds
+    """
+    total = len(latencies) + errors + timeouts + shed
+    ordered = np.array(latencies) * 1000.0
+    percentiles = np.percentile(ordered, [50, 90, 95, 99]) if len(ordered) else [0.0] * 4
+    probes = np.array(probe_latencies) * 1000.0
+    throughput = len(latencies) / elapsed if elapsed else 0.0
+    mean_seconds = float(ordered.mean()) / 1000.0 if len(ordered) else 0.0
+    return {
+        "requests": total,
+        "succeeded": len(latencies),
+        "error_rate": errors / total if total else 0.0,
+        "shed_rate": shed / total if total else 0.0,
+        "timeout_rate": timeouts / total if total else 0.0,
+        "throughput_per_s": throughput,
+        "complaints_per_s": throughput * items_per_request,
+        "latency_ms": {
+            "mean": float(ordered.mean()) if len(ordered) else 0.0,
+            "p50": float(percentiles[0]),
+            "p90": float(percentiles[1]),
+            "p95": float(percentiles[2]),
+            "p99": float(percentiles[3]),
+            "max": float(ordered.max()) if len(ordered) else 0.0,
+        },
+        "health_probe_ms": {
+            "p50": float(np.percentile(probes, 50)) if len(probes) else 0.0,
+            "p99": float(np.percentile(probes, 99)) if len(probes) else 0.0,
+            "max": float(probes.max()) if len(probes) else 0.0,
+        },
+        # Kleinrock's power: peaks where added load stops buying throughput
+        "power": throughput / mean_seconds if mean_seconds else 0.0,
+    }
+
+
+async def run_level(url: str, endpoint: str, complaints: List[str], concurrency: int,
+                    duration: float, warmup: float, rate: Optional[float], batch_size: int,
+                    timeout: float, seed: int) -> Dict:
+    """
+    Drive the service at one concurrency level.
+
+    Args:
+        url: Base URL of the service
+        endpoint: "diagnose" or "batch"
+        complaints: Complaints to sample from
+        concurrency: Concurrent clients (maximum outstanding requests)
+        duration: Measured seconds
+        warmup: Seconds of load before measuring
+        rate: Open-loop arrival rate in requests/s (None for closed loop)
+        batch_size: Complaints per batch request
+        timeout: Client timeout in seconds
+        seed: Random seed for complaint sampling and arrivals
+
+    Returns:
+        Summary of the measured window (see summarize)
+    """
+    rng = np.random.default_rng(seed)
+    latencies: List[float] = []
+    probe_latencies: List[float] = []
+    errors = 0
+    shed = 0
+    timeouts = 0
+    clock = time.perf_counter
+    started = clock()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    if endpoint == "batch":
+        path = "/api/diagnose/batch"
+        items_per_request = batch_size
+
+        def payload():
+            picks = rng.integers(0, len(complaints), batch_size)
+            return {"complaints": [complaints[i] for i in picks]}
+    else:
+        path = "/api/diagnose"
+        items_per_request = 1
+
+        def payload():
+            return {"complaint": complaints[rng.integers(0, len(complaints))]}
+
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+
+        async def send(scheduled_at: float):
+            nonlocal errors, shed, timeouts
+            status = None
+            try:
+                response = await client.post(path, json=payload())
+                status = response.status_code
+                ok = response.is_success
+            except httpx.TimeoutException:
+                if scheduled_at >= measure_from:
+                    timeouts += 1
+                return
+            except httpx.HTTPError:
+                ok = False
+            if scheduled_at < measure_from:
+                return
+            if ok:
+                latencies.append(clock() - scheduled_at)
+            elif status in (429, 503):
+                shed += 1
+            else:
+                errors += 1
+
+        async def closed_loop_client():
+            while clock() < stop_at:
+                await send(clock())
+
+        async def open_loop():
+            slots = asyncio.Semaphore(concurrency)
+            tasks = set()
+            next_arrival = started
+
+            async def send_in_slot(scheduled_at: float):
+                async with slots:
+                    await send(scheduled_at)
+
+            while next_arrival < stop_at:
+                delay = next_arrival - clock()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                task = asyncio.create_task(send_in_slot(next_arrival))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                next_arrival += rng.exponential(1.0 / rate)
+            if tasks:
+                await asyncio.gather(*tasks)
+
+        async def probe():
+            while clock() < stop_at:
+                probe_started = clock()
+                try:
+                    await client.get("/health")
+                    if probe_started >= measure_from:
+                        probe_latencies.append(clock() - probe_started)
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+
+        if rate:
+            await asyncio.gather(open_loop(), probe())
+        else:
+            await asyncio.gather(*(closed_loop_client() for _ in range(concurrency)), probe())
+
+    # Requests still running at stop_at count towards the window they finished in
+    elapsed = max(clock(), stop_at) - measure_from
+    return summarize(latencies, errors, timeouts, elapsed, probe_latencies, items_per_request, shed)
+
+
+def find_knee(levels: List[Dict]) -> Optional[int]:
+    """Concurrency with the highest power (throughput / mean latency)."""
+    if not levels:
+        return None
+    return max(levels, key=lambda level: level["power"])["concurrency"]
+
+
+def main():
+    """Start the service, run the load levels and report the results."""
+    parser = argparse.ArgumentParser(description="Load test the diagnosis HTTP service")
+    parser.add_argument("--url", default=None, help="Target a running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (started server)")
+    parser.add_argument("--model", default=None,
+                        help="model.joblib for the started server (default: a synthetic model)")
+    parser.add_argument("--vectorizer", default=None, help="vectorizer.joblib for the started server")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra setting for the started server (e.g. INFERENCE_EXECUTOR=process)")
+    parser.add_argument("--endpoint", choices=["diagnose", "batch"], default="diagnose", help="Endpoint to drive")
+    parser.add_argument("--batch-size", type=int, default=32, help="Complaints per batch request")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32",
+                        help="Comma-separated concurrency levels (several levels run a sweep)")
+    parser.add_argument("--rate", type=float, default=None, help="Open-loop arrival rate in requests/s")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds of load per level")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Client timeout in seconds")
+    parser.add_argument("--corpus", default=None, help="Complaint corpus: .csv file or one complaint per line")
+    parser.add_argument("--corpus-column", default="summary", help="CSV column holding the complaints")
+    parser.add_argument("--complaints", type=int, default=10000, help="Synthetic complaints to generate")
+    parser.add_argument("--mean-words", type=float, default=40.0, help="Mean words per synthetic complaint")
+    parser.add_argument("--words-sigma", type=float, default=0.6, help="Log-normal sigma of complaint length")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", default=None, help="Write the results JSON here")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    print("=" * 70)
+    print("LOAD TEST")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory(prefix="load-test-") as tmp:
+        model_info = None
+        if args.url is None and args.model is None:
+            print("Building synthetic model...")
+            model_info = build_synthetic_model(Path(tmp), 50000, 30, 3000, args.seed)
+
+        if args.corpus:
+            complaints = load_corpus(Path(args.corpus), args.corpus_column)
+            print(f"Loaded {len(complaints)} complaints from: {args.corpus}")
+        else:
+            # Words the synthetic model knows, or a fresh pool for other models
+            words = model_info["words"] if model_info else synthetic_words(np.random.default_rng(args.seed), 25000)
+            complaints = generate_complaints(args.complaints, args.mean_words, args.words_sigma, words, args.seed)
+            print(f"Generated {len(complaints)} synthetic complaints (mean {args.mean_words:g} words)")
+
+        server = None
+        url = args.url
+        if url is None:
+            env = {"LOG_LEVEL": "WARNING"}
+            if args.model:
+                env.update(MODEL_PATH=str(Path(args.model).resolve()), ARTIFACTS_DIR="")
+                if args.vectorizer:
+                    env["VECTORIZER_PATH"] = str(Path(args.vectorizer).resolve())
+            else:
+                env.update(MODEL_PATH=model_info["model_path"], VECTORIZER_PATH=model_info["vectorizer_path"],
+                           ARTIFACTS_DIR="")
+            env.update(setting.split("=", 1) for setting in args.env)
+            print(f"Starting server with {args.workers} workers...")
+            server, url = start_server(args.workers, env)
+        print(f"Target: {url}{'/api/diagnose/batch' if args.endpoint == 'batch' else '/api/diagnose'}")
+        mode = f"open loop at {args.rate:g} req/s" if args.rate else "closed loop"
+        print(f"Mode: {mode}, {args.duration:g}s per level after {args.warmup:g}s warm-up\n")
+
+        results = []
+        try:
+            print(f"{'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+                  f"{'errors':>7} {'shed':>7} {'timeouts':>8} {'health p99':>10}")
+            for index, concurrency in enumerate(levels):
+                summary = asyncio.run(run_level(
+                    url, args.endpoint, complaints, concurrency, args.duration, args.warmup,
+                    args.rate, args.batch_size, args.timeout, args.seed + index
+                ))
+                summary = {"concurrency": concurrency, **summary}
+                results.append(summary)
+                latency = summary["latency_ms"]
+                print(f"{concurrency:>5} {summary['throughput_per_s']:>9.1f} {latency['p50']:>9.2f} "
+                      f"{latency['p95']:>9.2f} {latency['p99']:>9.2f} {summary['error_rate']:>7.1%} "
+                      f"{summary['shed_rate']:>7.1%} {summary['timeout_rate']:>8.1%} {summary['health_probe_ms']['p99']:>10.2f}")
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+    report = {
+        "config": {
+            "url": args.url,
+            "workers": None if args.url else args.workers,
+            "endpoint": args.endpoint,
+            "batch_size": args.batch_size if args.endpoint == "batch" else None,
+            "rate": args.rate,
+            "duration": args.duration,
+            "corpus": args.corpus,
+            "complaints": len(complaints),
+        },
+        "levels": results,
+        "knee_concurrency": find_knee(results),
+    }
+    if len(results) > 1:
+        print(f"\nSaturation knee (highest throughput / mean latency): concurrency {report['knee_concurrency']}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Results written to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Content-Addressed Feature Cache
+
+Caches the data derived from the dataset so repeated evaluation (or threshold
+tuning / training) runs skip the split, clean_text and TF-IDF work when none of
+their inputs changed. Entries are layered, each key extending the previous one:
+
+- split:   dataset file hash + target column + split seed
+           -> test row positions and labels (split-<key>.npz)
+- cleaned: split key + text_cleaner.py source hash + chunk size
+           -> cleaned test texts, one entry per chunk of test rows
+              (cleaned-<key>-<chunk>.joblib)
+- tfidf:   cleaned key + vectorizer artifact hash
+           -> sparse TF-IDF matrix, one entry per chunk (tfidf-<key>-<chunk>.npz)
+
+So a new vectorizer only rebuilds the matrices, a text_cleaner change rebuilds
+the cleaned text and the matrices, and a new dataset or seed rebuilds everything.
+Chunk entries are built and read independently, so worker processes can each
+fill and score their own chunks and no process ever holds the whole test set.
+Files are written to a temporary name and renamed, so an interrupted run never
+leaves a partial entry and keeps the chunks it completed. File hashes are
+memoized by (size, mtime) in hashes.json, so an unchanged dataset is not re-read
+to compute its hash.
+
+Delete the cache directory to clear it.
+"""
+import os
+import json
+import hashlib
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+
+# Source file whose changes invalidate the cleaned text
+TEXT_CLEANER_PATH = Path(__file__).parent.parent.parent / "backend" / "app" / "preprocessing" / "text_cleaner.py"
+
+# Bump when the layout of cache entries changes
+CACHE_FORMAT = 2
+
+# File suffix of each per-chunk entry kind
+_CHUNK_SUFFIXES = {"cleaned": ".joblib", "tfidf": ".npz"}
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _key(*parts) -> str:
+    """Combine key parts into a short hex key."""
+    return hashlib.sha256(json.dumps([CACHE_FORMAT, *parts]).encode("utf-8")).hexdigest()[:24]
+
+
+class FeatureCache:
+    """Split indices, cleaned text and TF-IDF matrices cached on disk by content hash."""
+
+    def __init__(self, cache_dir: Path):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding the cache entries (created if missing)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._hashes_path = self.cache_dir / "hashes.json"
+        self.hits: List[str] = []
+        self.misses: List[str] = []
+
+    def file_hash(self, path: Path) -> str:
+        """
+        Return the SHA-256 of a file, reusing the stored hash while its size and mtime are unchanged.
+
+        Args:
+            path: File to hash
+
+        Returns:
+            Hex digest
+        """
+        path = Path(path).resolve()
+        stat = path.stat()
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        hashes = json.loads(self._hashes_path.read_text()) if self._hashes_path.exists() else {}
+        entry = hashes.get(str(path))
+        if entry and entry["stamp"] == stamp:
+            return entry["sha256"]
+
+        digest = file_sha256(path)
+        hashes[str(path)] = {"stamp": stamp, "sha256": digest}
+        self._write(self._hashes_path, lambda tmp: tmp.write_text(json.dumps(hashes, indent=2)))
+        return digest
+
+    def split_key(self, dataset_path: Path, target_col: str, random_state: int) -> str:
+        """Key of the split entry."""
+        return _key("split", self.file_hash(dataset_path), target_col, random_state)
+
+    def cleaned_key(self, split_key: str, chunk_size: int) -> str:
+        """Key of the cleaned-text chunk entries (chunk boundaries depend on chunk_size)."""
+        return _key("cleaned", split_key, self.file_hash(TEXT_CLEANER_PATH), chunk_size)
+
+    def tfidf_key(self, cleaned_key: str, vectorizer_path: Path) -> str:
+        """Key of the TF-IDF matrix chunk entries."""
+        return _key("tfidf", cleaned_key, self.file_hash(vectorizer_path))
+
+    def split(self, key: str, build: Callable[[], Tuple[np.ndarray, List[str]]]) -> Tuple[np.ndarray, List[str]]:
+        """
+        Return the cached split, building it with build() on a miss.
+
+        Args:
+            key: split_key(...)
+            build: Returns (test row positions in the file, test labels)
+
+        Returns:
+            Tuple of (test row positions, test labels as strings)
+        """
+        path = self.cache_dir / f"split-{key}.npz"
+        if path.exists():
+            self.hits.append("split")
+            with np.load(path, allow_pickle=False) as data:
+                return data["test_rows"], data["y_test"].tolist()
+
+        self.misses.append("split")
+        test_rows, y_test = build()
+        self._write(path, lambda tmp: np.savez(
+            tmp, test_rows=np.asarray(test_rows, dtype=np.int64), y_test=np.asarray(y_test, dtype=str)
+        ))
+        return test_rows, list(y_test)
+
+    def has_chunk(self, kind: str, key: str, index: int) -> bool:
+        """
+        Whether a chunk entry is cached.
+
+        Args:
+            kind: "cleaned" or "tfidf"
+            key: cleaned_key(...) or tfidf_key(...)
+            index: Chunk number
+
+        Returns:
+            True if the entry exists
+        """
+        return self._chunk_path(kind, key, index).exists()
+
+    def cleaned_chunk(self, key: str, index: int, build: Callable[[], List[str]]) -> List[str]:
+        """
+        Return one chunk of cached cleaned texts, building it with build() on a miss.
+
+        Args:
+            key: cleaned_key(...)
+            index: Chunk number
+            build: Returns the cleaned texts of the chunk
+
+        Returns:
+            Cleaned texts in test row order
+        """
+        path = self._chunk_path("cleaned", key, index)
+        if path.exists():
+            self.hits.append("cleaned")
+            return joblib.load(path)
+
+        self.misses.append("cleaned")
+        texts = build()
+        self._write(path, lambda tmp: joblib.dump(texts, tmp))
+        return texts
+
+    def tfidf_chunk(self, key: str, index: int, build: Callable[[], sp.spmatrix]) -> sp.csr_matrix:
+        """
+        Return one chunk of the cached TF-IDF matrix, building it with build() on a miss.
+
+        Args:
+            key: tfidf_key(...)
+            index: Chunk number
+            build: Returns the sparse TF-IDF matrix of the chunk's cleaned texts
+
+        Returns:
+            CSR matrix, one row per test row of the chunk
+        """
+        path = self._chunk_path("tfidf", key, index)
+        if path.exists():
+            self.hits.append("tfidf")
+            return sp.load_npz(path).tocsr()
+
+        self.misses.append("tfidf")
+        matrix = sp.csr_matrix(build())
+        self._write(path, lambda tmp: sp.save_npz(tmp, matrix))
+        return matrix
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """Number of entries of each kind reused and rebuilt so far."""
+        return {"reused": dict(Counter(self.hits)), "rebuilt": dict(Counter(self.misses))}
+
+    def _chunk_path(self, kind: str, key: str, index: int) -> Path:
+        """Path of a per-chunk entry."""
+        return self.cache_dir / f"{kind}-{key}-{index:05d}{_CHUNK_SUFFIXES[kind]}"
+
+    @staticmethod
+    def _write(path: Path, write: Callable[[Path], None]):
+        """Write through a temporary file in the same directory, then rename it into place."""
+        # Keep the suffix: np.savez and save_npz append .npz to other names
+        tmp = path.with_name(f".{path.stem}.{os.getpid()}.tmp{path.suffix}")
+        write(tmp)
+        tmp.replace(path)
@@ -13,9 +13,31 @@ Key Requirements:
 - Compute accuracy, macro/weighted F1, classification report
 - Save results to evaluation/results/
 - DO NOT apply suppression, DO NOT retrain, DO NOT rebalance
+
+The evaluation streams: a first pass reads only the label column to reproduce
+the split, then the test rows are read in chunks and cleaned, vectorized and
+scored in worker processes, each returning confusion-matrix, top-k and
+log-loss accumulators (see streaming_metrics.py). Memory stays bounded by the
+chunk size, and the final metrics are computed from the merged confusion matrix
+rather than from per-row labels, so memory does not grow with the test split
+either. --verify-in-memory also scores the whole test set in memory with sklearn
+and checks the numbers match.
+
+By default the test split, cleaned texts and TF-IDF matrices are kept in a
+content-addressed cache (evaluation/cache, see feature_cache.py), one entry per
+chunk of test rows. The workers build and read the chunk entries themselves, so
+memory stays bounded by the chunk size; a rerun with unchanged inputs scores the
+cached matrices without re-reading the dataset and only the entries whose
+inputs changed are rebuilt. --no-cache streams everything as above.
+
+Usage:
+    python scripts/evaluation/final_baseline_evaluation.py [--workers 8] [--chunk-size 20000]
 """
 import sys
 import os
+import time
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
 import pandas as pd
 import joblib
@@ -33,7 +55,16 @@ import numpy as np
 backend_path = Path(__file__).parent.parent.parent / "backend"
 sys.path.insert(0, str(backend_path))
 
-from app.preprocessing.text_cleaner import clean_text
+from app.preprocessing.text_cleaner import clean_batch
+
+from feature_cache import FeatureCache
+from streaming_metrics import MetricAccumulator, format_report
+
+# Candidate names for the label column, in order of preference
+TARGET_COLUMNS = ['label', 'Label', 'LABEL', 'target', 'fault', 'category']
+
+# Model, vectorizer and label index loaded once per worker process
+_worker_state = {}
 
 
 def load_dataset(csv_path: str) -> pd.DataFrame:
@@ -102,17 +133,6 @@ def split_data(df: pd.DataFrame, target_col: str, random_state: int = 42):
     return X_train, X_test, y_train, y_test
 
 
-def preprocess_text(text_series: pd.Series) -> pd.Series:
-    """
-    Apply clean_text preprocessing to text series.
-    Uses the SAME preprocessing as training.
-    """
-    print("\nPreprocessing text (applying clean_text)...")
-    cleaned = text_series.apply(clean_text)
-    print(f"  Processed {len(cleaned)} texts")
-    return cleaned
-
-
 def evaluate_model(model, vectorizer, X_test, y_test):
     """
     Perform inference on test set and compute metrics.
@@ -125,13 +145,12 @@ def evaluate_model(model, vectorizer, X_test, y_test):
         
     Returns:
         y_pred: Predictions
-        y_proba: Prediction probabilities (if available)
         metrics: Dictionary of computed metrics
     """
     print("\nPerforming inference on test set...")
     
     # Preprocess test texts
-    X_test_cleaned = X_test.apply(clean_text)
+    X_test_cleaned = clean_batch(X_test, n_jobs=os.cpu_count() or 1)
     
     # Vectorize
     print("  Vectorizing test texts...")
@@ -141,10 +160,6 @@ def evaluate_model(model, vectorizer, X_test, y_test):
     print("  Generating predictions...")
     y_pred = model.predict(X_test_vectorized)
     
-    # Get probabilities
-    print("  Computing probabilities...")
-    y_proba = model.predict_proba(X_test_vectorized)
-    
     print(f"  Completed inference on {len(y_test)} test samples")
     
     # Compute metrics
@@ -167,10 +182,313 @@ def evaluate_model(model, vectorizer, X_test, y_test):
         'classification_report': class_report
     }
     
-    return y_pred, y_proba, metrics
+    return y_pred, metrics
+
+
+def read_split_labels(csv_path: str, target_col: str, chunk_size: int):
+    """
+    First pass: read only the text NaN mask and the labels, in chunks.
+    
+    Args:
+        csv_path: Dataset CSV
+        target_col: Name of the target/label column
+        chunk_size: Rows read per chunk
+        
+    Returns:
+        valid_rows: File row positions with both text and label present
+        y_codes: Label code of each valid row (codes follow sorted label order)
+        label_names: Sorted label names
+        n_rows: Number of rows in the file
+    """
+    print(f"\nReading labels from: {csv_path}")
+    valid_parts = []
+    code_parts = []
+    label_codes = {}
+    n_rows = 0
+    for chunk in pd.read_csv(csv_path, usecols=['summary', target_col], dtype=str, chunksize=chunk_size):
+        valid_mask = (chunk['summary'].notna() & chunk[target_col].notna()).to_numpy()
+        labels = chunk[target_col].to_numpy()[valid_mask]
+        codes = np.fromiter(
+            (label_codes.setdefault(label, len(label_codes)) for label in labels),
+            dtype=np.int32,
+            count=labels.shape[0]
+        )
+        valid_parts.append(np.flatnonzero(valid_mask) + n_rows)
+        code_parts.append(codes)
+        n_rows += len(chunk)
+    
+    # Renumber codes in sorted label order, like np.unique does when stratifying
+    # (numeric labels are parsed as numbers by pd.read_csv, so sort them as numbers)
+    try:
+        label_names = sorted(label_codes, key=float)
+    except ValueError:
+        label_names = sorted(label_codes)
+    remap = np.empty(len(label_codes), dtype=np.int32)
+    for label, code in label_codes.items():
+        remap[code] = label_names.index(label)
+    
+    valid_rows = np.concatenate(valid_parts) if valid_parts else np.array([], dtype=np.int64)
+    y_codes = remap[np.concatenate(code_parts)] if code_parts else np.array([], dtype=np.int32)
+    print(f"  Loaded {n_rows} rows")
+    print(f"  After removing NaN: {len(valid_rows)} samples")
+    return valid_rows, y_codes, label_names, n_rows
+
+
+def select_test_rows(valid_rows: np.ndarray, y_codes: np.ndarray, n_rows: int, random_state: int = 42) -> np.ndarray:
+    """
+    Reproduce split_data's 80/20 stratified split on row positions only.
+    
+    train_test_split only looks at the number of samples and the stratification
+    classes, so splitting positions with label codes (in sorted label order)
+    selects exactly the rows split_data puts in the test set.
+    
+    Returns:
+        Boolean mask over file rows, True for test rows
+    """
+    print(f"\nSplitting data (80/20 stratified, random_state={random_state})...")
+    _, test_positions = train_test_split(
+        np.arange(len(valid_rows)),
+        test_size=0.2,
+        random_state=random_state,
+        stratify=y_codes
+    )
+    is_test = np.zeros(n_rows, dtype=bool)
+    is_test[valid_rows[test_positions]] = True
+    print(f"  Train set: {len(valid_rows) - len(test_positions)} samples")
+    print(f"  Test set: {len(test_positions)} samples")
+    return is_test
+
+
+def _init_worker(model_path: str, vectorizer_path: str, labels: list, top_k: int):
+    """Process-pool initializer: load the model and vectorizer once per worker."""
+    _worker_state['model'] = joblib.load(model_path)
+    _worker_state['vectorizer'] = joblib.load(vectorizer_path)
+    _worker_state['labels'] = labels
+    _worker_state['label_index'] = {label: i for i, label in enumerate(labels)}
+    _worker_state['top_k'] = top_k
+
+
+def _init_cached_worker(model_path: str, vectorizer_path: str, labels: list, top_k: int,
+                        cache_dir: str, cleaned_key: str, tfidf_key: str):
+    """Process-pool initializer for cached evaluation: also open the feature cache."""
+    _init_worker(model_path, vectorizer_path, labels, top_k)
+    _worker_state['cache'] = FeatureCache(Path(cache_dir))
+    _worker_state['cleaned_key'] = cleaned_key
+    _worker_state['tfidf_key'] = tfidf_key
+
+
+def _score_chunk(X_vectorized, y_true: list) -> MetricAccumulator:
+    """Score one vectorized chunk of test rows, returning its accumulators."""
+    model = _worker_state['model']
+    label_index = _worker_state['label_index']
+    
+    y_pred = model.predict(X_vectorized)
+    y_proba = model.predict_proba(X_vectorized)
+    
+    accumulator = MetricAccumulator(_worker_state['labels'], top_k=_worker_state['top_k'])
+    accumulator.update(
+        np.array([label_index[label] for label in y_true], dtype=np.int64),
+        np.array([label_index[str(label)] for label in y_pred], dtype=np.int64),
+        y_proba,
+        np.array([label_index[str(label)] for label in model.classes_], dtype=np.int64)
+    )
+    return accumulator
+
+
+def _evaluate_chunk(texts: list, y_true: list) -> MetricAccumulator:
+    """Clean, vectorize and score one chunk of test rows, returning its accumulators."""
+    X_vectorized = _worker_state['vectorizer'].transform(clean_batch(texts))
+    return _score_chunk(X_vectorized, y_true)
+
+
+def _evaluate_cached_chunk(index: int, texts, y_true: list):
+    """
+    Score one chunk of test rows from the feature cache, building its missing entries.
+    
+    Args:
+        index: Chunk number
+        texts: Raw texts of the chunk, or None when its cleaned text or matrix is cached
+        y_true: Labels of the chunk
+        
+    Returns:
+        Tuple of (accumulators, cache summary of this chunk)
+    """
+    cache = _worker_state['cache']
+    cache.hits.clear()
+    cache.misses.clear()
+    
+    def build_tfidf():
+        cleaned = cache.cleaned_chunk(_worker_state['cleaned_key'], index, lambda: clean_batch(texts))
+        return _worker_state['vectorizer'].transform(cleaned)
+    
+    X_vectorized = cache.tfidf_chunk(_worker_state['tfidf_key'], index, build_tfidf)
+    return _score_chunk(X_vectorized, y_true), cache.summary()
+
+
+def evaluate_streaming(csv_path: str, target_col: str, model_path: str, vectorizer_path: str,
+                       workers: int, chunk_size: int, top_k: int = 3) -> MetricAccumulator:
+    """
+    Evaluate on the test split without loading the dataset into memory.
+    
+    Args:
+        csv_path: Dataset CSV
+        target_col: Name of the target/label column
+        model_path: Trained model (joblib)
+        vectorizer_path: Trained vectorizer (joblib)
+        workers: Worker processes for cleaning, vectorizing and scoring
+        chunk_size: Rows per chunk (bounds memory per worker)
+        top_k: k for top-k accuracy
+        
+    Returns:
+        Merged MetricAccumulator over the whole test set
+    """
+    valid_rows, y_codes, label_names, n_rows = read_split_labels(csv_path, target_col, chunk_size)
+    is_test = select_test_rows(valid_rows, y_codes, n_rows)
+    del valid_rows, y_codes
+    
+    model_classes = [str(label) for label in joblib.load(model_path).classes_]
+    labels = sorted(set(label_names) | set(model_classes))
+    total = MetricAccumulator(labels, top_k=top_k)
+    
+    print(f"\nScoring test rows in chunks of {chunk_size} with {workers} workers...")
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, vectorizer_path, labels, top_k)) as pool:
+        pending = set()
+        
+        def collect(return_when):
+            nonlocal pending
+            done, pending = wait(pending, return_when=return_when)
+            for future in done:
+                total.merge(future.result())
+            elapsed = time.perf_counter() - started
+            print(f"  {total.n_rows} test rows scored ({total.n_rows / elapsed:.0f} rows/s)")
+        
+        for chunk in pd.read_csv(csv_path, usecols=['summary', target_col], dtype=str, chunksize=chunk_size):
+            # Chunks keep the file row numbers as their index
+            chunk = chunk[is_test[chunk.index.to_numpy()]]
+            if chunk.empty:
+                continue
+            pending.add(pool.submit(_evaluate_chunk, chunk['summary'].tolist(), chunk[target_col].tolist()))
+            # Keep at most two chunks per worker in flight
+            if len(pending) >= workers * 2:
+                collect(FIRST_COMPLETED)
+        
+        while pending:
+            collect(FIRST_COMPLETED)
+    
+    print(f"  Completed inference on {total.n_rows} test samples")
+    return total
+
+
+def evaluate_cached(csv_path: str, target_col: str, model_path: str, vectorizer_path: str,
+                    cache: FeatureCache, workers: int, chunk_size: int, top_k: int = 3) -> MetricAccumulator:
+    """
+    Evaluate on the test split, reusing the cached split, cleaned text and TF-IDF matrices.
+    
+    The test rows are cut into chunks of chunk_size, each cached separately (see
+    feature_cache.py). Worker processes load or build a chunk's entries and score
+    it, so memory stays bounded by the chunk size as in evaluate_streaming. The
+    dataset is only re-read for chunks with neither cleaned text nor a matrix
+    cached; with a full hit the workers score the cached matrices directly.
+    
+    Args:
+        csv_path: Dataset CSV
+        target_col: Name of the target/label column
+        model_path: Trained model (joblib)
+        vectorizer_path: Trained vectorizer (joblib)
+        cache: Feature cache
+        workers: Worker processes for cleaning, vectorizing and scoring
+        chunk_size: Test rows per chunk (bounds memory per worker)
+        top_k: k for top-k accuracy
+        
+    Returns:
+        Merged MetricAccumulator over the whole test set
+    """
+    def build_split():
+        valid_rows, y_codes, label_names, n_rows = read_split_labels(csv_path, target_col, chunk_size)
+        is_test = select_test_rows(valid_rows, y_codes, n_rows)
+        test_valid = is_test[valid_rows]
+        return valid_rows[test_valid], [label_names[code] for code in y_codes[test_valid]]
+    
+    split_key = cache.split_key(Path(csv_path), target_col, 42)
+    test_rows, y_test = cache.split(split_key, build_split)
+    cleaned_key = cache.cleaned_key(split_key, chunk_size)
+    tfidf_key = cache.tfidf_key(cleaned_key, Path(vectorizer_path))
+    
+    n_test = len(test_rows)
+    n_chunks = -(-n_test // chunk_size)
+    needs_text = [
+        index for index in range(n_chunks)
+        if not cache.has_chunk("tfidf", tfidf_key, index) and not cache.has_chunk("cleaned", cleaned_key, index)
+    ]
+    
+    def chunk_texts():
+        """Yield (chunk number, raw texts) for the chunks in needs_text, reading the CSV once."""
+        texts = {index: [] for index in needs_text}
+        for frame in pd.read_csv(csv_path, usecols=['summary'], dtype=str, chunksize=chunk_size):
+            if not texts:
+                break
+            # Chunks keep the file row numbers as their index; test_rows is sorted
+            lo, hi = np.searchsorted(test_rows, [frame.index[0], frame.index[-1] + 1])
+            summaries = frame['summary'].loc[test_rows[lo:hi]].tolist()
+            position = lo
+            while position < hi:
+                index = position // chunk_size
+                end = min(hi, (index + 1) * chunk_size)
+                if index in texts:
+                    texts[index].extend(summaries[position - lo:end - lo])
+                    if end == min(n_test, (index + 1) * chunk_size):
+                        yield index, texts.pop(index)
+                position = end
+    
+    model_classes = [str(label) for label in joblib.load(model_path).classes_]
+    labels = sorted(set(y_test) | set(model_classes))
+    total = MetricAccumulator(labels, top_k=top_k)
+    
+    print(f"\nScoring {n_test} test rows in {n_chunks} cached chunks with {workers} workers "
+          f"({len(needs_text)} to read from the dataset)...")
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_cached_worker,
+                             initargs=(model_path, vectorizer_path, labels, top_k,
+                                       str(cache.cache_dir), cleaned_key, tfidf_key)) as pool:
+        pending = set()
+        
+        def collect(return_when):
+            nonlocal pending
+            done, pending = wait(pending, return_when=return_when)
+            for future in done:
+                accumulator, chunk_summary = future.result()
+                total.merge(accumulator)
+                for kind, count in chunk_summary["reused"].items():
+                    cache.hits.extend([kind] * count)
+                for kind, count in chunk_summary["rebuilt"].items():
+                    cache.misses.extend([kind] * count)
+            elapsed = time.perf_counter() - started
+            print(f"  {total.n_rows} test rows scored ({total.n_rows / elapsed:.0f} rows/s)")
+        
+        def submit(index, texts):
+            pending.add(pool.submit(_evaluate_cached_chunk, index, texts,
+                                    y_test[index * chunk_size:(index + 1) * chunk_size]))
+            # Keep at most two chunks per worker in flight
+            if len(pending) >= workers * 2:
+                collect(FIRST_COMPLETED)
+        
+        text_free = set(range(n_chunks)) - set(needs_text)
+        for index in sorted(text_free):
+            submit(index, None)
+        for index, texts in chunk_texts():
+            submit(index, texts)
+        
+        while pending:
+            collect(FIRST_COMPLETED)
+    
+    print(f"\nFeature cache: {cache.summary()}")
+    print(f"  Completed inference on {total.n_rows} test samples")
+    return total
 
 
-def save_results(metrics: dict, y_test, y_pred, output_dir: Path):
+def save_results(metrics: dict, n_samples: int, output_dir: Path):
     """Save evaluation results to files."""
     output_dir.mkdir(parents=True, exist_ok=True)
     
@@ -186,18 +504,14 @@ def save_results(metrics: dict, y_test, y_pred, output_dir: Path):
         f.write(f"Accuracy: {metrics['accuracy']:.4f}\n")
         f.write(f"Macro F1-score: {metrics['macro_f1']:.4f}\n")
         f.write(f"Weighted F1-score: {metrics['weighted_f1']:.4f}\n")
-        f.write(f"Total Test Samples: {len(y_test)}\n\n")
+        f.write(f"Total Test Samples: {n_samples}\n\n")
         
         f.write("-" * 70 + "\n")
         f.write("CLASSIFICATION REPORT\n")
         f.write("-" * 70 + "\n\n")
         
-        # Generate string classification report
-        report_str = classification_report(
-            y_test, y_pred,
-            zero_division=0
-        )
-        f.write(report_str)
+        # String classification report, from the accumulated counts
+        f.write(format_report(metrics['classification_report']))
         
         f.write("\n" + "=" * 70 + "\n")
         f.write("Per-class details:\n")
@@ -260,7 +574,7 @@ def save_results(metrics: dict, y_test, y_pred, output_dir: Path):
         json.dump(serializable_metrics, f, indent=2)
 
 
-def print_summary(metrics: dict, y_test):
+def print_summary(metrics: dict, n_samples: int):
     """Print evaluation summary."""
     print("\n" + "=" * 70)
     print("EVALUATION SUMMARY")
@@ -268,10 +582,15 @@ def print_summary(metrics: dict, y_test):
     
     report_dict = metrics['classification_report']
     
-    print(f"\nTotal Test Samples: {len(y_test)}")
+    print(f"\nTotal Test Samples: {n_samples}")
     print(f"Accuracy: {metrics['accuracy']:.4f}")
     print(f"Macro F1-Score: {metrics['macro_f1']:.4f}")
     print(f"Weighted F1-Score: {metrics['weighted_f1']:.4f}")
+    for key, value in metrics.items():
+        if key.startswith('top_') and key.endswith('_accuracy'):
+            print(f"Top-{key[4:-9]} Accuracy: {value:.4f}")
+    if metrics.get('log_loss') is not None:
+        print(f"Log Loss: {metrics['log_loss']:.4f}")
     
     # Extract per-class F1 scores (excluding summary rows)
     class_f1_scores = []
@@ -305,25 +624,41 @@ def print_summary(metrics: dict, y_test):
 
 def main():
     """Main evaluation pipeline."""
+    project_root = Path(__file__).parent.parent.parent
+    
+    parser = argparse.ArgumentParser(description="Evaluate the baseline model on the test split")
+    parser.add_argument("--data", default=str(project_root / "data" / "processed" / "step4_cleaned_text.csv"),
+                        help="Dataset CSV")
+    parser.add_argument("--model", default=None, help="model.joblib (defaults to models/baseline, then backend/artifacts)")
+    parser.add_argument("--vectorizer", default=None, help="vectorizer.joblib (same defaults as --model)")
+    parser.add_argument("--output-dir", default=str(project_root / "evaluation" / "results"), help="Results directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="Rows per chunk")
+    parser.add_argument("--top-k", type=int, default=3, help="k for top-k accuracy")
+    parser.add_argument("--cache-dir", default=str(project_root / "evaluation" / "cache"),
+                        help="Feature cache directory (split, cleaned text, TF-IDF matrix)")
+    parser.add_argument("--no-cache", action="store_true", help="Stream the evaluation without the feature cache")
+    parser.add_argument("--verify-in-memory", action="store_true",
+                        help="Also evaluate the whole test set in memory and check the numbers match")
+    args = parser.parse_args()
+    
     print("=" * 70)
     print("FINAL BASELINE MODEL EVALUATION")
     print("=" * 70)
     
-    # Define paths
-    project_root = Path(__file__).parent.parent.parent
-    data_path = project_root / "data" / "processed" / "step4_cleaned_text.csv"
+    data_path = Path(args.data)
     
     # Try multiple model locations
-    model_path = project_root / "models" / "baseline" / "model.joblib"
-    vectorizer_path = project_root / "models" / "baseline" / "vectorizer.joblib"
+    model_path = Path(args.model) if args.model else project_root / "models" / "baseline" / "model.joblib"
+    vectorizer_path = Path(args.vectorizer) if args.vectorizer else project_root / "models" / "baseline" / "vectorizer.joblib"
     
     # Fallback to backend artifacts if baseline models not found
-    if not model_path.exists():
+    if not args.model and not model_path.exists():
         model_path = project_root / "backend" / "artifacts" / "model.joblib"
-    if not vectorizer_path.exists():
+    if not args.vectorizer and not vectorizer_path.exists():
         vectorizer_path = project_root / "backend" / "artifacts" / "vectorizer.joblib"
     
-    output_dir = project_root / "evaluation" / "results"
+    output_dir = Path(args.output_dir)
     
     # Verify files exist
     if not data_path.exists():
@@ -343,43 +678,74 @@ def main():
     print(f"Using model: {model_path}")
     print(f"Using vectorizer: {vectorizer_path}")
     
-    # Load dataset
-    df = load_dataset(str(data_path))
-    
-    # Determine target column (usually 'label' or similar)
-    # Check common column names
-    possible_target_cols = ['label', 'Label', 'LABEL', 'target', 'fault', 'category']
-    target_col = None
-    for col in possible_target_cols:
-        if col in df.columns:
-            target_col = col
-            break
-    
+    # Determine target column from the header only
+    columns = list(pd.read_csv(data_path, nrows=0).columns)
+    target_col = next((col for col in TARGET_COLUMNS if col in columns), None)
     if target_col is None:
-        # If not found, assume it's the last column or show available
-        print(f"\nAvailable columns: {list(df.columns)}")
+        print(f"\nAvailable columns: {columns}")
         raise ValueError("Could not determine target column. Please specify.")
     
     print(f"\nUsing target column: {target_col}")
     
-    # Load model artifacts
-    model, vectorizer = load_model_artifacts(str(model_path), str(vectorizer_path))
-    
-    # Split data (80/20 stratified, random_state=42)
-    X_train, X_test, y_train, y_test = split_data(df, target_col, random_state=42)
+    # Evaluate on test set, from the feature cache or streaming
+    if args.no_cache:
+        accumulator = evaluate_streaming(
+            str(data_path), target_col, str(model_path), str(vectorizer_path),
+            workers=args.workers, chunk_size=args.chunk_size, top_k=args.top_k
+        )
+    else:
+        accumulator = evaluate_cached(
+            str(data_path), target_col, str(model_path), str(vectorizer_path),
+            FeatureCache(Path(args.cache_dir)),
+            workers=args.workers, chunk_size=args.chunk_size, top_k=args.top_k
+        )
+    metrics = accumulator.compute()
     
-    # Evaluate on test set
-    y_pred, y_proba, metrics = evaluate_model(model, vectorizer, X_test, y_test)
+    if args.verify_in_memory:
+        verify_in_memory(metrics, str(data_path), target_col, str(model_path), str(vectorizer_path))
     
     # Save results
-    save_results(metrics, y_test, y_pred, output_dir)
+    save_results(metrics, accumulator.n_rows, output_dir)
     
     # Print summary
-    print_summary(metrics, y_test)
+    print_summary(metrics, accumulator.n_rows)
     
     print("\nEvaluation complete!")
 
 
+def _metrics_close(computed, reference) -> bool:
+    """Compare (nested) metrics, allowing float rounding differences."""
+    if isinstance(reference, dict):
+        return (isinstance(computed, dict) and computed.keys() == reference.keys()
+                and all(_metrics_close(computed[key], reference[key]) for key in reference))
+    return bool(np.isclose(computed, reference, rtol=1e-12, atol=0.0))
+
+
+def verify_in_memory(metrics: dict, data_path: str, target_col: str, model_path: str, vectorizer_path: str):
+    """
+    Evaluate the whole test set in memory with sklearn (the original pipeline) and compare the numbers.
+    
+    The accumulated metrics are computed from the confusion matrix, so they may
+    differ from sklearn's in the last bits of a float; anything beyond that is a
+    mismatch. The text report is compared as well.
+    """
+    print("\nVerifying against the in-memory evaluation...")
+    df = load_dataset(data_path)
+    model, vectorizer = load_model_artifacts(model_path, vectorizer_path)
+    X_train, X_test, y_train, y_test = split_data(df, target_col, random_state=42)
+    y_pred, reference = evaluate_model(model, vectorizer, X_test, y_test)
+    
+    mismatches = [
+        key for key in ('accuracy', 'macro_f1', 'weighted_f1', 'classification_report')
+        if not _metrics_close(metrics[key], reference[key])
+    ]
+    if format_report(metrics['classification_report']) != classification_report(y_test, y_pred, zero_division=0):
+        mismatches.append('classification_report text')
+    if mismatches:
+        raise SystemExit(f"Chunked evaluation differs from in-memory evaluation in: {mismatches}")
+    print("  Chunked and in-memory metrics match")
+
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,162 @@
+"""
+Reduced-Precision Inference Report
+
+Compares the compiled engine's float32 and int8 coefficient modes with float64
+on the evaluation split, so a precision can be chosen for INFERENCE_PRECISION
+(or `python -m app.models.artifacts --precision`) from measured numbers.
+
+For every precision it reports:
+- top-1 agreement with float64 and accuracy on the test labels
+- max and mean absolute probability drift from float64 (over all classes)
+- bytes held by the engine's weight arrays
+- batch throughput and single-complaint latency (p50)
+
+The split is the same as training and final_baseline_evaluation.py: 80/20
+stratified with random_state=42. Only the test split is scored.
+
+Usage:
+    python scripts/evaluation/quantization_report.py [--limit 20000] [--batch-size 256]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+import json
+import numpy as np
+import pandas as pd
+
+# Add backend to path to import the cleaner and the compiled engine
+backend_path = Path(__file__).parent.parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+from app.preprocessing.text_cleaner import clean_batch
+from app.models.inference_engine import PRECISIONS, CompiledLinearModel
+
+from final_baseline_evaluation import TARGET_COLUMNS, load_dataset, load_model_artifacts, split_data
+
+
+def score(engine: CompiledLinearModel, texts: list, batch_size: int):
+    """
+    Score texts in batches.
+
+    Returns:
+        Tuple of (probabilities, seconds spent scoring)
+    """
+    start = time.perf_counter()
+    probs = [engine.predict_proba(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+    return np.vstack(probs), time.perf_counter() - start
+
+
+def single_latency(engine: CompiledLinearModel, texts: list) -> float:
+    """Median seconds to score one complaint per call."""
+    timings = []
+    for text in texts:
+        start = time.perf_counter()
+        engine.predict_proba([text])
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def compare_precisions(engine: CompiledLinearModel, texts: list, labels: np.ndarray,
+                       batch_size: int, n_single: int) -> dict:
+    """
+    Score the texts at every precision and compare each with float64.
+
+    Args:
+        engine: float64 engine compiled from the sklearn model
+        texts: Cleaned test complaints
+        labels: True labels of the texts
+        batch_size: Complaints per predict_proba call for throughput
+        n_single: Complaints scored one at a time for the latency p50
+
+    Returns:
+        Dictionary of results keyed by precision
+    """
+    results = {}
+    reference = None
+    for precision in PRECISIONS:
+        quantized = engine.with_precision(precision)
+
+        # Warm up before timing
+        quantized.predict_proba(texts[:batch_size])
+        probs, seconds = score(quantized, texts, batch_size)
+        if reference is None:
+            reference = probs
+
+        top1 = probs.argmax(axis=1)
+        drift = np.abs(probs - reference)
+        results[precision] = {
+            "top1_agreement": float(np.mean(top1 == reference.argmax(axis=1))),
+            "accuracy": float(np.mean(quantized.classes_.astype(str)[top1] == labels)),
+            "max_probability_drift": float(drift.max()),
+            "mean_probability_drift": float(drift.mean()),
+            "weight_bytes": int(quantized.nbytes),
+            "complaints_per_second": len(texts) / seconds,
+            "single_p50_us": single_latency(quantized, texts[:n_single]) * 1e6,
+        }
+    return results
+
+
+def print_report(results: dict, n_texts: int):
+    """Print the comparison table."""
+    print("\n" + "=" * 70)
+    print(f"REDUCED-PRECISION INFERENCE ({n_texts} test complaints)")
+    print("=" * 70)
+    print(f"{'precision':<10} {'agree':>8} {'accuracy':>9} {'max drift':>10} {'mean drift':>11} "
+          f"{'weights MB':>11} {'per s':>8} {'p50 µs':>8}")
+    for precision, row in results.items():
+        print(f"{precision:<10} {row['top1_agreement']:>8.4%} {row['accuracy']:>9.4f} "
+              f"{row['max_probability_drift']:>10.2e} {row['mean_probability_drift']:>11.2e} "
+              f"{row['weight_bytes'] / 1e6:>11.2f} {row['complaints_per_second']:>8.0f} "
+              f"{row['single_p50_us']:>8.1f}")
+
+
+def main():
+    """Compare float64, float32 and int8 scoring on the test split."""
+    project_root = Path(__file__).parent.parent.parent
+
+    parser = argparse.ArgumentParser(description="Compare reduced-precision inference with float64")
+    parser.add_argument("--data", default=str(project_root / "data" / "processed" / "step4_cleaned_text.csv"),
+                        help="Dataset CSV")
+    parser.add_argument("--model", default=str(project_root / "backend" / "artifacts" / "model.joblib"),
+                        help="model.joblib")
+    parser.add_argument("--vectorizer", default=str(project_root / "backend" / "artifacts" / "vectorizer.joblib"),
+                        help="vectorizer.joblib")
+    parser.add_argument("--output", default=str(project_root / "evaluation" / "results" / "quantization_report.json"),
+                        help="JSON results file")
+    parser.add_argument("--limit", type=int, default=0, help="Score at most this many test complaints (0 = all)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Complaints per batch for throughput")
+    parser.add_argument("--single", type=int, default=500, help="Complaints timed one at a time")
+    args = parser.parse_args()
+
+    df = load_dataset(args.data)
+    target_col = next((col for col in TARGET_COLUMNS if col in df.columns), None)
+    if target_col is None:
+        raise ValueError(f"Could not determine target column in {list(df.columns)}")
+    _, X_test, _, y_test = split_data(df, target_col)
+
+    model, vectorizer = load_model_artifacts(args.model, args.vectorizer)
+    engine = CompiledLinearModel.from_sklearn(model, vectorizer)
+    engine.check_parity(model, vectorizer)
+
+    # Complaints that are empty after cleaning are rejected by the API
+    cleaned = np.array(clean_batch(X_test.tolist()), dtype=object)
+    keep = np.array([bool(text) for text in cleaned])
+    texts = cleaned[keep].tolist()
+    labels = y_test.to_numpy()[keep].astype(str)
+    if args.limit:
+        texts, labels = texts[:args.limit], labels[:args.limit]
+    print(f"\nScoring {len(texts)} cleaned test complaints")
+
+    results = compare_precisions(engine, texts, labels, args.batch_size, args.single)
+    print_report(results, len(texts))
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"n_complaints": len(texts), "batch_size": args.batch_size, "precisions": results}, f, indent=2)
+    print(f"\nResults saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
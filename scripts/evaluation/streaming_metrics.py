@@ -0,0 +1,190 @@
+"""
+Streaming Metric Accumulators for Evaluation
+
+Evaluation chunks are scored independently (possibly in different worker
+processes); each produces a MetricAccumulator holding only counts and sums, and
+the accumulators are merged. Memory does not grow with the number of rows:
+
+- confusion matrix (n_labels x n_labels counts)
+- top-k hits
+- log-loss sum (sklearn's log_loss clipping and row normalization)
+
+Rows whose true label is not one of the model's classes count as top-k misses
+and are left out of the log-loss.
+
+Accuracy, precision, recall, F1 and the classification report depend only on
+the confusion matrix, so they are computed from its diagonal, row and column
+sums with sklearn's definitions (zero_division=0, labels that occur as a true
+or predicted value). Nothing is expanded back to one entry per row; the
+evaluation script's --verify-in-memory compares the numbers with sklearn on the
+row-level predictions.
+"""
+from typing import Dict, Sequence
+
+import numpy as np
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise ratio that is 0 where the denominator is 0 (zero_division=0)."""
+    result = np.zeros(numerator.shape, dtype=np.float64)
+    nonzero = denominator != 0
+    result[nonzero] = numerator[nonzero] / denominator[nonzero]
+    return result
+
+
+def report_from_confusion(confusion: np.ndarray, labels: Sequence[str]) -> Dict:
+    """
+    Build sklearn's classification_report(output_dict=True) from a confusion matrix.
+
+    Args:
+        confusion: Counts with true labels as rows and predicted labels as columns
+        labels: Label of each row/column; every label should occur in confusion
+
+    Returns:
+        Dict with per-label precision, recall, f1-score and support, accuracy, and
+        the macro and weighted averages
+    """
+    tp = np.diag(confusion).astype(np.float64)
+    true_sum = confusion.sum(axis=1).astype(np.float64)
+    pred_sum = confusion.sum(axis=0).astype(np.float64)
+
+    precision = _divide(tp, pred_sum)
+    recall = _divide(tp, true_sum)
+    f1 = _divide(2 * tp, true_sum + pred_sum)
+
+    report = {
+        str(label): {'precision': float(p), 'recall': float(r), 'f1-score': float(f), 'support': float(n)}
+        for label, p, r, f, n in zip(labels, precision, recall, f1, true_sum)
+    }
+    support = float(true_sum.sum())
+    report['accuracy'] = float(tp.sum() / support) if support else 0.0
+    for name, weights in (('macro avg', None), ('weighted avg', true_sum)):
+        report[name] = {
+            'precision': float(np.average(precision, weights=weights)),
+            'recall': float(np.average(recall, weights=weights)),
+            'f1-score': float(np.average(f1, weights=weights)),
+            'support': support,
+        }
+    return report
+
+
+def format_report(report: Dict, digits: int = 2) -> str:
+    """Format a report from report_from_confusion as sklearn's text classification_report."""
+    headers = ["precision", "recall", "f1-score", "support"]
+    averages = ('accuracy', 'macro avg', 'weighted avg')
+    names = [name for name in report if name not in averages]
+    width = max([len(name) for name in names] + [len('weighted avg'), digits])
+
+    text = ("{:>{width}s} " + " {:>9}" * len(headers)).format("", *headers, width=width) + "\n\n"
+    row_fmt = "{:>{width}s} " + " {:>9.{digits}f}" * 3 + " {:>9}\n"
+    for name in names:
+        row = report[name]
+        text += row_fmt.format(name, row['precision'], row['recall'], row['f1-score'], int(row['support']),
+                               width=width, digits=digits)
+    text += "\n"
+
+    support = int(report['macro avg']['support'])
+    text += ("{:>{width}s} " + " {:>9.{digits}}" * 2 + " {:>9.{digits}f} {:>9}\n").format(
+        'accuracy', "", "", report['accuracy'], support, width=width, digits=digits
+    )
+    for name in averages[1:]:
+        row = report[name]
+        text += row_fmt.format(name, row['precision'], row['recall'], row['f1-score'], support,
+                               width=width, digits=digits)
+    return text
+
+
+class MetricAccumulator:
+    """Confusion-matrix, top-k and log-loss accumulator over a fixed label list."""
+
+    def __init__(self, labels: Sequence[str], top_k: int = 3):
+        """
+        Initialize empty accumulators.
+
+        Args:
+            labels: Every label that can occur as a true or predicted value
+            top_k: k for top-k accuracy
+        """
+        self.labels = list(labels)
+        self.top_k = top_k
+        self.confusion = np.zeros((len(self.labels), len(self.labels)), dtype=np.int64)
+        self.top_k_hits = 0
+        self.log_loss_sum = 0.0
+        self.log_loss_rows = 0
+        self.n_rows = 0
+
+    def update(self, y_true: np.ndarray, y_pred: np.ndarray, proba: np.ndarray,
+               proba_columns: np.ndarray):
+        """
+        Add one chunk of predictions.
+
+        Args:
+            y_true: True label indices into labels, shape (n,)
+            y_pred: Predicted label indices into labels, shape (n,)
+            proba: Class probabilities, shape (n, n_model_classes)
+            proba_columns: Label index of each proba column (the model's classes_)
+        """
+        n = y_true.shape[0]
+        if n == 0:
+            return
+        self.n_rows += n
+        np.add.at(self.confusion, (y_true, y_pred), 1)
+
+        # Column of the true label in proba (-1 when the model does not know it)
+        column_of_label = np.full(len(self.labels), -1, dtype=np.int64)
+        column_of_label[proba_columns] = np.arange(proba_columns.shape[0])
+        true_columns = column_of_label[y_true]
+        known = true_columns >= 0
+
+        # Top-k: the true label scores higher than all but at most k - 1 classes
+        k = min(self.top_k, proba.shape[1])
+        rows = np.flatnonzero(known)
+        true_scores = proba[rows, true_columns[rows]]
+        higher = (proba[rows] > true_scores[:, None]).sum(axis=1)
+        self.top_k_hits += int(np.count_nonzero(higher < k))
+
+        # Log-loss exactly as sklearn.metrics.log_loss (clip to eps, renormalize rows)
+        eps = np.finfo(proba.dtype).eps
+        clipped = np.clip(proba[rows], eps, 1 - eps)
+        clipped /= clipped.sum(axis=1, keepdims=True)
+        self.log_loss_sum += float(-np.log(clipped[np.arange(rows.shape[0]), true_columns[rows]]).sum())
+        self.log_loss_rows += rows.shape[0]
+
+    def merge(self, other: "MetricAccumulator"):
+        """Add another accumulator built over the same labels."""
+        if other.labels != self.labels:
+            raise ValueError("Cannot merge accumulators built over different labels")
+        self.confusion += other.confusion
+        self.top_k_hits += other.top_k_hits
+        self.log_loss_sum += other.log_loss_sum
+        self.log_loss_rows += other.log_loss_rows
+        self.n_rows += other.n_rows
+
+    def compute(self) -> Dict:
+        """
+        Compute the final metrics from the accumulated counts.
+
+        Returns:
+            Dict with accuracy, macro_f1, weighted_f1, classification_report (in
+            sklearn's output_dict format), top_k_accuracy, log_loss and
+            confusion_matrix
+        """
+        # sklearn reports the labels that occur as a true or predicted value
+        occurs = self.confusion.sum(axis=0) + self.confusion.sum(axis=1)
+        index = sorted(np.flatnonzero(occurs), key=lambda i: self.labels[i])
+        labels = [self.labels[i] for i in index]
+        confusion = self.confusion[np.ix_(index, index)]
+        report = report_from_confusion(confusion, labels)
+
+        return {
+            'accuracy': report['accuracy'],
+            'macro_f1': report['macro avg']['f1-score'],
+            'weighted_f1': report['weighted avg']['f1-score'],
+            'classification_report': report,
+            f'top_{self.top_k}_accuracy': self.top_k_hits / self.n_rows if self.n_rows else 0.0,
+            'log_loss': self.log_loss_sum / self.log_loss_rows if self.log_loss_rows else None,
+            'confusion_matrix': {
+                'labels': labels,
+                'matrix': confusion.tolist(),
+            },
+        }
@@ -0,0 +1,54 @@
+"""
+Golden Corpus Check for clean_text
+
+clean_text MUST match training preprocessing exactly. This script runs it over
+clean_text_golden.json (inputs with the outputs of the original, reference
+implementation) and fails if any output differs by a single byte. clean_batch
+is checked against the same corpus, in-process and across worker processes.
+
+Usage:
+    python scripts/preprocessing/check_clean_text.py
+"""
+import sys
+import json
+from pathlib import Path
+
+# Add backend to path to import clean_text
+backend_path = Path(__file__).parent.parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+from app.preprocessing.text_cleaner import clean_text, clean_batch
+
+
+def main():
+    """Compare clean_text and clean_batch output with the golden corpus."""
+    golden_path = Path(__file__).parent / "clean_text_golden.json"
+    cases = json.loads(golden_path.read_text(encoding="utf-8"))
+    print(f"Loaded {len(cases)} golden cases from: {golden_path}")
+
+    failures = 0
+    for case in cases:
+        actual = clean_text(case["input"])
+        if actual.encode("utf-8") != case["expected"].encode("utf-8"):
+            failures += 1
+            print(f"  MISMATCH for {case['input']!r}")
+            print(f"    expected: {case['expected']!r}")
+            print(f"    actual:   {actual!r}")
+
+    inputs = [case["input"] for case in cases]
+    expected = [case["expected"] for case in cases]
+    if clean_batch(inputs) != expected:
+        failures += 1
+        print("  MISMATCH in clean_batch (single process)")
+    if clean_batch(inputs * 4, n_jobs=2, chunksize=len(inputs)) != expected * 4:
+        failures += 1
+        print("  MISMATCH in clean_batch (worker processes)")
+
+    if failures:
+        print(f"\nFAILED: {failures} mismatches")
+        sys.exit(1)
+    print("\nAll golden cases match.")
+
+
+if __name__ == "__main__":
+    main()
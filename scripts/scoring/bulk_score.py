@@ -0,0 +1,315 @@
+"""
+Offline Bulk Scoring CLI
+
+Scores a large CSV or Parquet file of complaints with the backend Predictor and
+writes the same top-k labels, confidences, severities and suppression flags the
+/api/diagnose endpoint returns.
+
+- The input is read in chunks and the chunks are scored in a process pool; each
+  worker loads the Predictor (or the exported artifacts) once.
+- Results are written in input order: appended to a single CSV file, or as one
+  part file per chunk in a Parquet dataset directory.
+- Progress is recorded in <output>.progress.json after every chunk, so an
+  interrupted run continues where it stopped with --resume.
+- Raw predictions, suppression and severity come from the same code as the API
+  (Predictor.predict_batch, apply_suppression and the diagnose route's
+  _build_issues), so every row matches what the API would return. Floats are
+  written with full precision; read CSV output back with
+  pd.read_csv(..., float_precision="round_trip") to get identical confidences.
+
+Parquet input/output needs pyarrow.
+
+Usage:
+    python scripts/scoring/bulk_score.py --input complaints.csv --output scored.csv
+    python scripts/scoring/bulk_score.py --input complaints.parquet --output scored.parquet \\
+        --text-column summary --id-column odi_id --workers 8 --resume
+"""
+import sys
+import os
+import json
+import time
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+
+# Add backend to path to import the predictor
+backend_path = Path(__file__).parent.parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+from app.core.config import settings
+
+# Predictor loaded once per worker process
+_predictor = None
+
+
+def _init_worker(predictor_kwargs: dict):
+    """Process-pool initializer: load the predictor once per worker."""
+    global _predictor
+    from app.models.predictor import Predictor
+    _predictor = Predictor(**predictor_kwargs)
+
+
+def _worker_model_version() -> str:
+    """Return the model version loaded by this worker."""
+    return _predictor.model_version
+
+
+def _score_chunk(chunk_index: int, ids: list, texts: list, top_k: int) -> Tuple[int, pd.DataFrame]:
+    """
+    Score one chunk inside a worker, exactly like the /api/diagnose pipeline.
+
+    Args:
+        chunk_index: Position of the chunk in the input
+        ids: Row identifiers, echoed in the output
+        texts: Raw complaint texts
+        top_k: Number of predictions scored per complaint
+
+    Returns:
+        Tuple of (chunk_index, DataFrame with one output row per input row)
+    """
+    # Same response conversion as the API (suppression and severity)
+    from app.api.routes.diagnose import _build_issues
+
+    texts = [text if isinstance(text, str) else None for text in texts]
+    raw_batch = _predictor.predict_batch(texts, top_k=top_k)
+
+    rows = []
+    for row_id, raw_predictions in zip(ids, raw_batch):
+        row = {"id": row_id}
+        if isinstance(raw_predictions, Exception):
+            row["error"] = str(raw_predictions)
+            rows.append(row)
+            continue
+
+        issues, suppression_applied = _build_issues(raw_predictions)
+        for rank, issue in enumerate(issues[:top_k], start=1):
+            row[f"label_{rank}"] = issue.name
+            row[f"confidence_{rank}"] = issue.confidence
+            row[f"severity_{rank}"] = issue.severity
+        row["unknown_suppressed"] = suppression_applied.unknown_suppressed
+        row["other_suppressed"] = suppression_applied.other_suppressed
+        row["error"] = None
+        rows.append(row)
+
+    return chunk_index, pd.DataFrame(rows, columns=_output_columns(top_k))
+
+
+def _output_columns(top_k: int) -> list:
+    """Output column order for a given top_k."""
+    columns = ["id"]
+    for rank in range(1, top_k + 1):
+        columns += [f"label_{rank}", f"confidence_{rank}", f"severity_{rank}"]
+    return columns + ["unknown_suppressed", "other_suppressed", "error"]
+
+
+def _is_parquet(path: Path) -> bool:
+    return path.suffix.lower() in (".parquet", ".pq")
+
+
+def _require_pyarrow():
+    """Import pyarrow.parquet or exit with an install hint."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet files need pyarrow: pip install pyarrow")
+    return pq
+
+
+def read_chunks(path: Path, chunk_size: int, columns: list) -> Iterator[pd.DataFrame]:
+    """
+    Read an input file in chunks of chunk_size rows.
+
+    Args:
+        path: CSV or Parquet file
+        chunk_size: Rows per chunk
+        columns: Columns to read
+
+    Yields:
+        DataFrames of at most chunk_size rows, in file order
+    """
+    if _is_parquet(path):
+        pq = _require_pyarrow()
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns, dtype=str, keep_default_na=False)
+
+
+class OutputWriter:
+    """
+    Writes scored chunks in order and records progress so a run can be resumed.
+
+    CSV output is a single file; progress stores its size after each chunk, and
+    a resumed run truncates anything written after the last recorded chunk.
+    Parquet output is a directory with one part file per chunk.
+    """
+
+    def __init__(self, output: Path, state: Dict):
+        self.output = output
+        self.progress_path = output.with_name(output.name + ".progress.json")
+        self.state = state
+        self.parquet = _is_parquet(output)
+
+    def prepare(self, resume: bool):
+        """Validate or reset the previous run's progress before writing."""
+        if resume and self.progress_path.exists():
+            previous = json.loads(self.progress_path.read_text())
+            for key in ("input", "chunk_size", "text_column", "id_column", "top_k", "model_version"):
+                if previous.get(key) != self.state[key]:
+                    raise SystemExit(
+                        f"Cannot resume: {key} changed ({previous.get(key)!r} -> {self.state[key]!r}). "
+                        f"Run without --resume to start over."
+                    )
+            self.state.update(chunks_done=previous["chunks_done"], rows_done=previous["rows_done"],
+                              output_bytes=previous.get("output_bytes", 0))
+            if not self.parquet and self.output.exists():
+                with open(self.output, "r+b") as f:
+                    f.truncate(self.state["output_bytes"])
+            return
+
+        if self.output.exists() and not self.parquet:
+            self.output.unlink()
+        if self.parquet:
+            self.output.mkdir(parents=True, exist_ok=True)
+            for part in self.output.glob("part-*.parquet"):
+                part.unlink()
+        self.state.update(chunks_done=0, rows_done=0, output_bytes=0)
+        self._save_progress()
+
+    def write(self, chunk_index: int, frame: pd.DataFrame):
+        """Write the next chunk and record it as done."""
+        if self.parquet:
+            pq = _require_pyarrow()
+            import pyarrow as pa
+            part = self.output / f"part-{chunk_index:06d}.parquet"
+            tmp = part.with_suffix(".tmp")
+            pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), tmp)
+            tmp.replace(part)
+        else:
+            with open(self.output, "ab") as f:
+                frame.to_csv(f, header=self.state["output_bytes"] == 0, index=False)
+                f.flush()
+                os.fsync(f.fileno())
+                self.state["output_bytes"] = f.tell()
+
+        self.state["chunks_done"] = chunk_index + 1
+        self.state["rows_done"] += len(frame)
+        self._save_progress()
+
+    def _save_progress(self):
+        tmp = self.progress_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2))
+        tmp.replace(self.progress_path)
+
+
+def main():
+    """Score the input file and write the predictions."""
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file of complaints offline")
+    parser.add_argument("--input", required=True, help="Input .csv or .parquet file")
+    parser.add_argument("--output", required=True, help="Output .csv file or .parquet dataset directory")
+    parser.add_argument("--text-column", default="summary", help="Column holding the complaint text")
+    parser.add_argument("--id-column", default=None, help="Column echoed as 'id' (defaults to the row number)")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="Rows per chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--top-k", type=int, default=settings.prediction_top_k, help="Predictions per complaint")
+    parser.add_argument("--model", default=None, help="model.joblib (defaults to MODEL_PATH)")
+    parser.add_argument("--vectorizer", default=None, help="vectorizer.joblib (defaults to VECTORIZER_PATH)")
+    parser.add_argument("--artifacts-dir", default=None, help="Exported artifact directory (defaults to ARTIFACTS_DIR)")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted run")
+    args = parser.parse_args()
+
+    input_path = Path(args.input).resolve()
+    output_path = Path(args.output).resolve()
+    if not input_path.exists():
+        raise FileNotFoundError(f"Input not found: {input_path}")
+
+    def absolute(path: Optional[str]) -> Optional[str]:
+        return str(Path(path).resolve()) if path else path
+
+    predictor_kwargs = {
+        "model_path": absolute(args.model),
+        "vectorizer_path": absolute(args.vectorizer),
+        "artifacts_dir": absolute(args.artifacts_dir),
+    }
+
+    print("=" * 70)
+    print("BULK SCORING")
+    print("=" * 70)
+    print(f"Input:   {input_path}")
+    print(f"Output:  {output_path}")
+    print(f"Workers: {args.workers}, chunk size: {args.chunk_size:,}")
+
+    columns = [args.text_column] + ([args.id_column] if args.id_column else [])
+    max_in_flight = args.workers * 2
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(predictor_kwargs,)) as pool:
+        model_version = pool.submit(_worker_model_version).result()
+        print(f"Model version: {model_version}")
+
+        writer = OutputWriter(output_path, {
+            "input": str(input_path),
+            "chunk_size": args.chunk_size,
+            "text_column": args.text_column,
+            "id_column": args.id_column,
+            "top_k": args.top_k,
+            "model_version": model_version,
+        })
+        writer.prepare(args.resume)
+        skip_chunks = writer.state["chunks_done"]
+        if skip_chunks:
+            print(f"Resuming after {skip_chunks} chunks ({writer.state['rows_done']:,} rows)")
+
+        started = time.perf_counter()
+        scored_rows = 0
+        pending = set()
+        finished = {}
+        next_to_write = skip_chunks
+        row_offset = 0
+
+        def write_ready():
+            nonlocal next_to_write, scored_rows
+            while next_to_write in finished:
+                frame = finished.pop(next_to_write)
+                writer.write(next_to_write, frame)
+                scored_rows += len(frame)
+                elapsed = time.perf_counter() - started
+                print(f"  chunk {next_to_write}: {writer.state['rows_done']:,} rows written, "
+                      f"{scored_rows / elapsed:,.0f} rows/s")
+                next_to_write += 1
+
+        for chunk_index, chunk in enumerate(read_chunks(input_path, args.chunk_size, columns)):
+            ids = chunk[args.id_column].tolist() if args.id_column else list(range(row_offset, row_offset + len(chunk)))
+            row_offset += len(chunk)
+            if chunk_index < skip_chunks:
+                continue
+
+            # Bound the chunks held in memory: wait while the pool is saturated
+            while len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, frame = future.result()
+                    finished[index] = frame
+                write_ready()
+
+            pending.add(pool.submit(_score_chunk, chunk_index, ids, chunk[args.text_column].tolist(), args.top_k))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, frame = future.result()
+                finished[index] = frame
+            write_ready()
+
+    elapsed = time.perf_counter() - started
+    print(f"\nScored {scored_rows:,} rows in {elapsed:.1f}s ({scored_rows / elapsed if elapsed else 0:,.0f} rows/s)")
+    print(f"Total rows in output: {writer.state['rows_done']:,}")
+    print("\nScoring complete!")
+
+
+if __name__ == "__main__":
+    main()